@@ -0,0 +1,126 @@
+"""
+Admission control for the API.
+
+Every route class (parse, embed, llm, read, write) has a concurrency pool with a
+bounded wait queue. A request that finds the queue full is rejected at once
+with 429; one that waits longer than the queue timeout gets 503. Both carry
+Retry-After so clients back off instead of piling on. Blocking work admitted
+through a pool runs in the thread pool, keeping the event loop free for
+cheap requests.
+"""
+import asyncio
+import math
+import os
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from metrics import Counter, Gauge
+
+ADMISSION_ACTIVE = Gauge("recruitment_admission_active", "Requests holding a slot in each admission pool", ["pool"])
+ADMISSION_QUEUED = Gauge("recruitment_admission_queued", "Requests waiting for a slot in each admission pool", ["pool"])
+ADMISSION_REJECTED = Counter("recruitment_admission_rejected_total", "Requests rejected by admission control", ["pool", "reason"])
+
+# pool: (concurrency, max queued, queue timeout in seconds)
+DEFAULT_POOLS = {
+    "read": (32, 128, 5.0),
+    "write": (8, 32, 10.0),
+    "parse": (4, 16, 30.0),
+    "embed": (2, 16, 30.0),
+    "llm": (4, 16, 60.0),
+}
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self._semaphore = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the event loop that serves requests
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    def _retry_after(self) -> str:
+        return str(max(1, math.ceil(self.queue_timeout / 2)))
+
+    def _reject(self, status_code: int, reason: str):
+        ADMISSION_REJECTED.inc(pool=self.name, reason=reason)
+        raise HTTPException(
+            status_code=status_code,
+            detail=f"Server is busy ({self.name} pool {reason}), please retry later",
+            headers={"Retry-After": self._retry_after()}
+        )
+
+    async def acquire(self) -> None:
+        semaphore = self._get_semaphore()
+        if semaphore.locked():
+            if self.queued >= self.max_queue:
+                self._reject(429, "queue_full")
+
+            self.queued += 1
+            ADMISSION_QUEUED.set(self.queued, pool=self.name)
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject(503, "queue_timeout")
+            finally:
+                self.queued -= 1
+                ADMISSION_QUEUED.set(self.queued, pool=self.name)
+        else:
+            await semaphore.acquire()
+
+        self.active += 1
+        ADMISSION_ACTIVE.set(self.active, pool=self.name)
+
+    def release(self) -> None:
+        self.active -= 1
+        ADMISSION_ACTIVE.set(self.active, pool=self.name)
+        self._get_semaphore().release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, func, *args, **kwargs):
+        """Runs blocking work in the thread pool while holding a slot"""
+        async with self.slot():
+            return await run_in_threadpool(func, *args, **kwargs)
+
+
+def _from_env(name: str, limit: int, max_queue: int, timeout: float) -> ConcurrencyLimiter:
+    prefix = f"ADMISSION_{name.upper()}"
+    return ConcurrencyLimiter(
+        name,
+        limit=int(os.getenv(f"{prefix}_LIMIT", str(limit))),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", str(max_queue))),
+        queue_timeout=float(os.getenv(f"{prefix}_TIMEOUT", str(timeout)))
+    )
+
+
+pools: Dict[str, ConcurrencyLimiter] = {
+    name: _from_env(name, *settings) for name, settings in DEFAULT_POOLS.items()
+}
+
+
+def admit(pool: str):
+    """FastAPI dependency that holds a slot of the given pool for the whole request"""
+    limiter = pools[pool]
+
+    async def dependency():
+        async with limiter.slot():
+            yield
+
+    return dependency
@@ -0,0 +1,178 @@
+"""
+Input hashes of stored analyses, and staleness.
+
+store_analysis records what an analysis was computed from under
+`analysis.inputs`:
+
+    {"resume", "jd", "prompt", "model",                 # candidate analysis
+     "links", "readmes", "readme_prompt", "readme_model",  # GitHub analysis
+     "failed", "structured_error", "recorded_at"}
+
+Texts and prompt templates are stored as SHA-256 digests. "resume" is the
+digest of the resume text actually sent to the model (the sections relevant to
+the JD, see resume_sections). An analysis is stale when any input differs from
+what the same call would use now, so editing a JD only makes that JD's
+candidates stale. README contents are only known after fetching them; without
+them only the set of linked repositories is compared, and a README that cannot
+be fetched now is unknown rather than changed.
+"""
+import datetime
+import hashlib
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from github_link_analyzer import README_MODEL, README_PROMPT_VERSION
+from llm_analyzer import ANALYSIS_MODEL, PROMPT_VERSION, prompt_template
+from resume_sections import relevant_resume_text
+
+ANALYSIS_INPUTS = ("resume", "jd", "prompt", "model")
+GITHUB_INPUTS = ("jd", "readme_prompt", "readme_model", "links", "readmes")
+UNRECORDED = "unrecorded"
+FAILED = "failed"
+STRUCTURED_ERROR = "structured_error"    # the JSON block was missing or invalid
+
+
+def digest(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_digests() -> Dict[str, Optional[str]]:
+    """Prompt and model inputs; the same for every candidate, so compute once per batch"""
+    return {
+        "prompt": digest(f"{PROMPT_VERSION}\n{prompt_template()}"),
+        "model": ANALYSIS_MODEL,
+        "readme_prompt": digest(str(README_PROMPT_VERSION)),
+        "readme_model": README_MODEL
+    }
+
+
+def prompt_resume_text(candidate: Dict[str, Any], jd: Dict[str, Any]) -> str:
+    """The resume text the analysis prompt gets for this JD"""
+    return relevant_resume_text(
+        candidate.get("resume_content") or "",
+        candidate.get("section_embeddings"),
+        jd.get("embeddings")
+    )
+
+
+def current_inputs(
+    candidate: Dict[str, Any],
+    jd: Dict[str, Any],
+    prompts: Optional[Dict[str, Optional[str]]] = None,
+    readmes: Optional[Dict[str, Optional[str]]] = None
+) -> Dict[str, Any]:
+    """`readmes`: fetched README contents by link (None when the fetch failed), when fetched"""
+    inputs = {
+        "resume": digest(prompt_resume_text(candidate, jd)),
+        "jd": digest(jd.get("job_description") or ""),
+        **(prompts or prompt_digests()),
+        "links": sorted(candidate.get("github_links") or [])
+    }
+    if readmes is not None:
+        # Links contain dots, so they are list entries rather than field names
+        inputs["readmes"] = [{"link": link, "hash": digest(readmes.get(link))} for link in inputs["links"]]
+    return inputs
+
+
+def _readme_hashes(inputs: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    return {entry["link"]: entry.get("hash") for entry in inputs.get("readmes") or []}
+
+
+def _readmes_changed(recorded: Dict[str, Any], current: Dict[str, Any]) -> bool:
+    before = _readme_hashes(recorded)
+    # A README that could not be fetched now (no hash) is unknown, not changed
+    return any(now is not None and before.get(link) != now for link, now in _readme_hashes(current).items())
+
+
+def stale_inputs(recorded: Optional[Dict[str, Any]], current: Dict[str, Any]) -> List[str]:
+    """Names of the inputs that changed since the analysis; empty when it is up to date"""
+    if not recorded:
+        return [UNRECORDED]
+    changed = [key for key in ANALYSIS_INPUTS if recorded.get(key) != current.get(key)]
+    changed += [key for key in (FAILED, STRUCTURED_ERROR) if recorded.get(key)]
+    if sorted(recorded.get("links") or []) != current["links"]:
+        changed.append("links")
+    elif current["links"]:
+        changed += [key for key in ("readme_prompt", "readme_model") if recorded.get(key) != current.get(key)]
+        if "readmes" in current and _readmes_changed(recorded, current):
+            changed.append("readmes")
+    return changed
+
+
+def stale_parts(changed: List[str]) -> Tuple[bool, bool]:
+    """(redo the candidate analysis, redo the GitHub analysis)"""
+    if UNRECORDED in changed:
+        return True, True
+    return (
+        any(key in changed for key in ANALYSIS_INPUTS + (FAILED, STRUCTURED_ERROR)),
+        any(key in changed for key in GITHUB_INPUTS)
+    )
+
+
+def recorded_inputs(current: Dict[str, Any], failed: bool = False, structured_error: bool = False) -> Dict[str, Any]:
+    return {**current, "failed": failed, "structured_error": structured_error, "recorded_at": datetime.datetime.utcnow()}
+
+
+def analyzed_candidates(
+    jobs_collection,
+    job_role: Optional[str] = None,
+    job_title: Optional[str] = None
+) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """(jd, candidate) for every candidate with a stored analysis, with only the fields hashing needs"""
+    pipeline = []
+    if job_role:
+        pipeline.append({"$match": {"job_role": {"$regex": f"^{re.escape(job_role)}$", "$options": "i"}}})
+    # A stable order, so that callers can page through the results
+    pipeline += [{"$sort": {"_id": 1}}, {"$unwind": "$job_descriptions"}]
+    if job_title:
+        pipeline.append({"$match": {"job_descriptions.title": {"$regex": f"^{re.escape(job_title)}$", "$options": "i"}}})
+    pipeline += [
+        {"$unwind": "$job_descriptions.candidates"},
+        {"$match": {"job_descriptions.candidates.analysis": {"$type": "object"}}},
+        {"$project": {
+            "_id": 0,
+            "job_role": 1,
+            "title": "$job_descriptions.title",
+            "job_description": "$job_descriptions.job_description",
+            "embeddings": "$job_descriptions.embeddings",
+            "candidate_name": "$job_descriptions.candidates.candidate_name",
+            "resume_content": "$job_descriptions.candidates.resume_content",
+            "section_embeddings": "$job_descriptions.candidates.section_embeddings",
+            "github_links": "$job_descriptions.candidates.github_links",
+            "inputs": "$job_descriptions.candidates.analysis.inputs"
+        }}
+    ]
+    for doc in jobs_collection.aggregate(pipeline):
+        jd = {key: doc.get(key) for key in ("job_role", "title", "job_description", "embeddings")}
+        yield jd, doc
+
+
+def stale_analyses(
+    jobs_collection,
+    job_role: Optional[str] = None,
+    job_title: Optional[str] = None,
+    fetch_readme=None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stored analyses whose inputs changed. With `fetch_readme` (link -> content)
+    README contents are compared too; each link is fetched once.
+    """
+    prompts = prompt_digests()
+    fetched: Dict[str, Optional[str]] = {}
+    for jd, candidate in analyzed_candidates(jobs_collection, job_role, job_title):
+        readmes = None
+        if fetch_readme is not None:
+            for link in candidate.get("github_links") or []:
+                if link not in fetched:
+                    fetched[link] = fetch_readme(link)
+            readmes = fetched
+        changed = stale_inputs(candidate.get("inputs"), current_inputs(candidate, jd, prompts, readmes))
+        if changed:
+            yield {
+                "job_role": jd["job_role"],
+                "job_title": jd["title"],
+                "candidate_name": candidate["candidate_name"],
+                "stale_inputs": changed
+            }
@@ -0,0 +1,91 @@
+"""
+Structured fields of the resume/JD analysis.
+
+The analysis call returns the markdown report followed by one fenced JSON
+block with the fields below. The block is validated with StructuredAnalysis,
+stored as `analysis.structured` and copied into the candidate summaries,
+where it is indexed. The markdown without the block is kept for display.
+When the block is missing or invalid, the analysis is still stored, with
+`structured` set to None and the reason in `structured_error`.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+SENIORITY_LEVELS = ("intern", "junior", "mid", "senior", "lead", "principal", "unknown")
+MAX_ITEMS = 30
+MAX_ITEM_LENGTH = 80
+
+STRUCTURED_INSTRUCTIONS = f"""
+After the markdown report, output exactly one fenced ```json block (and nothing after it) with:
+    {{
+        "overall_score": <the overall score from section 11, an integer from 0 to 100>,
+        "matched_skills": [<skills required by the job description that the candidate has, short lowercase names>],
+        "missing_skills": [<skills required by the job description that the candidate lacks, short lowercase names>],
+        "seniority": <one of {", ".join(f'"{level}"' for level in SENIORITY_LEVELS)}>,
+        "risk_flags": [<short phrases for each potential risk; empty if there are none>]
+    }}
+"""
+
+_JSON_BLOCK = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
+
+
+def clean_items(values: Any) -> List[str]:
+    if values is None:
+        return []
+    if isinstance(values, str):
+        values = re.split(r"[,;\n]", values)
+    items, seen = [], set()
+    for value in values:
+        item = " ".join(str(value).split()).strip(" .-*").lower()[:MAX_ITEM_LENGTH]
+        if item and item not in ("none", "n/a") and item not in seen:
+            seen.add(item)
+            items.append(item)
+    return items[:MAX_ITEMS]
+
+
+class StructuredAnalysis(BaseModel):
+    overall_score: int = Field(ge=0, le=100)
+    matched_skills: List[str] = []
+    missing_skills: List[str] = []
+    seniority: str = "unknown"
+    risk_flags: List[str] = []
+
+    @field_validator("matched_skills", "missing_skills", "risk_flags", mode="before")
+    @classmethod
+    def _items(cls, values):
+        return clean_items(values)
+
+    @field_validator("seniority", mode="before")
+    @classmethod
+    def _seniority(cls, value):
+        value = str(value or "").strip().lower()
+        # "Mid-level", "Senior engineer", ... map onto the first matching level
+        return next((level for level in SENIORITY_LEVELS if level in value), "unknown")
+
+
+def split_structured(text: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """(markdown without the JSON block, validated fields or None, error or None)"""
+    matches = list(_JSON_BLOCK.finditer(text or ""))
+    if not matches:
+        return text, None, "no JSON block in the analysis"
+    match = matches[-1]
+    markdown = (text[:match.start()] + text[match.end():]).strip()
+    try:
+        structured = StructuredAnalysis.model_validate(json.loads(match.group(1)))
+    except (json.JSONDecodeError, ValidationError) as e:
+        return markdown, None, f"invalid structured analysis: {str(e)[:500]}"
+    return markdown, structured.model_dump(), None
+
+
+def summary_fields(analysis: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The structured fields that candidate summaries store and index"""
+    structured = (analysis or {}).get("structured") or {}
+    return {
+        "matched_skills": structured.get("matched_skills") or [],
+        "missing_skills": structured.get("missing_skills") or [],
+        "seniority": structured.get("seniority"),
+        "risk_flags": len(structured.get("risk_flags") or []) if structured else None
+    }
@@ -0,0 +1,539 @@
+"""
+Approximate nearest-neighbour index over every resume embedding (IVF-Flat).
+
+Vectors are L2-normalized and clustered with spherical k-means into `nlist`
+inverted lists. A query scores the centroids, then only the vectors of the
+`nprobe` closest lists. The base vectors are stored as float16, grouped by
+list, in a .npy file that is memory-mapped on load, so a worker only pages
+in the lists it probes. Vectors added after the last save live in a small
+in-memory delta per list and are folded into the base by the next save.
+
+On disk (`ANN_INDEX_DIR`):
+    meta.json                  version, dimension, keys, watermark, file names
+    centroids-<save>.npy       (nlist, dim) float32
+    vectors-<save>.npy         (count, dim) float16, rows grouped by list
+    offsets-<save>.npy         (nlist + 1,) int64, row range of every list
+    writer.lock                held by the one process that saves
+<save> is unique per save (version, pid, random token) and every file is
+renamed into place once written, so no file is ever rewritten in place.
+meta.json is replaced last, so readers always see a complete version.
+"""
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from metrics import stage
+from mongo_connection import get_database
+from vector_utils import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str, str]  # (job_role, job_title, candidate_name)
+
+ASSIGN_BATCH = 8192
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BATCH):
+        batch = np.asarray(vectors[start:start + ASSIGN_BATCH], dtype=np.float32)
+        assignments[start:start + ASSIGN_BATCH] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = 15, sample: int = 50000, seed: int = 0) -> np.ndarray:
+    """Centroids (unit length) of `nlist` clusters, trained on at most `sample` vectors"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[rng.choice(len(vectors), sample, replace=False)]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    nlist = max(1, min(nlist, len(vectors)))
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=nlist)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            # Re-seed empty clusters with random points rather than dropping them
+            sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def default_nlist(count: int) -> int:
+    return int(max(1, min(4096, round(np.sqrt(max(count, 1))))))
+
+
+def candidate_documents(jobs_collection, fields: Sequence[str], since: Optional[datetime.datetime] = None):
+    """
+    Streams one flat document per candidate: job_role, job_title,
+    candidate_name, uploaded_at and the requested candidate `fields`,
+    optionally only candidates uploaded after `since`.
+    """
+    fields = [field for field in fields if field not in ("candidate_name", "uploaded_at")]
+    projection = {"job_role": 1, "job_descriptions.title": 1}
+    for field in ["candidate_name", "uploaded_at"] + fields:
+        projection[f"job_descriptions.candidates.{field}"] = 1
+    pipeline: List[Dict[str, Any]] = [
+        {"$project": projection},
+        {"$unwind": "$job_descriptions"},
+        {"$unwind": "$job_descriptions.candidates"}
+    ]
+    if since is not None:
+        pipeline.append({"$match": {"job_descriptions.candidates.uploaded_at": {"$gt": since}}})
+    flat = {"_id": 0, "job_role": 1, "job_title": "$job_descriptions.title"}
+    for field in ["candidate_name", "uploaded_at"] + fields:
+        flat[field] = f"$job_descriptions.candidates.{field}"
+    pipeline.append({"$project": flat})
+    return jobs_collection.aggregate(pipeline, allowDiskUse=True)
+
+
+def _read_meta(directory: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomically(path: str, write) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class IVFIndex:
+    def __init__(self, dimension: int, nprobe: int = 16):
+        self.dimension = dimension
+        self.nprobe = nprobe
+        self.version = 0
+        self.watermark: Optional[datetime.datetime] = None
+        self.trained_on = 0
+
+        self._centroids = np.zeros((0, dimension), dtype=np.float32)
+        self._base = np.zeros((0, dimension), dtype=np.float16)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._keys: List[Key] = []
+        self._row_of: Dict[Key, int] = {}
+        self._deleted = set()
+        self._delta: Dict[int, Tuple[List[int], List[np.ndarray]]] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def nlist(self) -> int:
+        return len(self._centroids)
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(rows) for rows, _ in self._delta.values())
+
+    def build(self, keys: Sequence[Key], vectors: np.ndarray, nlist: Optional[int] = None) -> None:
+        """Trains the coarse quantizer and lays the vectors out by list"""
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension))
+        # Only the latest vector of a key counts
+        latest = {key: i for i, key in enumerate(keys)}
+        order = sorted(latest.values())
+        keys = [keys[i] for i in order]
+        vectors = vectors[order]
+
+        with stage("ann.build"):
+            centroids = spherical_kmeans(vectors, nlist or default_nlist(len(vectors))) if len(vectors) else self._centroids
+            layout = self._layout(centroids.astype(np.float32), keys, vectors)
+        with self._lock:
+            self._install(*layout, replay_from=None)
+            self.trained_on = len(self._keys)
+
+    @staticmethod
+    def _layout(centroids: np.ndarray, keys: List[Key], vectors: np.ndarray):
+        """(centroids, base, offsets, keys) with the rows grouped by list"""
+        assignments = _assign(vectors, centroids) if len(vectors) else np.zeros(0, dtype=np.int64)
+        layout = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=len(centroids))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return centroids, vectors[layout].astype(np.float16), offsets, [keys[i] for i in layout]
+
+    def _install(self, centroids: np.ndarray, base: np.ndarray, offsets: np.ndarray, keys: List[Key], replay_from: Optional[int]) -> None:
+        """
+        Replaces the layout with one from _layout. With `replay_from`, the
+        vectors added since that row (while the layout was computed outside
+        the lock) are added on top again, so neither they nor the keys they
+        replaced are lost. Call with the lock held.
+        """
+        late = []
+        if replay_from is not None:
+            vector_of = {
+                row: vector
+                for rows, block in self._delta.values()
+                for row, vector in zip(rows, block)
+                if row >= replay_from
+            }
+            late = [
+                (self._keys[row], vector_of[row])
+                for row in range(replay_from, len(self._keys))
+                if self._row_of.get(self._keys[row]) == row
+            ]
+
+        self._centroids = centroids
+        self._base = base
+        self._offsets = offsets
+        self._keys = keys
+        self._row_of = {key: row for row, key in enumerate(self._keys)}
+        self._deleted = set()
+        self._delta = {}
+        for key, vector in late:
+            self._add_locked(key, vector)
+
+    def add(self, key: Key, vector: Sequence[float]) -> bool:
+        """Adds or replaces one vector; returns False if it cannot be indexed"""
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dimension,) or self.nlist == 0:
+            return False
+        vector = normalize_rows(vector).astype(np.float16)
+        with self._lock:
+            self._add_locked(key, vector)
+        return True
+
+    def _add_locked(self, key: Key, vector: np.ndarray) -> None:
+        # The list is chosen under the lock, against the centroids the vector is stored with
+        list_id = int(np.argmax(self._centroids @ vector.astype(np.float32)))
+        previous = self._row_of.get(key)
+        if previous is not None:
+            self._deleted.add(previous)
+        row = len(self._keys)
+        self._keys.append(key)
+        self._row_of[key] = row
+        rows, vectors = self._delta.setdefault(list_id, ([], []))
+        rows.append(row)
+        vectors.append(vector)
+
+    def add_many(self, items: Iterable[Tuple[Key, Sequence[float]]]) -> int:
+        return sum(1 for key, vector in items if self.add(key, vector))
+
+    def _candidates(self, list_ids: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+        rows, blocks = [], []
+        for list_id in list_ids:
+            start, end = int(self._offsets[list_id]), int(self._offsets[list_id + 1])
+            if end > start:
+                rows.append(np.arange(start, end))
+                blocks.append(self._base[start:end])
+            delta = self._delta.get(list_id)
+            if delta:
+                rows.append(np.asarray(delta[0]))
+                blocks.append(np.stack(delta[1]))
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.dimension), dtype=np.float16)
+        return np.concatenate(rows), np.concatenate(blocks)
+
+    def _top(self, rows: np.ndarray, scores: np.ndarray, k: int, allowed=None) -> List[Tuple[Key, float]]:
+        if self._deleted or allowed is not None:
+            keep = np.fromiter(
+                (row not in self._deleted and (allowed is None or allowed(self._keys[row])) for row in rows),
+                dtype=bool, count=len(rows)
+            )
+            rows, scores = rows[keep], scores[keep]
+        k = min(k, len(rows))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self._keys[rows[i]], float(scores[i])) for i in top]
+
+    def search(self, query: Sequence[float], k: int = 10, nprobe: Optional[int] = None, allowed=None) -> List[Tuple[Key, float]]:
+        """Approximate top-k by cosine similarity; `allowed(key)` can filter the results"""
+        query = normalize_rows(np.asarray(query, dtype=np.float32))
+        if query.shape != (self.dimension,) or self.nlist == 0:
+            return []
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+        with self._lock:
+            centroid_scores = self._centroids @ query
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+            rows, vectors = self._candidates(probe)
+            scores = vectors.astype(np.float32) @ query
+            return self._top(rows, scores, k, allowed)
+
+    def exact_search(self, query: Sequence[float], k: int = 10, allowed=None) -> List[Tuple[Key, float]]:
+        """Brute-force top-k over every indexed vector, for recall measurements"""
+        query = normalize_rows(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            rows, vectors = self._candidates(range(self.nlist))
+            scores = vectors.astype(np.float32) @ query
+            return self._top(rows, scores, k, allowed)
+
+    def compact(self) -> None:
+        """
+        Folds the delta into the base layout, dropping replaced vectors;
+        retrains when the index outgrew its centroids. The layout is computed
+        outside the lock; vectors added meanwhile are replayed onto it.
+        """
+        with self._lock:
+            replay_from = len(self._keys)
+            rows, vectors = self._candidates(range(self.nlist))
+            keep = np.fromiter((row not in self._deleted for row in rows), dtype=bool, count=len(rows))
+            rows, vectors = rows[keep], np.asarray(vectors[keep], dtype=np.float32)
+            keys = [self._keys[row] for row in rows]
+            retrain = len(keys) > 4 * max(self.trained_on, 1) or default_nlist(len(keys)) > 2 * self.nlist
+            centroids = self._centroids
+
+        with stage("ann.build" if retrain else "ann.compact"):
+            if retrain and len(keys):
+                centroids = spherical_kmeans(vectors, default_nlist(len(keys))).astype(np.float32)
+            layout = self._layout(centroids, keys, vectors)
+
+        with self._lock:
+            self._install(*layout, replay_from=replay_from)
+            if retrain:
+                self.trained_on = len(keys)
+
+    def save(self, directory: str) -> None:
+        """
+        Writes a new version. Every save writes files with names of their
+        own and renames them into place when complete, so a file another
+        process has memory-mapped is never rewritten; meta.json goes last.
+        """
+        self.compact()
+        os.makedirs(directory, exist_ok=True)
+        previous = _read_meta(directory)
+        with self._lock:
+            # Rows added since the compaction are still in the delta; the next load picks them up with refresh()
+            centroids, base, offsets = self._centroids, self._base, self._offsets
+            keys = self._keys[:len(base)]
+            version = max(self.version, (previous or {}).get("version", 0)) + 1
+            trained_on, watermark = self.trained_on, self.watermark
+
+        token = f"{version}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        files = {name: f"{name}-{token}.npy" for name in ("centroids", "vectors", "offsets")}
+        for name, array in (("centroids", centroids), ("vectors", base), ("offsets", offsets)):
+            _write_atomically(os.path.join(directory, files[name]), lambda f, array=array: np.save(f, np.asarray(array)))
+        meta = {
+            "version": version,
+            "dimension": self.dimension,
+            "count": len(keys),
+            "trained_on": trained_on,
+            "watermark": watermark.isoformat() if watermark else None,
+            "files": files,
+            "keys": [list(key) for key in keys]
+        }
+        _write_atomically(os.path.join(directory, "meta.json"), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+        self.version = version
+
+        # Readers that read the previous meta.json may still be opening its files; older ones are unreferenced.
+        # Unlinking a file another process has mapped is safe: its pages stay valid until unmapped.
+        keep = set(files.values()) | set(((previous or {}).get("files") or {}).values())
+        for name in os.listdir(directory):
+            if name.endswith(".npy") and name not in keep:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    @classmethod
+    def load(cls, directory: str, nprobe: int = 16) -> Optional["IVFIndex"]:
+        meta = _read_meta(directory)
+        if meta is None:
+            return None
+
+        index = cls(meta["dimension"], nprobe=nprobe)
+        files = meta["files"]
+        index._centroids = np.load(os.path.join(directory, files["centroids"]))
+        index._base = np.load(os.path.join(directory, files["vectors"]), mmap_mode="r")
+        index._offsets = np.load(os.path.join(directory, files["offsets"]))
+        index._keys = [tuple(key) for key in meta["keys"]]
+        index._row_of = {key: row for row, key in enumerate(index._keys)}
+        index.version = meta["version"]
+        index.trained_on = meta.get("trained_on", len(index._keys))
+        if meta.get("watermark"):
+            index.watermark = datetime.datetime.fromisoformat(meta["watermark"])
+        return index
+
+
+class CandidateSearchIndex:
+    """
+    The talent-pool index used by the API: built from Mongo on first use (or
+    loaded from disk), fed by upload_resume, and caught up with candidates
+    written by other workers every `refresh_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        connection_string: Optional[str] = None,
+        directory: str = "ann_index",
+        nprobe: int = 16,
+        refresh_interval: float = 30.0,
+        save_every: int = 500
+    ):
+        self.connection_string = connection_string
+        self.directory = directory
+        self.nprobe = nprobe
+        self.refresh_interval = refresh_interval
+        self.save_every = save_every
+
+        self.index: Optional[IVFIndex] = None
+        self._refreshed_at = 0.0
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        self._saving = threading.Lock()
+        self._writer_lock = None
+
+    def _candidate_vectors(self, since: Optional[datetime.datetime] = None):
+        return candidate_documents(get_database(self.connection_string)['jobs'], ["embeddings"], since=since)
+
+    def _build_from_mongo(self) -> Optional[IVFIndex]:
+        keys, vectors, watermark = [], [], None
+        dimension = None
+        for doc in self._candidate_vectors():
+            vector = doc.get("embeddings") or []
+            if not vector or not doc.get("candidate_name"):
+                continue
+            dimension = dimension or len(vector)
+            if len(vector) != dimension:
+                continue
+            keys.append((doc["job_role"], doc["job_title"], doc["candidate_name"]))
+            vectors.append(vector)
+            if doc.get("uploaded_at") and (watermark is None or doc["uploaded_at"] > watermark):
+                watermark = doc["uploaded_at"]
+        if not keys:
+            return None
+
+        index = IVFIndex(dimension, nprobe=self.nprobe)
+        index.build(keys, np.asarray(vectors, dtype=np.float32))
+        index.watermark = watermark
+        logger.info(f"Built candidate search index over {len(keys)} resumes in {index.nlist} lists")
+        return index
+
+    def ensure_loaded(self) -> Optional[IVFIndex]:
+        with self._lock:
+            if self.index is None:
+                with stage("ann.load"):
+                    self.index = IVFIndex.load(self.directory, nprobe=self.nprobe)
+                if self.index is None:
+                    self.index = self._build_from_mongo()
+                    if self.index is not None:
+                        self._save_locked()
+                # Whatever was written since the saved watermark is picked up below
+                self._refreshed_at = 0.0
+            index = self.index
+        if index is not None:
+            self.refresh()
+        return self.index
+
+    def refresh(self, force: bool = False) -> int:
+        """Adds candidates uploaded (by any worker or tool) since the watermark"""
+        index = self.index
+        if index is None or (not force and time.monotonic() - self._refreshed_at < self.refresh_interval):
+            return 0
+        self._refreshed_at = time.monotonic()
+        added = 0
+        watermark = index.watermark
+        with stage("ann.refresh"):
+            for doc in self._candidate_vectors(since=watermark):
+                key = (doc["job_role"], doc["job_title"], doc["candidate_name"])
+                if index.add(key, doc.get("embeddings") or []):
+                    added += 1
+                uploaded_at = doc.get("uploaded_at")
+                if uploaded_at and (index.watermark is None or uploaded_at > index.watermark):
+                    index.watermark = uploaded_at
+        if added:
+            self._note_added(added)
+        return added
+
+    def add(self, job_role: str, job_title: str, candidate_name: str, vector: Sequence[float], uploaded_at: Optional[datetime.datetime] = None) -> None:
+        index = self.index
+        if index is None:
+            # Not built yet: the build (or the next refresh) will include this candidate
+            return
+        if index.add((job_role, job_title, candidate_name), vector):
+            self._note_added(1)
+
+    def _note_added(self, count: int) -> None:
+        self._unsaved += count
+        # Compacting can retrain the quantizer: never on the caller's (event loop) thread
+        if self._unsaved >= self.save_every and self._saving.acquire(blocking=False):
+            threading.Thread(target=self._save_in_background, name="ann-save", daemon=True).start()
+
+    def _save_in_background(self) -> None:
+        try:
+            with self._lock:
+                self._save_locked()
+        finally:
+            self._saving.release()
+
+    def _is_writer(self) -> bool:
+        """
+        Only one process (of the pre-forked workers, say) persists the index:
+        whichever first takes the lock file, until it exits. The others
+        compact in memory and catch up through refresh().
+        """
+        if self._writer_lock is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, "writer.lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._writer_lock = lock_file
+        return True
+
+    def _save_locked(self) -> None:
+        self._unsaved = 0
+        try:
+            if self._is_writer():
+                with stage("ann.save"):
+                    self.index.save(self.directory)
+            else:
+                with stage("ann.compact"):
+                    self.index.compact()
+        except Exception as e:
+            logger.error(f"Could not save candidate search index: {str(e)}")
+
+    def save(self) -> None:
+        if self.index is not None and self._unsaved:
+            with self._lock:
+                self._save_locked()
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int = 20,
+        job_role: Optional[str] = None,
+        job_title: Optional[str] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        index = self.ensure_loaded()
+        if index is None:
+            return []
+        role_key = job_role.lower() if job_role else None
+        title_key = job_title.lower() if job_title else None
+        allowed = None
+        if role_key or title_key:
+            allowed = lambda key: (role_key is None or key[0].lower() == role_key) and (title_key is None or key[1].lower() == title_key)  # noqa: E731
+        # A filter discards results after the probe; look a little deeper to keep the page full
+        with stage("ann.search"):
+            results = index.search(query, k=k, nprobe=(nprobe or self.nprobe) * (2 if allowed else 1), allowed=allowed)
+        return [
+            {"job_role": key[0], "job_title": key[1], "candidate_name": key[2], "similarity": round(score, 4)}
+            for key, score in results
+        ]
@@ -0,0 +1,94 @@
+"""
+Recall and latency of the IVF candidate index against exact search.
+
+Builds an index over synthetic clustered embeddings (resumes cluster by skill
+set, so uniform random vectors would flatter neither method), then compares
+recall@k and per-query latency for several nprobe values with brute-force
+search over the same vectors. Also reports the round trip through the
+memory-mapped on-disk format.
+
+    python benchmarks/ann_recall.py --vectors 50000 --dimension 384 --queries 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ann_index import IVFIndex  # noqa: E402
+from vector_utils import normalize_rows  # noqa: E402
+
+
+def clustered_vectors(count: int, dimension: int, clusters: int, spread: float, rng) -> np.ndarray:
+    centers = normalize_rows(rng.standard_normal((clusters, dimension)).astype(np.float32))
+    labels = rng.integers(0, clusters, count)
+    noise = rng.standard_normal((count, dimension)).astype(np.float32) * spread / np.sqrt(dimension)
+    return normalize_rows(centers[labels] + noise)
+
+
+def timed(func, queries):
+    results, samples = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(func(query))
+        samples.append(time.perf_counter() - started)
+    return results, samples
+
+
+def recall(approximate, exact) -> float:
+    hits = sum(len({key for key, _ in a} & {key for key, _ in e}) for a, e in zip(approximate, exact))
+    return hits / max(sum(len(e) for e in exact), 1)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200, help="skill clusters in the synthetic data")
+    parser.add_argument("--spread", type=float, default=1.5, help="noise around each cluster centre")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = clustered_vectors(args.vectors, args.dimension, args.clusters, args.spread, rng)
+    queries = clustered_vectors(args.queries, args.dimension, args.clusters, args.spread, rng)
+    keys = [("Role", f"Title {i % 50}", f"Candidate {i}") for i in range(args.vectors)]
+
+    index = IVFIndex(args.dimension)
+    started = time.perf_counter()
+    index.build(keys, vectors)
+    print(f"{args.vectors} x {args.dimension} vectors, {index.nlist} lists, built in {time.perf_counter() - started:.1f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        index.save(directory)
+        saved = time.perf_counter() - started
+        started = time.perf_counter()
+        index = IVFIndex.load(directory)
+        print(f"saved in {saved * 1000:.0f} ms, memory-mapped load in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        # Exact search over the same float16 vectors, so recall measures only the probing
+        exact, exact_samples = timed(lambda q: index.exact_search(q, args.k), queries)
+        exact_ms = statistics.median(exact_samples) * 1000
+        print(f"{'method':<14} {'recall@' + str(args.k):>10} {'median ms':>10} {'p95 ms':>8} {'speedup':>8}")
+        print(f"{'exact':<14} {1.0:>10.3f} {exact_ms:>10.2f} {np.percentile(exact_samples, 95) * 1000:>8.2f} {'x1.0':>8}")
+
+        for nprobe in args.nprobe:
+            approximate, samples = timed(lambda q: index.search(q, args.k, nprobe=nprobe), queries)
+            median = statistics.median(samples) * 1000
+            print(
+                f"{'nprobe=' + str(nprobe):<14} {recall(approximate, exact):>10.3f} {median:>10.2f} "
+                f"{np.percentile(samples, 95) * 1000:>8.2f} {'x' + format(exact_ms / median, '.1f'):>8}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
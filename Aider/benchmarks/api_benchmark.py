@@ -0,0 +1,350 @@
+"""
+Offline benchmark and load test for the Recruitment Analyzer API.
+
+Drives the FastAPI app in-process (httpx ASGI transport) against a local Mongo
+stand-in, a fake LLM with configurable latency and a fake GitHub server, after
+seeding synthetic roles, JDs and candidates. Reports p50/p95/p99 latency and
+throughput per endpoint and can save or compare against a baseline.
+
+    pip install -r benchmarks/requirements.txt
+    python benchmarks/api_benchmark.py --candidates 10000 --requests 200 --save-baseline benchmarks/baseline.json
+    python benchmarks/api_benchmark.py --candidates 10000 --requests 200 --compare benchmarks/baseline.json
+
+mongomock does not implement the array filters /analysis/store writes with, and
+the fake runs the upload pipeline under one process-wide lock, so the "write"
+scenario refuses to run without --mongo-uri pointing at a throwaway local mongod (e.g. `docker run -p 27017:27017 mongo`). The
+database is dropped first. Any failed request, including a 200 whose body has
+"status": "error", fails the run instead of being timed as throughput.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fakes  # noqa: E402
+
+SKILLS = [
+    "python", "java", "go", "rust", "kubernetes", "docker", "aws", "gcp", "azure", "react",
+    "typescript", "postgresql", "mongodb", "redis", "kafka", "spark", "terraform", "fastapi",
+    "django", "pytorch", "tensorflow", "graphql", "linux", "ci/cd", "microservices", "sql"
+]
+FIRST_NAMES = ["Alex", "Sam", "Priya", "Chen", "Maria", "Omar", "Lena", "Ravi", "Jonas", "Aiko", "Noah", "Fatima"]
+LAST_NAMES = ["Smith", "Patel", "Garcia", "Nguyen", "Kim", "Muller", "Rossi", "Khan", "Silva", "Brown", "Ito", "Okafor"]
+ROLES = ["Backend", "Frontend", "Data", "Platform", "Mobile", "Security", "Machine Learning", "QA"]
+
+
+def synthetic_resume(rng: random.Random, name: str, github_links: List[str] = ()) -> str:
+    skills = rng.sample(SKILLS, 8)
+    years = rng.randint(1, 15)
+    lines = [
+        name,
+        f"{name.split()[0].lower()}@example.com | +1 555 {rng.randint(1000, 9999)}",
+        *(f"GitHub: {link}" for link in github_links),
+        "",
+        "Experience",
+        f"Senior engineer with {years} years of experience building {skills[0]} and {skills[1]} systems.",
+    ]
+    for job in range(rng.randint(2, 5)):
+        lines.append(f"Company {rng.randint(1, 500)}: delivered {skills[job % 8]} services, improved latency by {rng.randint(10, 80)}%.")
+    lines += ["", "Skills", ", ".join(skills), "", "Education", "BSc Computer Science"]
+    return "\n".join(lines)
+
+
+def synthetic_jd(rng: random.Random, role: str, title: str) -> str:
+    skills = rng.sample(SKILLS, 6)
+    return (
+        f"{title}\n\nWe are hiring a {title} for our {role} team.\n\n"
+        f"Requirements\nExperience with {', '.join(skills)}.\n"
+        f"{rng.randint(2, 8)}+ years of professional experience.\n"
+    )
+
+
+def synthetic_github_links(rng: random.Random, name: str) -> List[str]:
+    # fetch_readme rewrites github.com onto GITHUB_RAW_BASE_URL, i.e. the fake GitHub server
+    user = "".join(name.split()).lower()
+    return [f"https://github.com/{user}/{rng.choice(SKILLS).replace('/', '-')}-project-{k}" for k in range(rng.randint(1, 3))]
+
+
+def seed(client, roles: int, jds_per_role: int, candidates: int, seed_value: int, github_share: float = 0.3) -> Dict[str, List[str]]:
+    """
+    Writes synthetic data straight into the jobs collection and returns lookup
+    keys for the requests; `github_share` of the candidates link repositories
+    """
+    from document_parser import DocumentParser
+    from vector_utils import pack_matrix
+    from candidate_summaries import CandidateSummaryStore
+    from mongo_connection import DATABASE_NAME
+
+    rng = random.Random(seed_value)
+    parser = DocumentParser()
+    db = client[DATABASE_NAME]
+    db["jobs"].drop()
+    db["candidate_summaries"].drop()
+
+    role_names = [ROLES[i % len(ROLES)] + (f" {i // len(ROLES)}" if i >= len(ROLES) else "") for i in range(roles)]
+    per_jd = max(1, candidates // max(1, roles * jds_per_role))
+    keys = {"roles": role_names, "titles": [], "candidates": [], "github_candidates": []}
+
+    for role in role_names:
+        jds = []
+        for j in range(jds_per_role):
+            title = f"{role} Engineer {j + 1}"
+            text = synthetic_jd(rng, role, title)
+            pooled, chunks = parser.embed_document(text)
+            jd_candidates = []
+            for c in range(per_jd):
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {len(keys['candidates'])}"
+                github_links = synthetic_github_links(rng, name) if rng.random() < github_share else []
+                resume = synthetic_resume(rng, name, github_links)
+                vector, matrix = parser.embed_document(resume)
+                jd_candidates.append({
+                    "candidate_name": name,
+                    "resume_content": resume,
+                    "embeddings": vector.tolist(),
+                    "chunk_embeddings": pack_matrix(matrix),
+                    "github_links": github_links,
+                    "uploaded_at": datetime.datetime.utcnow(),
+                    "analysis": {"analyses": [{"type": "candidate_analysis", "content": fakes.FAKE_ANALYSIS}]}
+                })
+                keys["candidates"].append(name)
+                if github_links:
+                    keys["github_candidates"].append((role, title, name))
+            jds.append({
+                "title": title,
+                "location": "Remote",
+                "job_description": text,
+                "embeddings": pooled.tolist(),
+                "chunk_embeddings": pack_matrix(chunks),
+                "created_at": datetime.datetime.utcnow(),
+                "candidates": jd_candidates
+            })
+            keys["titles"].append((role, title))
+        db["jobs"].insert_one({"job_role": role, "job_descriptions": jds})
+
+    # The API keeps its listing collection in step on writes; seeded data bypasses it
+    CandidateSummaryStore(db).backfill(db["jobs"])
+    return keys
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def failed(response) -> bool:
+    """An HTTP error (404 aside), or a 200 whose body reports one: the upload and analysis routes do that"""
+    if response.status_code >= 400:
+        return response.status_code != 404
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get("status") == "error"
+
+
+async def run_endpoint(client, name: str, make_request, requests: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - started)
+            if failed(response):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "throughput_rps": round(requests / wall, 1) if wall else 0.0
+    }
+
+
+def read_scenario(keys) -> Dict[str, object]:
+    rng = random.Random(7)
+    roles = keys["roles"]
+    titles = keys["titles"]
+    candidates = keys["candidates"]
+
+    def ranking(c, i):
+        role, title = rng.choice(titles)
+        return c.get(f"/jobs/{role}/{title}/ranking", params={"page_size": 20})
+
+    return {
+        "GET /job/roles": lambda c, i: c.get("/job/roles"),
+        "GET /jobs/titles/all": lambda c, i: c.get("/jobs/titles/all"),
+        "GET /jobs/titles/{role}": lambda c, i: c.get(f"/jobs/titles/{rng.choice(roles)}"),
+        "GET /jobs/{job_role}": lambda c, i: c.get(f"/jobs/{rng.choice(roles)}"),
+        "GET /candidates/all": lambda c, i: c.get("/candidates/all"),
+        "GET /candidates/role/{job_role}": lambda c, i: c.get(f"/candidates/role/{rng.choice(roles)}"),
+        "GET /candidates/{candidate_name}": lambda c, i: c.get(f"/candidates/{rng.choice(candidates)}"),
+        "GET /jobs/{role}/{title}/ranking": ranking,
+    }
+
+
+def write_scenario(keys) -> Dict[str, object]:
+    rng = random.Random(11)
+    titles = keys["titles"]
+    linked = keys["github_candidates"]
+
+    def upload(c, i):
+        role, title = rng.choice(titles)
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} Upload{i}"
+        body = synthetic_resume(rng, name).encode()
+        return c.post(
+            "/jobs/upload-resume/file",
+            data={"job_role": role, "job_title": title},
+            files={"file": (f"resume-{i}.txt", body, "text/plain")}
+        )
+
+    def analyze(c, i):
+        # Fetches the candidate's READMEs from the fake GitHub server
+        role, title, name = rng.choice(linked)
+        return c.post("/analysis/store", params={"job_role": role, "job_title": title, "candidate_name": name})
+
+    scenario = {"POST /jobs/upload-resume/file": upload}
+    if linked:
+        scenario["POST /analysis/store (GitHub links)"] = analyze
+    return scenario
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    client = fakes.install(
+        mongo_uri=args.mongo_uri,
+        llm_latency=args.llm_latency_ms / 1000,
+        github_latency=args.github_latency_ms / 1000,
+        real_embeddings=args.real_embeddings
+    )
+    keys = seed(client, args.roles, args.jds_per_role, args.candidates, args.seed, args.github_share)
+
+    import main
+    scenarios = {}
+    if args.scenario in ("read", "all"):
+        scenarios.update(read_scenario(keys))
+    if args.scenario in ("write", "all"):
+        scenarios.update(write_scenario(keys))
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as http:
+        for name, make_request in scenarios.items():
+            if args.endpoint and not any(pattern in name for pattern in args.endpoint):
+                continue
+            # Endpoints print debug output; keep it out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                await run_endpoint(http, name, make_request, min(args.warmup, args.requests), args.concurrency)
+                results[name] = await run_endpoint(http, name, make_request, args.requests, args.concurrency)
+    results["_meta"] = {
+        "candidates": len(keys["candidates"]),
+        "github_candidates": len(keys["github_candidates"]),
+        "roles": args.roles,
+        "jds_per_role": args.jds_per_role,
+        "concurrency": args.concurrency,
+        "llm_calls": fakes.llm_calls()
+    }
+    return results
+
+
+def print_report(results: Dict[str, Dict[str, float]]) -> None:
+    columns = ["requests", "errors", "p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+    width = max(len(name) for name in results)
+    print(f"{'endpoint':<{width}}  " + "  ".join(f"{column:>14}" for column in columns))
+    for name, row in results.items():
+        if name.startswith("_"):
+            continue
+        print(f"{name:<{width}}  " + "  ".join(f"{row[column]:>14}" for column in columns))
+    print(json.dumps(results["_meta"]))
+
+
+def compare(results, baseline, tolerance: float) -> List[str]:
+    regressions = []
+    for name, row in results.items():
+        if name.startswith("_") or name not in baseline:
+            continue
+        before = baseline[name]
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if before[metric] > 0 and row[metric] > before[metric] * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {before[metric]} -> {row[metric]}")
+        if before["throughput_rps"] > 0 and row["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name} throughput_rps: {before['throughput_rps']} -> {row['throughput_rps']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=["read", "write", "all"], default="read")
+    parser.add_argument("--endpoint", action="append", help="Only run endpoints containing this text (repeatable)")
+    parser.add_argument("--roles", type=int, default=4)
+    parser.add_argument("--jds-per-role", type=int, default=3)
+    parser.add_argument("--candidates", type=int, default=1000, help="Total seeded candidates (10 to 100000)")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=200)
+    parser.add_argument("--github-latency-ms", type=float, default=50)
+    parser.add_argument("--github-share", type=float, default=0.3, help="Share of seeded candidates with GitHub links")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use the real SentenceTransformer model")
+    parser.add_argument("--mongo-uri", help="Use this (throwaway) MongoDB instead of mongomock")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save-baseline", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with a baseline JSON file and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    args = parser.parse_args()
+    if args.scenario in ("write", "all") and not args.mongo_uri:
+        parser.error("the write scenario needs --mongo-uri: mongomock cannot run array filters and serializes the upload pipeline")
+
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    # Timings of failing requests measure the error path, not the endpoint
+    failing = {name: row["errors"] for name, row in results.items() if not name.startswith("_") and row["errors"]}
+    if failing:
+        for name, errors in failing.items():
+            print(f"FAIL: {name}: {errors} of {results[name]['requests']} requests failed", file=sys.stderr)
+        return 1
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
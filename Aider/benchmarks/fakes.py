@@ -0,0 +1,264 @@
+"""
+Stand-ins for the external services of the API, used by the benchmarks.
+
+- Mongo: mongomock (in-process) or a real local mongod via a connection string
+- LLM: a Groq-compatible client that sleeps for a configurable latency
+- Embeddings: a deterministic hashed bag-of-words model with the MiniLM interface
+- GitHub: a local HTTP server that serves a README for every repository
+
+install() must run before main.py (or any module that imports pymongo) is imported.
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+AIDER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAKE_ANALYSIS = """## Candidate Summary
+Experienced engineer with a track record of shipping backend services.
+
+## Skills Assessment
+Strong Python and cloud skills.
+
+## Score
+78
+"""
+
+FAKE_README = """# Demo project
+A service written in Python with FastAPI, PostgreSQL and Docker.
+"""
+
+
+class FakeEmbeddingModel:
+    """Hashed bag-of-words vectors: deterministic, cheap, and similar texts stay similar"""
+
+    dimension = 384
+    _word = re.compile(r"[a-z0-9+#]+")
+
+    def __init__(self, name: str = "fake", *args, **kwargs):
+        self.name = name
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in self._word.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=4).digest()
+            index = int.from_bytes(digest[:3], "little") % self.dimension
+            vector[index] += 1.0 if digest[3] & 1 else -1.0
+        return vector
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, convert_to_numpy: bool = True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        matrix = np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dimension), np.float32)
+        if normalize_embeddings and len(matrix):
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix = matrix / norms
+        return matrix[0] if single else matrix
+
+
+class _Usage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+
+class _Message:
+    def __init__(self, content: str):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content: str):
+        self.message = _Message(content)
+
+
+class _Completion:
+    def __init__(self, content: str, prompt: str):
+        self.choices = [_Choice(content)]
+        self.usage = _Usage(len(prompt) // 4, len(content) // 4)
+
+
+class _Completions:
+    latency = 0.0
+    calls = 0
+    _lock = threading.Lock()
+    _name = re.compile(r"^\s*([A-Z][a-z]+ [A-Z][a-z]+)", re.MULTILINE)
+
+    def create(self, messages, model: str = "", **kwargs):
+        with self._lock:
+            _Completions.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt = messages[-1]["content"]
+        if "full name of the candidate" in prompt:
+            resume = prompt.split("resume text:", 1)[-1]
+            match = self._name.search(resume)
+            content = match.group(1) if match else "Unknown Candidate"
+        elif "Job Title" in prompt:
+            content = "Software Engineer"
+        else:
+            content = FAKE_ANALYSIS
+        return _Completion(content, prompt)
+
+
+class FakeGroq:
+    def __init__(self, *args, **kwargs):
+        self.chat = types.SimpleNamespace(completions=_Completions())
+
+
+class _ReadmeHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        body = FAKE_README.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_github_server(latency: float = 0.0) -> ThreadingHTTPServer:
+    _ReadmeHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ReadmeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GITHUB_RAW_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+    return server
+
+
+def _patch_mongomock_pipelines() -> None:
+    """
+    Update pipelines (and the expression projections that go with them), which
+    mongomock lacks, evaluated with its aggregation engine: the candidate
+    upserts in data_storage run unchanged against the stand-in
+    """
+    from mongomock import aggregate
+    from mongomock.collection import Collection
+    from pymongo import ReturnDocument
+
+    if getattr(Collection, "_pipelines", False):
+        return
+
+    def merge_objects(values):
+        return aggregate._merge_objects_operation(values)
+
+    def index_of_array(values):
+        array, value = values[0], values[1]
+        start, end = (list(values[2:4]) + [0, None])[:2] if len(values) > 2 else (0, None)
+        if array is None:
+            return None
+        return next((i for i in range(start, len(array) if end is None else min(end, len(array))) if array[i] == value), -1)
+
+    def not_(values):
+        # mongomock negates the argument list itself, which is always truthy
+        return values[0] in (None, False, 0)
+
+    operators = {"$mergeObjects": merge_objects, "$indexOfArray": index_of_array, "$not": not_}
+    parse = aggregate._Parser.parse
+
+    def parse_with_operators(self, expression):
+        if isinstance(expression, dict) and len(expression) == 1 and next(iter(expression)) in operators:
+            operator, values = next(iter(expression.items()))
+            return operators[operator](list(self.parse_many(values if isinstance(values, list) else [values])))
+        return parse(self, expression)
+
+    find_one_and_update = Collection.find_one_and_update
+    lock = threading.RLock()
+
+    def pipeline_find_one_and_update(self, filter, update, projection=None, sort=None, upsert=False,
+                                     return_document=ReturnDocument.BEFORE, **kwargs):
+        if not isinstance(update, list):
+            return find_one_and_update(self, filter, update, projection=projection, sort=sort, upsert=upsert,
+                                       return_document=return_document, **kwargs)
+        # One lock for the read-modify-write, as the server applies a pipeline atomically
+        with lock:
+            doc = self.find_one(filter, sort=sort)
+            if doc is None:
+                return None
+            match = [{"$match": {"_id": doc["_id"]}}]
+            project = [{"$project": projection}] if projection else []
+            before = next(self.aggregate(match + project))
+            self.replace_one({"_id": doc["_id"]}, next(self.aggregate(match + update)))
+            if return_document == ReturnDocument.AFTER:
+                return next(self.aggregate(match + project))
+            return before
+
+    aggregate._Parser.parse = parse_with_operators
+    Collection.find_one_and_update = pipeline_find_one_and_update
+    Collection._pipelines = True
+
+
+def _patch_mongomock_bulk() -> None:
+    # Newer pymongo passes arguments (sort=...) that mongomock's bulk builder does not know
+    from mongomock.collection import BulkOperationBuilder
+
+    if getattr(BulkOperationBuilder, "_tolerant", False):
+        return
+    add_update = BulkOperationBuilder.add_update
+
+    def tolerant_add_update(self, selector, doc, multi=False, upsert=False, collation=None, array_filters=None, hint=None, **kwargs):
+        return add_update(self, selector, doc, multi, upsert, collation=collation, array_filters=array_filters, hint=hint)
+
+    BulkOperationBuilder.add_update = tolerant_add_update
+    BulkOperationBuilder._tolerant = True
+
+
+def install(mongo_uri: str = None, llm_latency: float = 0.0, github_latency: float = 0.0, real_embeddings: bool = False):
+    """Patches the external services and returns the Mongo client the app will use"""
+    if AIDER_DIR not in sys.path:
+        sys.path.insert(0, AIDER_DIR)
+
+    os.environ["GROQ_API_KEY"] = "benchmark"
+    os.environ["EMBEDDING_WARMUP"] = "1"
+    # Queueing inside a load test makes every request "slow"; keep the log readable
+    os.environ.setdefault("SLOW_REQUEST_SECONDS", "3600")
+
+    if mongo_uri:
+        import pymongo
+        client = pymongo.MongoClient(mongo_uri)
+    else:
+        import mongomock
+        import pymongo
+        _patch_mongomock_bulk()
+        _patch_mongomock_pipelines()
+        client = mongomock.MongoClient()
+        # Every RecruitmentDataStorage/DataHandle opens its own client; hand them all the same store
+        pymongo.MongoClient = lambda *args, **kwargs: client
+        mongo_uri = "mongodb://mongomock"
+    os.environ["MONGODB_CONNECTION_STRING"] = mongo_uri
+    os.environ["MONGODB_URI"] = mongo_uri
+
+    _Completions.latency = llm_latency
+    groq_module = sys.modules.get("groq") or types.ModuleType("groq")
+    groq_module.Groq = FakeGroq
+    sys.modules["groq"] = groq_module
+
+    if not real_embeddings:
+        fake_st = types.ModuleType("sentence_transformers")
+        fake_st.SentenceTransformer = FakeEmbeddingModel
+        sys.modules["sentence_transformers"] = fake_st
+
+    start_github_server(github_latency)
+    return client
+
+
+def llm_calls() -> int:
+    return _Completions.calls
@@ -0,0 +1,72 @@
+"""
+Import-time regression guard for the API process.
+
+Imports main.py in a fresh interpreter several times, reports the median wall
+time and fails when it exceeds the budget or when any heavy dependency gets
+imported eagerly again.
+
+    python benchmarks/import_time.py --budget 1.5 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+AIDER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when a request actually needs them
+HEAVY_MODULES = ["torch", "sentence_transformers", "scipy", "fitz", "PyPDF2", "docx", "groq"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {heavy!r} if m in sys.modules]
+}}))
+"""
+
+
+def measure_once() -> dict:
+    env = dict(os.environ, EMBEDDING_WARMUP="0")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES)],
+        cwd=AIDER_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET", "1.5")),
+                        help="Maximum median import time of main.py in seconds")
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    median = statistics.median(sample["seconds"] for sample in samples)
+    heavy = sorted({module for sample in samples for module in sample["heavy"]})
+
+    print(f"import main: median {median * 1000:.0f} ms over {args.runs} runs (budget {args.budget * 1000:.0f} ms)")
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget:
+        print("FAIL: import time is over budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
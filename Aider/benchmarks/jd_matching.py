@@ -0,0 +1,44 @@
+"""
+Per-upload cost of cross-JD matching against the cached JD matrix.
+
+    python benchmarks/jd_matching.py --jds 5000 --dimension 384
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from jd_matching import JDMatrix  # noqa: E402
+from vector_utils import normalize_rows  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jds", type=int, default=5000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--uploads", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(5)
+    keys = [(f"Role {i % 100}", f"Title {i}", "Remote") for i in range(args.jds)]
+    jd_matrix = JDMatrix(keys, normalize_rows(rng.standard_normal((args.jds, args.dimension)).astype(np.float32)))
+    resumes = rng.standard_normal((args.uploads, args.dimension)).astype(np.float32)
+
+    samples = []
+    for i, resume in enumerate(resumes):
+        started = time.perf_counter()
+        jd_matrix.top_k(normalize_rows(resume), args.k, exclude=jd_matrix.index_of(*keys[i % args.jds][:2]), min_similarity=-1.0)
+        samples.append(time.perf_counter() - started)
+
+    print(f"{args.jds} JDs x {args.dimension}: median {statistics.median(samples) * 1000:.3f} ms, "
+          f"p99 {np.percentile(samples, 99) * 1000:.3f} ms per upload, matrix {jd_matrix.matrix.nbytes / 1e6:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Serialization benchmark for large role documents.
+
+Compares the response paths the API used before FastJSONResponse with the
+single-pass encoder (orjson, and the standard library fallback):
+
+- storage: recursive _convert_mongodb_doc copy, then JSONResponse
+- data_handle: json.loads(json.dumps(doc, cls=JsonEncoder)) round trip, then JSONResponse
+- fast: FastJSONResponse straight from the driver document
+
+    python benchmarks/json_serialization.py --candidates 500 --repeat 20
+"""
+import argparse
+import base64
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+from bson import Binary, ObjectId
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import json_response  # noqa: E402
+from json_response import FastJSONResponse  # noqa: E402
+from vector_utils import pack_matrix  # noqa: E402
+
+
+def build_role_document(candidates: int, dimension: int, chunks: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    words = ["python", "kafka", "kubernetes", "design", "lead", "team", "shipping", "services", "data", "cloud"]
+    text = lambda n: " ".join(random.Random(seed + n).choice(words) for _ in range(n))  # noqa: E731
+    now = datetime.datetime.utcnow()
+
+    def vector():
+        return rng.standard_normal(dimension).astype(np.float32).tolist()
+
+    def packed():
+        packed = pack_matrix(rng.standard_normal((chunks, dimension)).astype(np.float32))
+        packed["data"] = Binary(packed["data"])
+        return packed
+
+    return {
+        "_id": ObjectId(),
+        "job_role": "Backend",
+        "job_descriptions": [{
+            "title": "Backend Engineer",
+            "location": "Remote",
+            "job_description": text(400),
+            "embeddings": vector(),
+            "chunk_embeddings": packed(),
+            "created_at": now,
+            "candidates": [{
+                "candidate_name": f"Candidate {i}",
+                "resume_content": text(600),
+                "embeddings": vector(),
+                "chunk_embeddings": packed(),
+                "github_links": [f"https://github.com/user{i}/project"],
+                "uploaded_at": now,
+                "analysis": {"analyses": [{"type": "candidate_analysis", "content": text(500)}]}
+            } for i in range(candidates)]
+        }]
+    }
+
+
+# The pre-FastJSONResponse paths, kept here only for comparison
+
+def _convert_mongodb_doc(doc):
+    doc_copy = doc.copy()
+    for key, value in doc_copy.items():
+        if key == "_id":
+            doc_copy[key] = str(value)
+        elif isinstance(value, datetime.datetime):
+            doc_copy[key] = value.isoformat()
+        elif isinstance(value, bytes):
+            doc_copy[key] = base64.b64encode(value).decode('ascii')
+        elif isinstance(value, list):
+            doc_copy[key] = [_convert_mongodb_doc(item) if isinstance(item, dict) else item for item in value]
+        elif isinstance(value, dict):
+            doc_copy[key] = _convert_mongodb_doc(value)
+    return doc_copy
+
+
+class JsonEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, ObjectId):
+            return str(obj)
+        if isinstance(obj, datetime.datetime):
+            return obj.isoformat()
+        if isinstance(obj, bytes):
+            return base64.b64encode(obj).decode('ascii')
+        return super().default(obj)
+
+
+def storage_path(doc) -> bytes:
+    return JSONResponse(content={"status": "success", "data": _convert_mongodb_doc(doc)}).body
+
+
+def data_handle_path(doc) -> bytes:
+    return JSONResponse(content={"status": "success", "data": json.loads(json.dumps(doc, cls=JsonEncoder))}).body
+
+
+def fast_path(doc) -> bytes:
+    return FastJSONResponse(content={"status": "success", "data": doc}).body
+
+
+def stdlib_fast_path(doc) -> bytes:
+    body = json.dumps(
+        {"status": "success", "data": doc},
+        default=json_response.encode_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    return body
+
+
+def measure(func, doc, repeat: int):
+    func(doc)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func(doc)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), min(samples), body
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--chunks", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    doc = build_role_document(args.candidates, args.dimension, args.chunks, args.seed)
+    paths = [
+        ("storage (_convert_mongodb_doc)", storage_path),
+        ("data_handle (json round trip)", data_handle_path),
+        ("FastJSONResponse (stdlib fallback)", stdlib_fast_path),
+        (f"FastJSONResponse ({'orjson' if json_response.orjson else 'stdlib'})", fast_path),
+    ]
+
+    print(f"Role document with {args.candidates} candidates, {args.dimension}-d embeddings, {args.chunks} chunks each")
+    print(f"{'path':<38} {'median ms':>10} {'min ms':>10} {'MB':>8}")
+    reference = None
+    baseline = None
+    for name, func in paths:
+        median, fastest, body = measure(func, doc, args.repeat)
+        parsed = json.loads(body)
+        if reference is None:
+            reference = parsed
+        elif parsed != reference:
+            # Float formatting may differ in the last digit between encoders
+            same_shape = len(parsed["data"]["job_descriptions"][0]["candidates"]) == len(reference["data"]["job_descriptions"][0]["candidates"])
+            print(f"  note: {name} output differs from the storage path{' in number formatting only' if same_shape else ''}")
+        baseline = baseline or median
+        print(f"{name:<38} {median * 1000:>10.1f} {fastest * 1000:>10.1f} {len(body) / 1e6:>8.2f}   x{baseline / median:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Build cost, postings size and query latency of the BM25 resume index.
+
+Resumes are synthesized from a Zipf-distributed vocabulary with a sprinkling
+of skill terms, so common words have long postings lists and skills are
+rare, as in real resumes.
+
+    python benchmarks/keyword_search.py --resumes 100000 --words 400
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from keyword_index import BM25Index  # noqa: E402
+
+SKILLS = ["kubernetes", "rust", "c++", "golang", "kafka", "terraform", "react", "node.js", "pytorch", "spark",
+          "postgresql", "graphql", "c#", "scala", "airflow", "docker", "aws", "gcp", "django", "ci/cd"]
+QUERIES = ["kubernetes", "rust", "kubernetes terraform aws", "c++ rust golang", "python django postgresql",
+           "react node.js graphql", "experience team project", "spark airflow scala kafka"]
+
+
+def synthetic_resumes(count: int, words: int, vocabulary: int, seed: int):
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"w{i}" for i in range(vocabulary)] + ["python", "experience", "team", "project"])
+    ranks = np.arange(1, len(vocab) + 1, dtype=np.float64)
+    probabilities = 1 / ranks
+    probabilities /= probabilities.sum()
+    # Put the common resume words at the head of the distribution
+    vocab = np.concatenate([vocab[-4:], vocab[:-4]])
+    for i in range(count):
+        tokens = list(vocab[rng.choice(len(vocab), words, p=probabilities)])
+        tokens += list(rng.choice(SKILLS, rng.integers(2, 8), replace=False))
+        yield ("Role %d" % (i % 10), "Title %d" % (i % 40), "Candidate %d" % i), " ".join(tokens)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resumes", type=int, default=100000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--vocabulary", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    index = BM25Index()
+    started = time.perf_counter()
+    for key, text in synthetic_resumes(args.resumes, args.words, args.vocabulary, args.seed):
+        index.add(key, text)
+    built = time.perf_counter() - started
+    print(f"{len(index)} resumes indexed in {built:.1f}s ({built / len(index) * 1e6:.0f} us each), "
+          f"{index.postings_bytes / 1e6:.1f} MB of postings")
+
+    print(f"{'query':<34} {'filter':<10} {'median ms':>10} {'p95 ms':>8}")
+    for query in QUERIES:
+        for label, filters in (("none", {}), ("role", {"job_role": "Role 3"}), ("jd", {"job_role": "Role 3", "job_title": "Title 3"})):
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                index.search(query, k=20, **filters)
+                samples.append(time.perf_counter() - started)
+            print(f"{query:<34} {label:<10} {statistics.median(samples) * 1000:>10.2f} {np.percentile(samples, 95) * 1000:>8.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
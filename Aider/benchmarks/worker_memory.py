@@ -0,0 +1,119 @@
+"""
+Measures startup time and memory of serve.py as a function of worker count.
+
+For every worker count the server is started on a free port, timed until
+/health/ready answers 200, and then the parent and every worker are sampled
+from /proc/<pid>/smaps_rollup. PSS splits shared pages between the processes
+that map them, so "total PSS" is the real memory cost of the deployment;
+compare a run with --no-preload to see what copy-on-write sharing saves.
+Linux only.
+
+    python benchmarks/worker_memory.py --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+AIDER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _children(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def _memory_kb(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].rstrip(":") in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                values[parts[0].rstrip(":")] = int(parts[1])
+    values["Uss"] = values.pop("Private_Clean", 0) + values.pop("Private_Dirty", 0)
+    return values
+
+
+def _wait_ready(port: int, expected_workers: int, parent: int, timeout: float) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=1) as response:
+                if response.status == 200 and len(_children(parent)) >= expected_workers:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"server with {expected_workers} workers not ready after {timeout}s")
+
+
+def measure(workers: int, preload: bool, timeout: float) -> dict:
+    port = _free_port()
+    command = [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    if not preload:
+        command.append("--no-preload")
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=AIDER_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port, workers, process.pid, timeout)
+        startup = time.perf_counter() - started
+        # Ready means one worker answered; give the others a moment to finish warm-up
+        time.sleep(2)
+        parent = _memory_kb(process.pid)
+        children = [_memory_kb(pid) for pid in _children(process.pid)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    total_pss = parent["Pss"] + sum(child["Pss"] for child in children)
+    return {
+        "workers": workers,
+        "preload": preload,
+        "startup_seconds": round(startup, 2),
+        "parent_rss_mb": round(parent["Rss"] / 1024, 1),
+        "worker_rss_mb": round(sum(c["Rss"] for c in children) / max(len(children), 1) / 1024, 1),
+        "worker_uss_mb": round(sum(c["Uss"] for c in children) / max(len(children), 1) / 1024, 1),
+        "total_pss_mb": round(total_pss / 1024, 1),
+        "pss_per_worker_mb": round(total_pss / max(len(children), 1) / 1024, 1)
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--no-preload", action="store_true", help="Measure workers that load their own model")
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--json", action="store_true", help="Print raw JSON rows")
+    args = parser.parse_args()
+
+    rows = [measure(count, not args.no_preload, args.timeout) for count in args.workers]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    columns = ["workers", "startup_seconds", "parent_rss_mb", "worker_rss_mb", "worker_uss_mb", "total_pss_mb", "pss_per_worker_mb"]
+    print(("preload" if not args.no_preload else "no preload") + ":")
+    print("  ".join(f"{column:>17}" for column in columns))
+    for row in rows:
+        print("  ".join(f"{row[column]:>17}" for column in columns))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,497 @@
+"""
+Offline bulk ingestion of a directory of resumes into one JD.
+
+Does what POST /resume/upload does for every .pdf, .docx and .txt file under
+the directory, in batches instead of one request per file:
+
+    parse        a process pool extracts text, GitHub links and the MinHash
+    embed        the chunks of a whole batch go through one model call
+    name         near-duplicates keep the earlier name when it is in the text;
+                 otherwise the LLM (or the file name, with --names filename).
+                 Another person under a name already taken gets the file
+                 name appended; a near-duplicate of an earlier file of
+                 the batch under the same name supersedes it
+    write        one update per batch (bulk_upload_resumes), screened as uploads are
+    analyze      store_analysis for the candidates screening lets through,
+                 behind a shared LLM rate limit
+
+    python bulk_ingest.py resumes/ --job-role Backend --job-title "Backend Engineer"
+    python bulk_ingest.py resumes/ --job-role Backend --job-title "Backend Engineer" --dry-run
+    python bulk_ingest.py resumes/ --job-role Backend --job-title "Backend Engineer" --no-analysis
+
+Progress is checkpointed to a JSON state file (--state), keyed by the SHA-256
+of each file. Interrupting the run (Ctrl-C) saves it; running the same command
+again skips the files already written and only queues the analyses that had
+not finished. Unchanged files are recognised by size and mtime without being
+read again. Files that failed are retried with --retry-failed.
+"""
+import argparse
+import datetime
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger("bulk_ingest")
+
+EXTENSIONS = (".pdf", ".docx", ".txt")
+UNKNOWN_NAME = "Unknown Candidate"
+
+WRITTEN = "written"    # in the JD, analysis still to run
+DONE = "done"          # nothing left to do
+FAILED = "failed"
+
+
+def _parse_file(path: str) -> Dict[str, Any]:
+    """Runs in a worker process: everything about a file that needs no model or database"""
+    from data_storage import RecruitmentDataStorage
+    from document_parser import DocumentParser
+    from fingerprint import minhash_signature
+
+    result = {"path": path, "digest": None, "text": None, "github_links": [], "minhash": None, "error": None}
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+        result["digest"] = hashlib.sha256(content).hexdigest()
+        text, error = DocumentParser().extract_text_from_file(io.BytesIO(content), os.path.basename(path))
+        if isinstance(text, bytes):
+            text = text.decode("utf-8")
+        if error or not text or not text.strip():
+            result["error"] = error or "No content could be extracted from the file"
+            return result
+        result["text"] = text
+        result["minhash"] = minhash_signature(text)
+        if path.lower().endswith(".pdf"):
+            result["github_links"] = RecruitmentDataStorage.extract_github_links(content)
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+class Checkpoint:
+    """
+    The state file: {"job_role", "job_title", "files": {digest: entry},
+    "paths": {path: [size, mtime_ns, digest]}}. Saved atomically, at most
+    every `interval` seconds unless forced.
+    """
+    def __init__(self, path: str, job_role: str, job_title: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self._saved_at = 0.0
+        self.state = {"job_role": job_role, "job_title": job_title, "files": {}, "paths": {}}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if (state.get("job_role", "").lower(), state.get("job_title", "").lower()) != (job_role.lower(), job_title.lower()):
+                raise ValueError(
+                    f"{path} belongs to '{state.get('job_role')}' / '{state.get('job_title')}'; use another --state"
+                )
+            self.state.update(files=state.get("files") or {}, paths=state.get("paths") or {})
+
+    @property
+    def files(self) -> Dict[str, Dict[str, Any]]:
+        return self.state["files"]
+
+    def known_digest(self, path: str) -> Optional[str]:
+        """The digest recorded for the path, if the file has not changed since"""
+        recorded = self.state["paths"].get(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if recorded and recorded[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return recorded[2]
+        return None
+
+    def remember_path(self, path: str, digest: str) -> None:
+        stat = os.stat(path)
+        with self.lock:
+            self.state["paths"][path] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    def mark(self, digest: str, status: str, **fields) -> None:
+        with self.lock:
+            entry = self.files.setdefault(digest, {})
+            entry.update(fields, status=status, updated_at=datetime.datetime.utcnow().isoformat())
+            if status != FAILED:
+                entry.pop("error", None)
+                entry.pop("stage", None)
+        self.save()
+
+    def save(self, force: bool = False) -> None:
+        with self.lock:
+            if not force and time.monotonic() - self._saved_at < self.interval:
+                return
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as f:
+                json.dump(self.state, f, indent=1, sort_keys=True)
+            os.replace(temporary, self.path)
+            self._saved_at = time.monotonic()
+
+    def counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in self.files.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+
+class RateLimiter:
+    """Spaces LLM calls evenly at `per_minute` across threads; 0 disables it"""
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self, permits: int = 1) -> None:
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval * permits
+        if start > now:
+            time.sleep(start - now)
+
+
+def resume_files(directory: str) -> Iterator[str]:
+    for path in sorted(Path(directory).rglob("*")):
+        if path.is_file() and path.suffix.lower() in EXTENSIONS:
+            yield str(path.resolve())
+
+
+def plan(checkpoint: Checkpoint, paths: Iterable[str], retry_failed: bool = False) -> Tuple[List[str], Dict[str, str], int]:
+    """(files to parse, {digest: candidate name} of the analyses to resume, files skipped), from the checkpoint alone"""
+    to_parse, to_analyze, skipped = [], {}, 0
+    for path in paths:
+        digest = checkpoint.known_digest(path)
+        entry = checkpoint.files.get(digest) if digest else None
+        if entry is None or (entry["status"] == FAILED and retry_failed and entry.get("stage") != "analysis"):
+            to_parse.append(path)
+        elif entry["status"] == WRITTEN or (entry["status"] == FAILED and retry_failed):
+            to_analyze[digest] = entry["candidate_name"]
+        else:
+            skipped += 1
+    return to_parse, to_analyze, skipped
+
+
+def claimed_names(checkpoint: Checkpoint) -> Dict[str, str]:
+    """Lowercased candidate name -> path of the file written under it, for the files already ingested"""
+    return {
+        entry["candidate_name"].lower(): entry.get("path")
+        for entry in checkpoint.files.values()
+        if entry["status"] in (WRITTEN, DONE) and entry.get("candidate_name") and not entry.get("superseded_by")
+    }
+
+
+def name_batch(
+    batch: List[Dict[str, Any]],
+    duplicate_index,
+    jd_key: Tuple[str, str],
+    extract_name: Callable[[Dict[str, Any]], str],
+    claimed: Dict[str, str],
+    workers: int = 4
+) -> List[Dict[str, Any]]:
+    """
+    Sets `candidate_name` (and `duplicate_of`) on every parsed file of a
+    batch and returns the files to write.
+
+    A near-duplicate of a stored candidate or of an earlier file in the batch
+    takes that name only when the name appears in its text, like uploads do;
+    the other files get `extract_name` (run in parallel). Signatures go into
+    `duplicate_index` as soon as a file is named. Names must stay unique:
+    a near-duplicate of an earlier file of the batch under the same name is
+    the same person again, and only the later file is written (the earlier
+    one gets `superseded_by`); any other clash with a name of this batch or
+    of `claimed` is another person and gets the file name appended.
+    """
+    from fingerprint import NearDuplicateIndex, name_in_text
+
+    # Near-duplicates inside the batch, by position, before any name is known
+    local = NearDuplicateIndex(threshold=duplicate_index.threshold)
+    earlier: List[List[int]] = []
+    for position, result in enumerate(batch):
+        earlier.append([match for match, _ in local.query(result["minhash"])])
+        local.add(position, result["minhash"])
+
+        matches = duplicate_index.query(result["minhash"])
+        if matches:
+            # Prefer an earlier upload for the same JD, like the upload endpoint
+            same_jd = [m for m in matches if m[0][:2] == jd_key]
+            (role, title, name), similarity = (same_jd or matches)[0]
+            result["duplicate_of"] = {"job_role": role, "job_title": title, "candidate_name": name, "similarity": round(similarity, 3)}
+
+    needs_name = [
+        result for result in batch
+        if not name_in_text((result.get("duplicate_of") or {}).get("candidate_name"), result["text"])
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as naming:
+        extracted = dict(zip(map(id, needs_name), naming.map(extract_name, needs_name)))
+
+    named: Dict[str, int] = {}
+    for position, result in enumerate(batch):
+        duplicate_of = result.get("duplicate_of")
+        name = extracted.get(id(result)) or duplicate_of["candidate_name"]
+        for match in earlier[position]:
+            if name_in_text(batch[match]["candidate_name"], result["text"]):
+                name = batch[match]["candidate_name"]
+                break
+
+        holder = named.get(name.lower())
+        if holder in earlier[position]:
+            # The same person again; the later file wins, as in bulk_upload_resumes
+            batch[holder]["superseded_by"] = result["digest"]
+        elif holder is not None or (
+            claimed.get(name.lower(), result["path"]) != result["path"]
+            and (duplicate_of or {}).get("candidate_name") != name
+        ):
+            name = _unique_name(name, result, named, claimed)
+
+        result["candidate_name"] = name
+        named[name.lower()] = position
+        claimed[name.lower()] = result["path"]
+        duplicate_index.add((jd_key[0], jd_key[1], name), result["minhash"])
+
+    return [result for result in batch if not result.get("superseded_by")]
+
+
+def _unique_name(name: str, result: Dict[str, Any], named: Dict[str, int], claimed: Dict[str, str]) -> str:
+    for candidate in (f"{name} ({Path(result['path']).stem})", f"{name} ({result['digest'][:8]})", f"{name} ({result['digest']})"):
+        if candidate.lower() not in named and candidate.lower() not in claimed:
+            break
+    logger.warning(f"{result['path']}: another resume is already stored as '{name}'; this one is '{candidate}'")
+    return candidate
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--job-role", required=True)
+    parser.add_argument("--job-title", required=True)
+    parser.add_argument("--mongodb-uri", default=os.getenv("MONGODB_CONNECTION_STRING"))
+    parser.add_argument("--state", default="bulk_ingest.state.json", help="checkpoint file")
+    parser.add_argument("--parse-workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--batch-size", type=int, default=32, help="resumes embedded and written together")
+    parser.add_argument("--names", choices=("llm", "filename"), default="llm",
+                        help="where candidate names come from when the resume is not a near-duplicate")
+    parser.add_argument("--llm-calls-per-minute", type=float, default=float(os.getenv("BULK_LLM_CALLS_PER_MINUTE", "30")),
+                        help="shared by name extraction and analyses; 0 for no limit")
+    parser.add_argument("--analysis-workers", type=int, default=2, help="concurrent analyses")
+    parser.add_argument("--no-analysis", action="store_true", help="only write the candidates")
+    parser.add_argument("--no-screening", action="store_true", help="analyze every candidate")
+    parser.add_argument("--retry-failed", action="store_true")
+    parser.add_argument("--limit", type=int, default=None, help="at most this many new files")
+    parser.add_argument("--dry-run", action="store_true", help="only list what would be done")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    try:
+        checkpoint = Checkpoint(args.state, args.job_role, args.job_title)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    to_parse, to_analyze, skipped = plan(checkpoint, resume_files(args.directory), args.retry_failed)
+    if args.limit is not None:
+        to_parse = to_parse[:args.limit]
+    if args.no_analysis:
+        to_analyze = {}
+
+    print(f"{len(to_parse)} files to ingest, {len(to_analyze)} analyses to resume, {skipped} skipped")
+    if args.dry_run:
+        for path in to_parse:
+            print(f"ingest  {path}")
+        for name in to_analyze.values():
+            print(f"analyze {name}")
+        return 0
+
+    from data_storage import RecruitmentDataStorage
+    from document_parser import DocumentParser
+    from fingerprint import NearDuplicateIndex
+    from jd_matching import JDMatcher
+    from screening import LOW_MATCH, ScreeningPolicy
+    from vector_utils import pack_matrix
+
+    storage = RecruitmentDataStorage(args.mongodb_uri)
+    document_parser = DocumentParser()
+    limiter = RateLimiter(args.llm_calls_per_minute)
+    screening = None if args.no_screening or os.getenv("SCREENING_ENABLED", "1") != "1" else ScreeningPolicy(
+        threshold=float(os.getenv("SCREENING_THRESHOLD", "0.35")),
+        top_n=int(os.getenv("SCREENING_TOP_N", "10")),
+        keyword_weight=float(os.getenv("SCREENING_KEYWORD_WEIGHT", "0"))
+    )
+    jd_matcher = JDMatcher(
+        args.mongodb_uri,
+        top_k=int(os.getenv("ALTERNATIVE_MATCHES", "3")),
+        min_similarity=float(os.getenv("ALTERNATIVE_MATCH_MIN_SIMILARITY", "0.3"))
+    ) if os.getenv("ALTERNATIVE_MATCHES", "3") != "0" else None
+    duplicate_index = NearDuplicateIndex(threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85")))
+    duplicate_index.load(storage.iter_candidate_fingerprints())
+    jd_key = (args.job_role.lower(), args.job_title.lower())
+    claimed = claimed_names(checkpoint)
+
+    llm_analyzer = None
+    if args.names == "llm" and to_parse:
+        from llm_analyzer import LLMAnalyzer
+        llm_analyzer = LLMAnalyzer()
+
+    def extract_name(result) -> str:
+        name = UNKNOWN_NAME
+        if llm_analyzer is not None:
+            limiter.acquire()
+            name = llm_analyzer.extract_candidate_name(result["text"])
+        # Every unnamed resume would otherwise overwrite the same candidate
+        return Path(result["path"]).stem if name == UNKNOWN_NAME else name
+
+    analyses = ThreadPoolExecutor(max_workers=max(1, args.analysis_workers))
+    waiting: Dict[str, List[str]] = {}
+    waiting_lock = threading.Lock()
+
+    def analyze(name: str) -> None:
+        with waiting_lock:
+            digests = waiting.pop(name.lower())
+        try:
+            links = max(len(checkpoint.files[digest].get("github_links") or []) for digest in digests)
+            limiter.acquire(1 + links)
+            result = storage.store_analysis(args.job_role, name, args.job_title, force=False)
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+        for digest in digests:
+            if result["status"] == "success":
+                checkpoint.mark(digest, DONE)
+            else:
+                checkpoint.mark(digest, FAILED, stage="analysis", error=result["message"])
+        if result["status"] == "success":
+            logger.info(f"Analyzed {name}: redid {', '.join(result.get('reanalyzed') or []) or 'nothing'}")
+        else:
+            logger.error(f"Analysis of {name} failed: {result['message']}")
+
+    def queue_analysis(digest: str, name: str) -> None:
+        # One analysis per name until it starts; every file that resolves to the name shares its outcome
+        if args.no_analysis:
+            return
+        with waiting_lock:
+            if name.lower() in waiting:
+                waiting[name.lower()].append(digest)
+                return
+            waiting[name.lower()] = [digest]
+        analyses.submit(analyze, name)
+
+    def write_batch(batch: List[Dict[str, Any]]) -> None:
+        embedded = document_parser.embed_resumes([result["text"] for result in batch])
+        for result, embedding in zip(batch, embedded):
+            result["embedded"] = embedding
+        files = name_batch(batch, duplicate_index, jd_key, extract_name, claimed)
+        older = [result for result in batch if result.get("superseded_by")]
+        resumes = []
+        for result in files:
+            embeddings, chunk_matrix, section_embeddings = result.pop("embedded")
+            resumes.append({
+                "candidate_name": result["candidate_name"],
+                "resume_content": result["text"],
+                "embeddings": embeddings,
+                "chunk_embeddings": pack_matrix(chunk_matrix),
+                "section_embeddings": section_embeddings,
+                "github_links": result["github_links"],
+                "minhash": result["minhash"],
+                "duplicate_of": result.get("duplicate_of")
+            })
+
+        written = storage.bulk_upload_resumes(args.job_role, args.job_title, resumes, screening=screening, jd_matcher=jd_matcher)
+        if written["status"] != "success":
+            for result in batch:
+                checkpoint.mark(
+                    result["digest"], FAILED, stage="write", candidate_name=result["candidate_name"],
+                    path=result["path"], error=written["message"]
+                )
+            logger.error(f"Batch of {len(batch)} failed: {written['message']}")
+            return
+
+        outcome = {c["candidate_name"]: c for c in written["candidates"]}
+        for result in files:
+            name = result["candidate_name"]
+            candidate = outcome[name]
+            skip = candidate["analysis_reused"] or (candidate.get("screening") or {}).get("decision") == LOW_MATCH
+            checkpoint.mark(
+                result["digest"], DONE if skip else WRITTEN,
+                candidate_name=name, path=result["path"], github_links=candidate["github_links"],
+                screening=(candidate.get("screening") or {}).get("decision")
+            )
+            if not skip:
+                queue_analysis(result["digest"], name)
+        for result in older:
+            checkpoint.mark(result["digest"], DONE, candidate_name=result["candidate_name"], path=result["path"],
+                            superseded_by=result["superseded_by"])
+            logger.info(f"{result['path']} is superseded by another resume of {result['candidate_name']}")
+        logger.info(f"Wrote {len(outcome)} candidates from {len(batch)} files")
+
+    parse_failed = 0
+    try:
+        for digest, name in to_analyze.items():
+            queue_analysis(digest, name)
+
+        batch, seen = [], set()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, args.parse_workers), mp_context=context) as parsers:
+            pending, paths = set(), iter(to_parse)
+            while True:
+                # Only a few files in flight, so parsed text never piles up in memory
+                for path in paths:
+                    pending.add(parsers.submit(_parse_file, path))
+                    if len(pending) >= 2 * args.batch_size:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result["digest"] is None:
+                        parse_failed += 1
+                        logger.error(f"Cannot read {result['path']}: {result['error']}")
+                        continue
+                    checkpoint.remember_path(result["path"], result["digest"])
+                    entry = checkpoint.files.get(result["digest"])
+                    if result["digest"] in seen or (entry and entry["status"] != FAILED):
+                        # A copy of a file already ingested
+                        continue
+                    seen.add(result["digest"])
+                    if result["error"]:
+                        parse_failed += 1
+                        checkpoint.mark(result["digest"], FAILED, stage="parse", path=result["path"], error=result["error"])
+                        logger.error(f"Cannot parse {result['path']}: {result['error']}")
+                        continue
+                    batch.append(result)
+                    if len(batch) >= args.batch_size:
+                        write_batch(batch)
+                        batch = []
+        if batch:
+            write_batch(batch)
+
+        analyses.shutdown(wait=True)
+    except KeyboardInterrupt:
+        analyses.shutdown(wait=False, cancel_futures=True)
+        print(f"Interrupted; progress saved to {args.state}", file=sys.stderr)
+        return 130
+    finally:
+        checkpoint.save(force=True)
+
+    counts = checkpoint.counts()
+    print(
+        f"{counts.get(DONE, 0)} done, {counts.get(WRITTEN, 0)} awaiting analysis, "
+        f"{counts.get(FAILED, 0)} failed ({parse_failed} unreadable this run)"
+    )
+    return 1 if counts.get(FAILED) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Groups the candidates of one JD into clusters of similar profiles.
+
+Clustering runs on the normalized candidate matrix that CandidateRanker
+already caches per JD. Centroids come from mini-batch spherical k-means and
+are kept per worker. When candidates arrive, the new rows update the
+centroids they fall into (the same running-mean step as a mini-batch) instead
+of refitting, so cluster ids stay stable between requests. A full refit
+happens when the JD has doubled in size since the last fit or a different k
+is asked for.
+
+Each cluster is labelled with the terms that are most over-represented in its
+resumes compared with the rest of the JD, and represented by the members
+closest to its centroid.
+"""
+import logging
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from candidate_ranking import CandidateRanker, JDCandidateMatrix
+from keyword_index import tokenize
+from metrics import TimedCollection, record_cache, stage
+from mongo_connection import get_database
+from vector_utils import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+MAX_CLUSTERS = 12
+
+
+def default_cluster_count(candidates: int) -> int:
+    return int(max(2, min(MAX_CLUSTERS, round(np.sqrt(candidates / 2)))))
+
+
+def _seed_centroids(vectors: np.ndarray, k: int, rng) -> np.ndarray:
+    # k-means++ on cosine distance
+    centroids = [vectors[rng.integers(len(vectors))]]
+    for _ in range(1, k):
+        distance = 1 - np.max(vectors @ np.asarray(centroids).T, axis=1)
+        weight = np.clip(distance, 0, None).astype(np.float64) ** 2
+        total = weight.sum()
+        choice = rng.choice(len(vectors), p=weight / total) if total > 0 else rng.integers(len(vectors))
+        centroids.append(vectors[choice])
+    return np.asarray(centroids, dtype=np.float32)
+
+
+def minibatch_kmeans(
+    vectors: np.ndarray,
+    k: int,
+    batch_size: int = 256,
+    iterations: int = 50,
+    refine: int = 5,
+    restarts: int = 3,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit-length centroids and per-centroid counts from mini-batch spherical k-means"""
+    rng = np.random.default_rng(seed)
+    k = max(1, min(k, len(vectors)))
+    best, best_cohesion = None, -np.inf
+    for _ in range(restarts):
+        centroids = _seed_centroids(vectors, k, rng)
+        counts = np.zeros(k, dtype=np.float64)
+        for _ in range(iterations):
+            batch = vectors[rng.choice(len(vectors), min(batch_size, len(vectors)), replace=False)]
+            centroids, counts = minibatch_update(centroids, counts, batch)
+        # A JD has at most a few thousand candidates, so a few full passes are cheap and settle the fit
+        for _ in range(refine):
+            centroids, _ = minibatch_update(centroids, np.zeros(k, dtype=np.float64), vectors)
+        cohesion = float(np.max(vectors @ centroids.T, axis=1).sum())
+        if cohesion > best_cohesion:
+            best, best_cohesion = centroids, cohesion
+
+    # Later updates weigh new candidates against the real cluster sizes, not the number of batch draws
+    counts = np.bincount(np.argmax(vectors @ best.T, axis=1), minlength=k).astype(np.float64)
+    return best, counts
+
+
+def minibatch_update(centroids: np.ndarray, counts: np.ndarray, batch: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """One mini-batch step: every centroid moves towards the mean of its batch members at rate 1/count"""
+    assignments = np.argmax(batch @ centroids.T, axis=1)
+    membership = np.zeros((len(centroids), len(batch)), dtype=np.float32)
+    membership[assignments, np.arange(len(batch))] = 1
+    sums = membership @ batch
+    batch_counts = np.bincount(assignments, minlength=len(centroids)).astype(np.float64)
+    counts = counts + batch_counts
+    moved = batch_counts > 0
+    rate = (batch_counts[moved] / counts[moved])[:, None].astype(np.float32)
+    centroids = centroids.copy()
+    centroids[moved] = (1 - rate) * centroids[moved] + rate * (sums[moved] / batch_counts[moved][:, None].astype(np.float32))
+    return normalize_rows(centroids), counts
+
+
+class JDClusterState:
+    def __init__(self, centroids: np.ndarray, counts: np.ndarray, seen: FrozenSet[Tuple[str, Any]], fitted_size: int, k: int):
+        self.centroids = centroids
+        self.counts = counts
+        self.seen = seen
+        self.fitted_size = fitted_size
+        self.k = k
+        self.matrix: Optional[JDCandidateMatrix] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+
+class CandidateClusterer:
+    def __init__(
+        self,
+        ranker: CandidateRanker,
+        connection_string: Optional[str] = None,
+        max_entries: int = 32,
+        exemplars: int = 3,
+        label_terms: int = 5
+    ):
+        self.ranker = ranker
+        self.connection_string = connection_string
+        self.max_entries = max_entries
+        self.exemplars = exemplars
+        self.label_terms = label_terms
+
+        self._states: "OrderedDict[Tuple[str, str], JDClusterState]" = OrderedDict()
+        # Resume terms per (candidate, uploaded_at), so a re-upload is re-tokenized
+        self._terms: Dict[Tuple[str, str, str, Any], FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+
+    def _resume_terms(self, jd_matrix: JDCandidateMatrix) -> List[FrozenSet[str]]:
+        role, title = jd_matrix.job_role, jd_matrix.job_title
+        keys = [(role, title, name, uploaded_at) for name, uploaded_at in zip(jd_matrix.names, jd_matrix.uploaded_at)]
+        if any(key not in self._terms for key in keys):
+            jobs = TimedCollection(get_database(self.connection_string)['jobs'])
+            pipeline = [
+                {"$match": {"job_role": role}},
+                {"$unwind": "$job_descriptions"},
+                {"$match": {"job_descriptions.title": {"$regex": f"^{re.escape(title)}$", "$options": "i"}}},
+                {"$unwind": "$job_descriptions.candidates"},
+                {"$project": {
+                    "_id": 0,
+                    "candidate_name": "$job_descriptions.candidates.candidate_name",
+                    "uploaded_at": "$job_descriptions.candidates.uploaded_at",
+                    "resume_content": "$job_descriptions.candidates.resume_content"
+                }}
+            ]
+            with stage("clustering.load_text"):
+                for doc in jobs.aggregate(pipeline):
+                    key = (role, title, doc.get("candidate_name"), doc.get("uploaded_at"))
+                    if key not in self._terms:
+                        self._terms[key] = frozenset(
+                            term for term in tokenize(doc.get("resume_content") or "") if len(term) > 1 and not term.isdigit()
+                        )
+        return [self._terms.get(key, frozenset()) for key in keys]
+
+    def _update_state(self, key: Tuple[str, str], jd_matrix: JDCandidateMatrix, k: int) -> JDClusterState:
+        vectors = jd_matrix.matrix
+        rows = frozenset(zip(jd_matrix.names, jd_matrix.uploaded_at))
+        state = self._states.get(key)
+
+        if state is not None and state.matrix is jd_matrix and state.k == k:
+            record_cache("clusters", True)
+            return state
+        record_cache("clusters", False)
+
+        if state is None or state.k != k or len(vectors) >= 2 * max(state.fitted_size, 1):
+            with stage("clustering.fit"):
+                centroids, counts = minibatch_kmeans(vectors, k)
+            state = JDClusterState(centroids, counts, rows, len(vectors), k)
+        else:
+            # Fold only the candidates that arrived since the last update into the centroids
+            new_rows = [i for i, row in enumerate(zip(jd_matrix.names, jd_matrix.uploaded_at)) if row not in state.seen]
+            if new_rows:
+                with stage("clustering.update"):
+                    state.centroids, state.counts = minibatch_update(state.centroids, state.counts, vectors[new_rows])
+            state.seen = rows
+
+        state.matrix = jd_matrix
+        state.result = None
+        self._states[key] = state
+        self._states.move_to_end(key)
+        while len(self._states) > self.max_entries:
+            evicted, _ = self._states.popitem(last=False)
+            for term_key in [t for t in self._terms if (t[0].lower(), t[1].lower()) == evicted]:
+                del self._terms[term_key]
+        return state
+
+    def _labels(self, assignments: np.ndarray, terms: List[FrozenSet[str]], cluster: int) -> List[str]:
+        inside = [terms[i] for i in np.flatnonzero(assignments == cluster)]
+        outside = [terms[i] for i in np.flatnonzero(assignments != cluster)]
+        if not inside:
+            return []
+        inside_df = Counter(term for doc in inside for term in doc)
+        outside_df = Counter(term for doc in outside for term in doc)
+        minimum = max(2, int(0.3 * len(inside))) if len(inside) > 2 else 1
+        scored = []
+        for term, df in inside_df.items():
+            if df < minimum:
+                continue
+            # Share of the cluster that mentions the term, minus the share of the rest of the JD
+            lift = df / len(inside) - (outside_df.get(term, 0) / len(outside) if outside else 0.0)
+            scored.append((lift, df, term))
+        scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        return [term for lift, _, term in scored[:self.label_terms] if lift > 0]
+
+    def clusters(self, job_role: str, job_title: str, k: Optional[int] = None, include_members: bool = True) -> Optional[Dict[str, Any]]:
+        jd_matrix = self.ranker.matrix_for(job_role, job_title)
+        if jd_matrix is None:
+            return None
+        count = len(jd_matrix.names)
+        if count == 0:
+            return {"job_role": jd_matrix.job_role, "job_title": jd_matrix.job_title, "k": 0, "clusters": [], "total": 0, "unscored": jd_matrix.skipped}
+
+        k = max(1, min(k or default_cluster_count(count), count))
+        key = (jd_matrix.job_role.lower(), jd_matrix.job_title.lower())
+        with self._lock:
+            state = self._update_state(key, jd_matrix, k)
+            if state.result is None:
+                state.result = self._describe(jd_matrix, state)
+            result = state.result
+
+        if include_members:
+            return result
+        return {**result, "clusters": [{**c, "members": []} for c in result["clusters"]]}
+
+    def _describe(self, jd_matrix: JDCandidateMatrix, state: JDClusterState) -> Dict[str, Any]:
+        with stage("clustering.assign"):
+            similarities = jd_matrix.matrix @ state.centroids.T
+            assignments = np.argmax(similarities, axis=1)
+        terms = self._resume_terms(jd_matrix)
+
+        clusters = []
+        for cluster in range(len(state.centroids)):
+            members = np.flatnonzero(assignments == cluster)
+            if not len(members):
+                continue
+            closeness = similarities[members, cluster]
+            order = members[np.argsort(-closeness, kind="stable")]
+            clusters.append({
+                "cluster_id": cluster,
+                "size": int(len(members)),
+                "label": self._labels(assignments, terms, cluster),
+                "cohesion": round(float(closeness.mean()), 4),
+                "exemplars": [
+                    {"candidate_name": jd_matrix.names[i], "similarity": round(float(similarities[i, cluster]), 4)}
+                    for i in order[:self.exemplars]
+                ],
+                "members": [jd_matrix.names[i] for i in order]
+            })
+        clusters.sort(key=lambda c: -c["size"])
+        return {
+            "job_role": jd_matrix.job_role,
+            "job_title": jd_matrix.job_title,
+            "k": state.k,
+            "clusters": clusters,
+            "total": len(jd_matrix.names),
+            "unscored": jd_matrix.skipped
+        }
@@ -0,0 +1,242 @@
+"""
+Embedding-based ranking of the candidates of one JD.
+
+For each JD the pooled resume embeddings are loaded once into a single
+L2-normalized float32 matrix, so ranking is one matrix-vector product against
+the normalized JD embedding followed by a partial sort of the top of the
+list. Matrices are cached per worker (LRU) and reloaded when upload_resume
+bumps the JD's generation counter.
+
+With method="sections" the candidates are scored by their section-weighted
+profile vectors (see resume_sections) instead; resumes stored before
+segmentation fall back to their pooled embedding.
+
+With method="maxsim" they are scored by late interaction (see
+vector_utils.max_sim): every JD chunk is matched with the closest chunk of the
+resume. The chunk matrices are only loaded for this method, into an entry of
+their own, and the scores are computed once per load since the JD is fixed.
+Resumes (or JDs) stored without chunk matrices fall back to the pooled score.
+"""
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from listing_cache import GENERATIONS_COLLECTION, local_generation, read_generation
+from metrics import TimedCollection, record_cache, stage
+from mongo_connection import get_database
+from resume_sections import profile_vector
+from vector_utils import max_sim_scores, normalize_rows, unpack_matrix
+
+logger = logging.getLogger(__name__)
+
+
+def candidates_generation_name(job_role: str, job_title: str) -> str:
+    """Generation counter bumped whenever a candidate of this JD is written"""
+    return "candidates:" + "\x1f".join((job_role.lower(), job_title.lower()))
+
+
+class JDCandidateMatrix:
+    def __init__(
+        self,
+        job_role: str,
+        job_title: str,
+        jd_vector: np.ndarray,
+        names: List[str],
+        uploaded_at: List[Any],
+        matrix: np.ndarray,
+        skipped: int,
+        profiles: Optional[np.ndarray] = None,
+        chunk_scores: Optional[np.ndarray] = None
+    ):
+        self.job_role = job_role
+        self.job_title = job_title
+        self.jd_vector = jd_vector
+        self.names = names
+        self.uploaded_at = uploaded_at
+        self.matrix = matrix
+        self.skipped = skipped
+        self.profiles = matrix if profiles is None else profiles
+        self.chunk_scores = chunk_scores
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes \
+            + (self.profiles.nbytes if self.profiles is not self.matrix else 0) \
+            + (self.chunk_scores.nbytes if self.chunk_scores is not None else 0)
+
+    def scores(self, method: str = "pooled") -> np.ndarray:
+        if method == "maxsim" and self.chunk_scores is not None:
+            return self.chunk_scores
+        return (self.profiles if method == "sections" else self.matrix) @ self.jd_vector
+
+    def top_k(self, k: int, min_similarity: Optional[float] = None, method: str = "pooled") -> Tuple[np.ndarray, np.ndarray, int]:
+        """Indices and scores of the k best candidates, plus how many pass min_similarity"""
+        scores = self.scores(method)
+        if min_similarity is not None:
+            eligible = np.flatnonzero(scores >= min_similarity)
+        else:
+            eligible = np.arange(len(scores))
+        total = len(eligible)
+        k = min(k, total)
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), total
+
+        eligible_scores = scores[eligible]
+        if k < total:
+            part = np.argpartition(-eligible_scores, k - 1)[:k]
+        else:
+            part = np.arange(total)
+        order = part[np.argsort(-eligible_scores[part], kind="stable")]
+        return eligible[order], eligible_scores[order], total
+
+
+class CandidateRanker:
+    def __init__(self, connection_string: Optional[str] = None, max_entries: int = 32, check_interval: float = 0.5):
+        self.connection_string = connection_string
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+
+        self._entries: "OrderedDict[str, Tuple[int, JDCandidateMatrix]]" = OrderedDict()
+        self._checked: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def _generation(self, name: str) -> int:
+        now = time.monotonic()
+        checked_at, generation = self._checked.get(name, (0.0, 0))
+        if now - checked_at >= self.check_interval:
+            generation = read_generation(get_database(self.connection_string)[GENERATIONS_COLLECTION], name)
+            self._checked[name] = (now, generation)
+        return max(generation, local_generation(name))
+
+    def _load(self, job_role: str, job_title: str, chunks: bool = False) -> Optional[JDCandidateMatrix]:
+        jobs = TimedCollection(get_database(self.connection_string)['jobs'])
+        candidate_fields = {
+            "candidate_name": "$$c.candidate_name",
+            "embeddings": "$$c.embeddings",
+            "section_embeddings": "$$c.section_embeddings",
+            "uploaded_at": "$$c.uploaded_at"
+        }
+        jd_fields = {"job_role": 1, "title": "$job_descriptions.title", "embeddings": "$job_descriptions.embeddings"}
+        if chunks:
+            candidate_fields["chunk_embeddings"] = "$$c.chunk_embeddings"
+            jd_fields["chunk_embeddings"] = "$job_descriptions.chunk_embeddings"
+        pipeline = [
+            {"$match": {"job_role": {"$regex": f"^{re.escape(job_role)}$", "$options": "i"}}},
+            {"$unwind": "$job_descriptions"},
+            {"$match": {"job_descriptions.title": {"$regex": f"^{re.escape(job_title)}$", "$options": "i"}}},
+            {"$limit": 1},
+            # Only what ranking needs: no resume text, analyses or (unless asked for) chunk matrices
+            {"$project": {
+                **jd_fields,
+                "candidates": {
+                    "$map": {
+                        "input": {"$ifNull": ["$job_descriptions.candidates", []]},
+                        "as": "c",
+                        "in": candidate_fields
+                    }
+                }
+            }}
+        ]
+        docs = list(jobs.aggregate(pipeline))
+        if not docs:
+            return None
+        doc = docs[0]
+
+        jd_vector = normalize_rows(np.asarray(doc.get("embeddings") or [], dtype=np.float32))
+        dimension = jd_vector.shape[0] if jd_vector.ndim == 1 else 0
+
+        names, uploaded_at, rows, profiles, chunk_matrices = [], [], [], [], []
+        skipped = 0
+        for candidate in doc.get("candidates") or []:
+            vector = candidate.get("embeddings") or []
+            if not dimension or len(vector) != dimension:
+                skipped += 1
+                continue
+            names.append(candidate.get("candidate_name"))
+            uploaded_at.append(candidate.get("uploaded_at"))
+            rows.append(vector)
+            profile = profile_vector(candidate.get("section_embeddings"))
+            profiles.append(profile if profile is not None and profile.shape == (dimension,) else None)
+            if chunks:
+                chunk_matrices.append(unpack_matrix(candidate.get("chunk_embeddings")))
+
+        matrix = normalize_rows(np.asarray(rows, dtype=np.float32)) if rows else np.zeros((0, dimension), dtype=np.float32)
+        matrix = np.ascontiguousarray(matrix)
+        section_matrix = None
+        if any(profile is not None for profile in profiles):
+            section_matrix = np.ascontiguousarray(np.stack([
+                profile if profile is not None else matrix[i] for i, profile in enumerate(profiles)
+            ]).astype(np.float32))
+        chunk_scores = None
+        if chunks:
+            scores = max_sim_scores(unpack_matrix(doc.get("chunk_embeddings")), chunk_matrices)
+            chunk_scores = np.where(np.isnan(scores), matrix @ jd_vector, scores).astype(np.float32)
+        return JDCandidateMatrix(
+            doc["job_role"], doc["title"], jd_vector, names, uploaded_at, matrix, skipped, section_matrix, chunk_scores
+        )
+
+    def matrix_for(self, job_role: str, job_title: str, method: str = "pooled") -> Optional[JDCandidateMatrix]:
+        name = candidates_generation_name(job_role, job_title)
+        generation = self._generation(name)
+        chunks = method == "maxsim"
+        key = f"{name}\x1fmaxsim" if chunks else name
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                record_cache("ranking_matrix", True)
+                return entry[1]
+        record_cache("ranking_matrix", False)
+
+        with stage("ranking.load_matrix"):
+            jd_matrix = self._load(job_role, job_title, chunks)
+        if jd_matrix is None:
+            return None
+
+        with self._lock:
+            self._entries[key] = (generation, jd_matrix)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return jd_matrix
+
+    def rank(
+        self,
+        job_role: str,
+        job_title: str,
+        page: int = 1,
+        page_size: int = 50,
+        min_similarity: Optional[float] = None,
+        method: str = "pooled"
+    ) -> Optional[Dict[str, Any]]:
+        jd_matrix = self.matrix_for(job_role, job_title, method)
+        if jd_matrix is None:
+            return None
+
+        offset = (page - 1) * page_size
+        with stage("ranking.score"):
+            indices, scores, total = jd_matrix.top_k(offset + page_size, min_similarity, method)
+
+        items = []
+        for rank, (index, score) in enumerate(zip(indices[offset:], scores[offset:]), start=offset + 1):
+            uploaded_at = jd_matrix.uploaded_at[index]
+            items.append({
+                "rank": rank,
+                "candidate_name": jd_matrix.names[index],
+                "similarity": round(float(score), 4),
+                "uploaded_at": uploaded_at.isoformat() if hasattr(uploaded_at, "isoformat") else uploaded_at
+            })
+
+        return {
+            "job_role": jd_matrix.job_role,
+            "job_title": jd_matrix.job_title,
+            "method": method,
+            "items": items,
+            "total": total,
+            "unscored": jd_matrix.skipped
+        }
@@ -0,0 +1,305 @@
+"""
+Materialized candidate listing.
+
+Candidates live embedded in their job description, so listing them means
+unwinding every JD and every resume. `candidate_summaries` keeps one small
+document per (role, JD title, candidate) with just what the tables show. It
+is written by upload_resume and store_analysis, and can be rebuilt from the
+jobs collection with backfill().
+
+The structured analysis fields (score, matched and missing skills, seniority,
+number of risk flags; see analysis_schema) are copied here and indexed, so
+filters such as "score above 70 for this JD" or "has kubernetes" are index
+queries instead of parsing every analysis.
+"""
+import datetime
+import logging
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from analysis_schema import clean_items, summary_fields
+from metrics import TimedCollection
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "candidate_summaries"
+SORT_FIELDS = {
+    "uploaded_at": DESCENDING,
+    "score": DESCENDING,
+    "candidate_name": ASCENDING
+}
+MAX_PAGE_SIZE = 200
+
+_SCORE = re.compile(r"^[#*_\s\d.\-]*(?:overall\s+)?score\b[^0-9\n]*(?:\n[^0-9\n]*)?(\d{1,3})", re.IGNORECASE | re.MULTILINE)
+
+_indexes_ready = set()
+_indexes_lock = threading.Lock()
+
+
+def summary_id(job_role: str, job_title: str, candidate_name: str) -> str:
+    return "\x1f".join((job_role.lower(), job_title.lower(), candidate_name))
+
+
+def extract_score(analysis: Optional[Dict[str, Any]]) -> Optional[int]:
+    """Overall score (0-100) of a stored analysis: the structured field, else parsed from the markdown"""
+    structured = (analysis or {}).get("structured") or {}
+    if structured.get("overall_score") is not None:
+        return structured["overall_score"]
+    for item in (analysis or {}).get("analyses", []):
+        if item.get("type") != "candidate_analysis":
+            continue
+        # The overall score is the last section of the prompt; earlier ones (cv_structure) have their own
+        scores = [int(value) for value in _SCORE.findall(item.get("content") or "") if 0 <= int(value) <= 100]
+        if scores:
+            return scores[-1]
+    return None
+
+
+def analysis_status(analysis: Optional[Dict[str, Any]], screening: Optional[Dict[str, Any]] = None) -> str:
+    if analysis and analysis.get("analyses"):
+        return "completed"
+    # Screened out at upload; analyzed only if promoted
+    if screening and screening.get("decision") == "low_match":
+        return "low_match"
+    return "pending"
+
+
+class CandidateSummaryStore:
+    def __init__(self, db):
+        self.collection = TimedCollection(db[COLLECTION_NAME])
+        self._ensure_indexes(db)
+
+    def _ensure_indexes(self, db) -> None:
+        # Once per database per process; create_index is a round trip even when the index exists
+        key = (id(db.client), db.name)
+        if key in _indexes_ready:
+            return
+        with _indexes_lock:
+            if key in _indexes_ready:
+                return
+            try:
+                self.collection.create_index([("uploaded_at", DESCENDING)])
+                self.collection.create_index([("job_role_key", ASCENDING), ("job_title_key", ASCENDING), ("uploaded_at", DESCENDING)])
+                self.collection.create_index([("score", DESCENDING)])
+                self.collection.create_index([("candidate_name", ASCENDING)])
+                self.collection.create_index([("analysis_status", ASCENDING), ("uploaded_at", DESCENDING)])
+                self.collection.create_index([("job_role_key", ASCENDING), ("job_title_key", ASCENDING), ("score", DESCENDING)])
+                # count_better_screened, on every upload scored below the screening threshold
+                self.collection.create_index([("job_role_key", ASCENDING), ("job_title_key", ASCENDING), ("screening_score", DESCENDING)])
+                self.collection.create_index([("matched_skills", ASCENDING), ("score", DESCENDING)])
+                self.collection.create_index([("seniority", ASCENDING), ("score", DESCENDING)])
+                _indexes_ready.add(key)
+            except Exception as e:
+                logger.error(f"Could not create candidate summary indexes: {str(e)}")
+
+    @staticmethod
+    def _upload_fields(job_role: str, job_title: str, candidate: Dict[str, Any], location: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        analysis = candidate.get("analysis")
+        screening = candidate.get("screening") or {}
+        fields = {
+            "candidate_name": candidate["candidate_name"],
+            "job_role": job_role,
+            "job_role_key": job_role.lower(),
+            "job_title": job_title,
+            "job_title_key": job_title.lower(),
+            "job_location": location,
+            "uploaded_at": candidate.get("uploaded_at") or datetime.datetime.utcnow(),
+            "analysis_status": analysis_status(analysis, screening),
+            "score": extract_score(analysis),
+            **summary_fields(analysis),
+            "screening_score": screening.get("score"),
+            "github_links": len(candidate.get("github_links") or []),
+            "updated_at": datetime.datetime.utcnow()
+        }
+        return summary_id(job_role, job_title, candidate["candidate_name"]), fields
+
+    def record_upload(
+        self,
+        job_role: str,
+        job_title: str,
+        candidate: Dict[str, Any],
+        location: Optional[str] = None,
+        keep_analysis: bool = False
+    ) -> None:
+        """Upserts the summary of a freshly uploaded (or re-uploaded) candidate"""
+        try:
+            doc_id, update = self._upload_update(job_role, job_title, candidate, location, keep_analysis)
+            self.collection.update_one({"_id": doc_id}, update, upsert=True)
+        except Exception as e:
+            logger.error(f"Could not update candidate summary for {candidate.get('candidate_name')}: {str(e)}")
+
+    def record_uploads(
+        self,
+        job_role: str,
+        job_title: str,
+        candidates: List[Dict[str, Any]],
+        location: Optional[str] = None,
+        keep_analysis: Optional[List[bool]] = None
+    ) -> None:
+        """record_upload for many candidates of one JD in a single bulk write"""
+        if not candidates:
+            return
+        try:
+            operations = []
+            for candidate, keep in zip(candidates, keep_analysis or [False] * len(candidates)):
+                doc_id, update = self._upload_update(job_role, job_title, candidate, location, keep)
+                operations.append(UpdateOne({"_id": doc_id}, update, upsert=True))
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Could not update {len(candidates)} candidate summaries: {str(e)}")
+
+    @classmethod
+    def _upload_update(
+        cls,
+        job_role: str,
+        job_title: str,
+        candidate: Dict[str, Any],
+        location: Optional[str],
+        keep_analysis: bool
+    ) -> Tuple[str, Dict[str, Any]]:
+        doc_id, fields = cls._upload_fields(job_role, job_title, candidate, location)
+        if not keep_analysis:
+            return doc_id, {"$set": fields}
+        # The earlier analysis was carried over; so are its status, score and structured fields
+        kept = ("analysis_status", "score", *summary_fields(None))
+        return doc_id, {
+            "$set": {k: v for k, v in fields.items() if k not in kept},
+            "$setOnInsert": {k: fields[k] for k in kept}
+        }
+
+    def record_analysis(self, job_role: str, job_title: str, candidate_name: str, analysis: Optional[Dict[str, Any]], status: str = "completed") -> None:
+        try:
+            self.collection.update_one(
+                {"_id": summary_id(job_role, job_title, candidate_name)},
+                {"$set": {
+                    "analysis_status": status,
+                    "score": extract_score(analysis),
+                    **summary_fields(analysis),
+                    "analyzed_at": datetime.datetime.utcnow(),
+                    "updated_at": datetime.datetime.utcnow()
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Could not update analysis summary for {candidate_name}: {str(e)}")
+
+    def list(
+        self,
+        page: int = 1,
+        page_size: int = 50,
+        job_role: Optional[str] = None,
+        job_title: Optional[str] = None,
+        status: Optional[str] = None,
+        min_score: Optional[int] = None,
+        name: Optional[str] = None,
+        sort: str = "uploaded_at",
+        skills: Optional[List[str]] = None,
+        missing_skill: Optional[str] = None,
+        seniority: Optional[str] = None,
+        max_risk_flags: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        query: Dict[str, Any] = {}
+        if job_role:
+            query["job_role_key"] = job_role.lower()
+        if job_title:
+            query["job_title_key"] = job_title.lower()
+        if status:
+            query["analysis_status"] = status
+        if min_score is not None:
+            query["score"] = {"$gte": min_score}
+        if name:
+            query["candidate_name"] = {"$regex": re.escape(name), "$options": "i"}
+        if skills:
+            # Cleaned like the stored lists (analysis_schema), so "Node.js." finds "node.js"
+            query["matched_skills"] = {"$all": clean_items(skills)}
+        if missing_skill:
+            query["missing_skills"] = {"$in": clean_items([missing_skill])}
+        if seniority:
+            query["seniority"] = seniority.lower()
+        if max_risk_flags is not None:
+            query["risk_flags"] = {"$lte": max_risk_flags}
+
+        page = max(1, page)
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        direction = SORT_FIELDS.get(sort, DESCENDING)
+        sort_field = sort if sort in SORT_FIELDS else "uploaded_at"
+
+        total = self.collection.count_documents(query)
+        cursor = self.collection.find(
+            query,
+            {"_id": 0, "job_role_key": 0, "job_title_key": 0, "updated_at": 0}
+        ).sort([(sort_field, direction), ("_id", ASCENDING)]).skip((page - 1) * page_size).limit(page_size)
+
+        items = []
+        for doc in cursor:
+            for field in ("uploaded_at", "analyzed_at"):
+                if isinstance(doc.get(field), datetime.datetime):
+                    doc[field] = doc[field].isoformat()
+            items.append(doc)
+        return items, total
+
+    def lookup(self, job_role: str, job_title: str, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Summaries of the named candidates of one JD, keyed by name"""
+        ids = [summary_id(job_role, job_title, name) for name in names]
+        cursor = self.collection.find(
+            {"_id": {"$in": ids}},
+            {"_id": 0, "candidate_name": 1, "analysis_status": 1, "score": 1, "screening_score": 1, "github_links": 1}
+        )
+        return {doc["candidate_name"]: doc for doc in cursor}
+
+    def count_better_screened(self, job_role: str, job_title: str, score: float) -> int:
+        """How many candidates of a JD have a higher screening pre-score"""
+        return self.collection.count_documents({
+            "job_role_key": job_role.lower(),
+            "job_title_key": job_title.lower(),
+            "screening_score": {"$gt": score}
+        })
+
+    def status_counts(self, job_role: Optional[str] = None, job_title: Optional[str] = None) -> Dict[str, int]:
+        """Candidates per analysis status, optionally within one role or JD"""
+        match: Dict[str, Any] = {}
+        if job_role:
+            match["job_role_key"] = job_role.lower()
+        if job_title:
+            match["job_title_key"] = job_title.lower()
+        pipeline = [{"$match": match}, {"$group": {"_id": "$analysis_status", "count": {"$sum": 1}}}]
+        return {doc["_id"]: doc["count"] for doc in self.collection.aggregate(pipeline)}
+
+    def candidate_names(self) -> List[str]:
+        return self.collection.distinct("candidate_name")
+
+    def backfill(self, jobs_collection, batch_size: int = 500) -> int:
+        """Rebuilds the summaries from the jobs collection; safe to run repeatedly"""
+        projection = {
+            "job_role": 1,
+            "job_descriptions.title": 1,
+            "job_descriptions.location": 1,
+            "job_descriptions.candidates.candidate_name": 1,
+            "job_descriptions.candidates.uploaded_at": 1,
+            "job_descriptions.candidates.github_links": 1,
+            "job_descriptions.candidates.analysis": 1,
+            "job_descriptions.candidates.screening": 1
+        }
+        written = 0
+        operations: List[UpdateOne] = []
+        for job in jobs_collection.find({}, projection):
+            for operation in self._backfill_operations(job):
+                operations.append(operation)
+                if len(operations) >= batch_size:
+                    self.collection.bulk_write(operations, ordered=False)
+                    written += len(operations)
+                    operations = []
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+            written += len(operations)
+        logger.info(f"Backfilled {written} candidate summaries")
+        return written
+
+    def _backfill_operations(self, job: Dict[str, Any]) -> Iterable[UpdateOne]:
+        for jd in job.get("job_descriptions") or []:
+            for candidate in jd.get("candidates") or []:
+                if candidate.get("candidate_name") and jd.get("title"):
+                    doc_id, fields = self._upload_fields(job["job_role"], jd["title"], candidate, jd.get("location"))
+                    yield UpdateOne({"_id": doc_id}, {"$set": fields}, upsert=True)
@@ -0,0 +1,274 @@
+"""
+Comparative analysis of a shortlist in as few LLM calls as a token budget allows.
+
+A single prompt holds a digest of the JD and one compact block per candidate.
+Each block has the structured fields of the candidate's earlier analysis, if
+there is one (see analysis_schema), and the JD-relevant resume sections (see
+resume_sections), cut to a per-candidate allowance. Candidates are packed
+greedily, strongest first, until the next block would push the prompt plus
+the reserved answer tokens over the budget. The remaining candidates go into
+further calls. A call whose answer cannot be parsed is split in two and
+retried.
+
+Every call scores candidates against the same rubric, so the results of
+several batches are merged by score, with ties broken by the rank within the
+batch. Tokens are estimated at about four characters each, so the budget is a
+soft limit.
+"""
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+from analysis_inputs import prompt_resume_text
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+COMPARISON_INSTRUCTIONS = """
+Compare the candidates below for this job. Score each one from 0 to 100 with the same rubric:
+direct skill matches 40%, relevant experience 25%, project complexity and impact 15%,
+growth potential 10%, soft skills 10%. Rank them from best (1) to worst.
+
+Return a JSON object:
+    {
+        "ranking": [
+            {"id": "<candidate id, e.g. C1>", "rank": <1..n>, "score": <0..100>,
+             "strengths": [<up to 3 short phrases>], "concerns": [<up to 3 short phrases>],
+             "verdict": "<one sentence>"}
+        ],
+        "summary": "<two sentences on how the shortlist compares>"
+    }
+Include every candidate exactly once.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_tokens(text: str, tokens: int) -> str:
+    text = " ".join((text or "").split())
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + " ..."
+
+
+class ComparedCandidate(BaseModel):
+    id: str
+    rank: int = Field(ge=1)
+    score: int = Field(ge=0, le=100)
+    strengths: List[str] = []
+    concerns: List[str] = []
+    verdict: str = ""
+
+    @field_validator("strengths", "concerns", mode="before")
+    @classmethod
+    def _phrases(cls, values):
+        if isinstance(values, str):
+            values = [values]
+        return [" ".join(str(value).split())[:160] for value in values or [] if str(value).strip()][:5]
+
+
+class ComparisonAnswer(BaseModel):
+    ranking: List[ComparedCandidate]
+    summary: str = ""
+
+
+# Answer tokens reserved per candidate: a ranking entry as long as the
+# instructions allow (3 strengths and 3 concerns of a short phrase each, a
+# one-sentence verdict), pretty-printed as models tend to
+ANSWER_TOKENS = estimate_tokens(ComparedCandidate(
+    id="C12", rank=12, score=100, strengths=["x" * 80] * 3, concerns=["x" * 80] * 3, verdict="x" * 240
+).model_dump_json(indent=4))
+
+
+def parse_comparison(text: str, labels: List[str]) -> ComparisonAnswer:
+    """Raises ValueError unless the answer ranks exactly the given candidate ids"""
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if not match:
+        raise ValueError("no JSON object in the comparison")
+    try:
+        answer = ComparisonAnswer.model_validate(json.loads(match.group(0)))
+    except (json.JSONDecodeError, ValidationError) as e:
+        raise ValueError(f"invalid comparison: {str(e)[:300]}")
+    ids = [item.id.strip().upper() for item in answer.ranking]
+    if sorted(ids) != sorted(labels):
+        raise ValueError(f"comparison covers {sorted(ids)}, expected {sorted(labels)}")
+    for item in answer.ranking:
+        item.id = item.id.strip().upper()
+    return answer
+
+
+def candidate_block(label: str, candidate: Dict[str, Any], jd: Dict[str, Any], max_tokens: int) -> str:
+    lines = [f"[{label}]"]
+    structured = (candidate.get("analysis") or {}).get("structured") or {}
+    if structured:
+        lines.append(
+            f"Earlier analysis: score {structured.get('overall_score')}, seniority {structured.get('seniority')}; "
+            f"matched: {', '.join(structured.get('matched_skills') or []) or 'none'}; "
+            f"missing: {', '.join(structured.get('missing_skills') or []) or 'none'}; "
+            f"risks: {'; '.join(structured.get('risk_flags') or []) or 'none'}"
+        )
+    header_tokens = estimate_tokens("\n".join(lines))
+    lines.append("Resume: " + truncate_tokens(prompt_resume_text(candidate, jd), max(50, max_tokens - header_tokens)))
+    return "\n".join(lines)
+
+
+def load_shortlist(jobs_collection, job_role: str, job_title: str, names: List[str]) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+    """The JD and the named candidates (in the order given), or None if the JD does not exist"""
+    pipeline = [
+        {"$match": {"job_role": {"$regex": f"^{re.escape(job_role)}$", "$options": "i"}}},
+        {"$unwind": "$job_descriptions"},
+        {"$match": {"job_descriptions.title": {"$regex": f"^{re.escape(job_title)}$", "$options": "i"}}},
+        {"$limit": 1},
+        {"$project": {
+            "_id": 0,
+            "job_role": 1,
+            "title": "$job_descriptions.title",
+            "job_description": "$job_descriptions.job_description",
+            "embeddings": "$job_descriptions.embeddings",
+            "candidates": {
+                "$map": {
+                    "input": {"$ifNull": ["$job_descriptions.candidates", []]},
+                    "as": "c",
+                    "in": {
+                        "candidate_name": "$$c.candidate_name",
+                        "resume_content": "$$c.resume_content",
+                        "section_embeddings": "$$c.section_embeddings",
+                        "screening": "$$c.screening",
+                        "analysis": {"structured": "$$c.analysis.structured"}
+                    }
+                }
+            }
+        }}
+    ]
+    docs = list(jobs_collection.aggregate(pipeline))
+    if not docs:
+        return None
+    jd = docs[0]
+    by_name = {c.get("candidate_name", "").lower(): c for c in jd.pop("candidates") or []}
+    return jd, [by_name[name.lower()] for name in names if name.lower() in by_name]
+
+
+class ShortlistComparer:
+    def __init__(
+        self,
+        analyzer,
+        token_budget: int = 6000,
+        jd_tokens: int = 600,
+        candidate_tokens: int = 600,
+        answer_tokens: int = ANSWER_TOKENS,
+        max_per_call: int = 12
+    ):
+        self.analyzer = analyzer
+        self.token_budget = token_budget
+        self.jd_tokens = jd_tokens
+        self.candidate_tokens = candidate_tokens
+        self.answer_tokens = answer_tokens
+        self.max_per_call = max_per_call
+
+    def _prompt(self, jd_digest: str, blocks: List[str]) -> str:
+        return f"{COMPARISON_INSTRUCTIONS}\nJob Description:\n{jd_digest}\n\nCandidates:\n\n" + "\n\n".join(blocks)
+
+    def pack(self, fixed_tokens: int, block_tokens: List[int], token_budget: Optional[int] = None) -> List[List[int]]:
+        """Greedy batches of block indices; every batch holds at least one block"""
+        budget = token_budget or self.token_budget
+        batches, current, used = [], [], fixed_tokens
+        for index, tokens in enumerate(block_tokens):
+            cost = tokens + self.answer_tokens
+            if current and (used + cost > budget or len(current) >= self.max_per_call):
+                batches.append(current)
+                current, used = [], fixed_tokens
+            current.append(index)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _call(
+        self,
+        jd_digest: str,
+        labels: List[str],
+        blocks: List[str],
+        prompt_tokens: List[int],
+        depth: int = 0
+    ) -> List[Tuple[List[str], Optional[ComparisonAnswer], Optional[str]]]:
+        """
+        (labels, answer, error) per batch; answers that cannot be parsed are
+        split in half and retried. The estimated prompt tokens of every call,
+        failed ones included, are appended to `prompt_tokens`.
+        """
+        prompt = self._prompt(jd_digest, blocks)
+        prompt_tokens.append(estimate_tokens(prompt))
+        try:
+            with stage("comparison.llm"):
+                text = self.analyzer.compare_candidates(prompt, max_tokens=self.answer_tokens * len(blocks) + 200)
+            return [(labels, parse_comparison(text, labels), None)]
+        except ValueError as e:
+            logger.warning(f"Comparison of {len(labels)} candidates could not be parsed: {str(e)}")
+            if len(labels) < 2 or depth >= 3:
+                return [(labels, None, str(e))]
+            half = len(labels) // 2
+            return (
+                self._call(jd_digest, labels[:half], blocks[:half], prompt_tokens, depth + 1)
+                + self._call(jd_digest, labels[half:], blocks[half:], prompt_tokens, depth + 1)
+            )
+        except Exception as e:
+            logger.error(f"Comparison of {len(labels)} candidates failed: {str(e)}")
+            return [(labels, None, str(e))]
+
+    def compare(self, jd: Dict[str, Any], candidates: List[Dict[str, Any]], token_budget: Optional[int] = None) -> Dict[str, Any]:
+        # Strongest first, so the top of the shortlist is compared within the same call
+        def strength(candidate):
+            structured = (candidate.get("analysis") or {}).get("structured") or {}
+            return (structured.get("overall_score") or -1, (candidate.get("screening") or {}).get("score") or -1)
+        candidates = sorted(candidates, key=strength, reverse=True)
+
+        with stage("comparison.pack"):
+            jd_digest = truncate_tokens(jd.get("job_description") or "", self.jd_tokens)
+            labels = [f"C{i + 1}" for i in range(len(candidates))]
+            blocks = [candidate_block(label, c, jd, self.candidate_tokens) for label, c in zip(labels, candidates)]
+            fixed_tokens = estimate_tokens(self._prompt(jd_digest, []))
+            batches = self.pack(fixed_tokens, [estimate_tokens(block) for block in blocks], token_budget)
+
+        results, prompt_tokens = [], []
+        for batch in batches:
+            results += self._call(jd_digest, [labels[i] for i in batch], [blocks[i] for i in batch], prompt_tokens)
+
+        name_of = {label: c["candidate_name"] for label, c in zip(labels, candidates)}
+        ranking, summaries, failed = [], [], []
+        for batch, (batch_labels, answer, error) in enumerate(results, start=1):
+            if answer is None:
+                failed += [{"candidate_name": name_of[label], "error": error} for label in batch_labels]
+                continue
+            summaries.append(answer.summary)
+            for item in answer.ranking:
+                ranking.append({
+                    "candidate_name": name_of[item.id],
+                    "score": item.score,
+                    "strengths": item.strengths,
+                    "concerns": item.concerns,
+                    "verdict": item.verdict,
+                    "batch": batch,
+                    "rank_in_batch": item.rank
+                })
+
+        ranking.sort(key=lambda item: (-item["score"], item["rank_in_batch"]))
+        for rank, item in enumerate(ranking, start=1):
+            item["rank"] = rank
+        return {
+            "job_role": jd.get("job_role"),
+            "job_title": jd.get("title"),
+            "ranking": ranking,
+            "summaries": summaries,
+            "not_compared": failed,
+            "batches": len(results),
+            "calls": len(prompt_tokens),
+            "estimated_prompt_tokens": sum(prompt_tokens)
+        }
@@ -1,12 +1,15 @@
-from pymongo import MongoClient
 from dotenv import load_dotenv
 load_dotenv()
 import os
 from typing import Optional, Dict, Any, List
 import json
+import base64
 from bson import ObjectId
 from datetime import datetime
 import traceback
+from metrics import TimedCollection
+from candidate_summaries import CandidateSummaryStore
+from mongo_connection import get_client, get_database
 
 class JsonEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -14,6 +17,8 @@ class JsonEncoder(json.JSONEncoder):
             return str(obj)
         if isinstance(obj, datetime):
             return obj.isoformat()
+        if isinstance(obj, bytes):
+            return base64.b64encode(obj).decode('ascii')
         return super().default(obj)
 
 class DataHandle:
@@ -23,9 +28,10 @@ class DataHandle:
             if not self.connection_string:
                 raise ValueError("MongoDB connection string not provided")
             
-            self.client = MongoClient(self.connection_string)
-            self.db = self.client['recruitment_db']
-            self.jobs_collection = self.db['jobs']
+            self.client = get_client(self.connection_string)
+            self.db = get_database(self.connection_string)
+            self.jobs_collection = TimedCollection(self.db['jobs'])
+            self.summaries = CandidateSummaryStore(self.db)
             # Test connection
             self.client.admin.command('ping')
             print("Connected to MongoDB successfully!")
@@ -51,7 +57,7 @@ class DataHandle:
             result = self.jobs_collection.find_one(query)
             
             if result:
-                return json.loads(json.dumps(result, cls=JsonEncoder))
+                return result
             
             available_roles = self.jobs_collection.distinct("job_role")
             print(f"Job role '{role}' not found. Available roles: {available_roles}")
@@ -146,33 +152,26 @@ class DataHandle:
         if not self.verify_connection():
             print("Database connection is not active")
             return None
-            
         
         try:
-            
-            
-            pipeline = [
-                {"$unwind": "$job_descriptions"},
-                {"$unwind": "$job_descriptions.candidates"},
-                {"$project": {
-                    "_id": 0,
-                    "candidate_name": "$job_descriptions.candidates.candidate_name"
-                }},
-                {"$group": {
-                    "_id": "$candidate_name"
-                }}
-            ]
-            
-            result = list(self.jobs_collection.aggregate(pipeline))
-            
-            candidate_names = [doc["_id"] for doc in result]
-            
-            return candidate_names
+            return self.summaries.candidate_names()
             
         except Exception as e:
             print(f"Error occurred: {str(e)}")
             return []
 
+    def list_candidates(self, **filters) -> Optional[Dict[str, Any]]:
+        """One page of candidate summaries; see CandidateSummaryStore.list for the filters"""
+        try:
+            items, total = self.summaries.list(**filters)
+            return {"items": items, "total": total}
+        except Exception as e:
+            print(f"Error listing candidates: {str(e)}")
+            return None
+
+    def backfill_candidate_summaries(self) -> int:
+        return self.summaries.backfill(self.jobs_collection)
+
 
     class JsonEncoder(json.JSONEncoder):
         def default(self, obj):
@@ -236,7 +235,7 @@ class DataHandle:
                     print("No results at this stage")
                     
             final_results = list(self.jobs_collection.aggregate(pipeline_stages[-1]))
-            return json.loads(json.dumps(final_results, cls=JsonEncoder)) if final_results else []
+            return final_results
             
         except Exception as e:
             print(f"Error retrieving candidates for role {job_role}: {e}")
@@ -264,6 +263,8 @@ class DataHandle:
                         "uploaded_at": "$job_descriptions.candidates.uploaded_at",
                         "github_links": "$job_descriptions.candidates.github_links",
                         "analysis": "$job_descriptions.candidates.analysis",
+                        "screening": "$job_descriptions.candidates.screening",
+                        "alternative_matches": "$job_descriptions.candidates.alternative_matches",
                         "job_role": 1,
                         "job_description_title": "$job_descriptions.title",
                         "job_location": "$job_descriptions.location"
@@ -272,7 +273,7 @@ class DataHandle:
             ]
             
             result = list(self.jobs_collection.aggregate(pipeline))
-            return json.loads(json.dumps(result[0], cls=JsonEncoder)) if result else None
+            return result[0] if result else None
         except Exception as e:
             print(f"Error retrieving candidate {candidate_name}: {e}")
             return None
@@ -1,34 +1,50 @@
 import datetime
 import tempfile
-from pymongo import MongoClient
-from typing import Dict, Any
+from pymongo import ReturnDocument
+from typing import Dict, Any, List, Optional, Union, BinaryIO
 import numpy as np
-from scipy.spatial.distance import cosine
 from document_parser import DocumentParser
 from llm_analyzer import LLMAnalyzer
 from io import BytesIO
 from github_link_analyzer import GitHubLinkAnalyzer
+from vector_utils import pack_matrix, document_similarity
+from fingerprint import name_in_text, pack_signature
+from metrics import TimedCollection, timed
+from listing_cache import bump_generation, bump_listings_generation
+from candidate_ranking import candidates_generation_name
+from candidate_summaries import CandidateSummaryStore
+from screening import ScreeningPolicy
+from resume_sections import profile_vector
+from analysis_inputs import current_inputs, prompt_resume_text, recorded_inputs, stale_inputs, stale_parts
+from jd_matching import JDS_GENERATION_ID, JDMatcher
+from mongo_connection import get_client, get_database
 import os
 import re
+import shutil
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# How a new JD is compared with the JDs of its role to detect a duplicate:
+# "pooled" embeddings or "maxsim" over the chunk matrices (see vector_utils)
+JD_DUPLICATE_METHOD = os.getenv("JD_DUPLICATE_METHOD", "pooled")
+
 class RecruitmentDataStorage:
-    def __init__(self, connection_string: str):
+    def __init__(self, connection_string: str, database_name: Optional[str] = None):
         if not connection_string:
             raise ValueError("MongoDB connection string is empty or None")
             
         try:
-            # Add timeout to avoid hanging
-            self.client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
+            # Shared by the process; the client has a short server selection timeout to avoid hanging
+            self.client = get_client(connection_string)
             
             # Test connection with timeout
             self.client.admin.command('ping')
             
-            self.db = self.client['recruitment_db']
-            self.jobs_collection = self.db['jobs']
+            self.db = get_database(connection_string, database_name)
+            self.jobs_collection = TimedCollection(self.db['jobs'])
+            self.summaries = CandidateSummaryStore(self.db)
             
             # Verify we can access the collection
             self.jobs_collection.find_one({})
@@ -59,26 +75,58 @@ class RecruitmentDataStorage:
                 converted_data[key] = self._convert_numpy_to_list(value)
         return converted_data
     
-    def find_similar_job(self, embeddings: list, job_role: str, threshold: float = 0.9) -> Dict[str, Any]:
+    def find_similar_job(
+        self,
+        embeddings: list,
+        job_role: str,
+        threshold: float = 0.9,
+        chunk_embeddings: Optional[Dict[str, Any]] = None,
+        method: str = "pooled"
+    ) -> Dict[str, Any]:
         # Only get the job with matching role
         job = self.jobs_collection.find_one({"job_role": job_role})
         
         if not job:
             return None
-            
-        embeddings_array = np.array(embeddings)
         
         # Check each JD in the matching job role
         for jd in job.get('job_descriptions', []):
-            stored_embeddings = np.array(jd.get('embeddings', []))
+            stored_embeddings = jd.get('embeddings', [])
             if len(stored_embeddings) > 0:
-                similarity = 1 - cosine(embeddings_array, stored_embeddings)
+                similarity = document_similarity(
+                    embeddings,
+                    stored_embeddings,
+                    a_chunks=chunk_embeddings,
+                    b_chunks=jd.get('chunk_embeddings'),
+                    method=method
+                )
                 
                 if similarity >= threshold:
                     return job
         
         return None
     
+    def _invalidate_listings(self) -> None:
+        # Roles and titles are cached by every worker (see listing_cache)
+        try:
+            bump_listings_generation(self.db)
+        except Exception as e:
+            logger.error(f"Could not invalidate cached listings: {str(e)}")
+
+    def _invalidate_jd_matrix(self) -> None:
+        # Every worker caches all JD embeddings for cross-JD matching (see jd_matching)
+        try:
+            bump_generation(self.db, JDS_GENERATION_ID)
+        except Exception as e:
+            logger.error(f"Could not invalidate cached JD matrix: {str(e)}")
+
+    def _invalidate_ranking(self, job_role: str, job_title: str) -> None:
+        # Every worker caches the JD's candidate matrix (see candidate_ranking)
+        try:
+            bump_generation(self.db, candidates_generation_name(job_role, job_title))
+        except Exception as e:
+            logger.error(f"Could not invalidate cached candidate ranking: {str(e)}")
+
     def add_jobrole(self, job_role: str, department: str, worktype: str, salary: str, required_experience: str) -> Dict[str, Any]:
         job = self.jobs_collection.find_one({"job_role": job_role})
         if job:
@@ -92,32 +140,48 @@ class RecruitmentDataStorage:
                 "required_experience": required_experience,
             }
             result = self.jobs_collection.insert_one(job_data)
+            self._invalidate_listings()
             return self.jobs_collection.find_one({"_id": result.inserted_id})
     
-    def upload_jd(self, job_role: str, job_description: str, location: str, title: str) -> Dict[str, Any]:
+    @timed("storage.upload_jd")
+    def upload_jd(
+        self,
+        job_role: str,
+        job_description: str,
+        location: str,
+        title: str,
+        embeddings: Optional[list] = None,
+        chunk_embeddings: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         # First check if the job role exists
         job = self.jobs_collection.find_one({"job_role": job_role})
         
-        parse = DocumentParser()
-        embeddings = parse.get_embeddings(job_description)
-        embeddings = embeddings.tolist() if isinstance(embeddings, np.ndarray) else []
+        # Embeddings may already be known from the document cache
+        if embeddings is None:
+            parse = DocumentParser()
+            embeddings, chunk_matrix = parse.embed_document(job_description)
+            chunk_embeddings = pack_matrix(chunk_matrix)
+        embeddings = embeddings.tolist() if isinstance(embeddings, np.ndarray) else list(embeddings or [])
         
         new_jd = {
             "title": title,
             "location": location,
             "job_description": job_description,
             "embeddings": embeddings,
+            "chunk_embeddings": chunk_embeddings,
             "created_at": datetime.datetime.utcnow()
         }
         
         # If job role exists, check for similar JDs
         if job:
-            similar_job = self.find_similar_job(embeddings, job_role)  # Pass job_role to limit search
+            similar_job = self.find_similar_job(
+                embeddings, job_role, chunk_embeddings=chunk_embeddings, method=JD_DUPLICATE_METHOD
+            )  # Pass job_role to limit search
             if similar_job:
                 return {
                     "status": "duplicate",
                     "message": "Similar job description already exists for this role",
-                    "data": self._convert_mongodb_doc(similar_job),
+                    "data": similar_job,
                     "total_jds": len(similar_job.get("job_descriptions", []))
                 }
             
@@ -127,12 +191,14 @@ class RecruitmentDataStorage:
                 {"$push": {"job_descriptions": new_jd}} if "job_descriptions" in job 
                 else {"$set": {"job_descriptions": [new_jd]}}
             )
+            self._invalidate_listings()
+            self._invalidate_jd_matrix()
             
             updated_job = self.jobs_collection.find_one({"_id": job["_id"]})
             return {
                 "status": "updated",
                 "message": "New job description added to existing job role",
-                "data": self._convert_mongodb_doc(updated_job),
+                "data": updated_job,
                 "total_jds": len(updated_job.get("job_descriptions", []))
             }
         
@@ -143,48 +209,239 @@ class RecruitmentDataStorage:
                 "job_descriptions": [new_jd]
             }
             result = self.jobs_collection.insert_one(job_data)
+            self._invalidate_listings()
+            self._invalidate_jd_matrix()
             created_job = self.jobs_collection.find_one({"_id": result.inserted_id})
             
             return {
                 "status": "created",
                 "message": "New job role and job description created",
-                "data": self._convert_mongodb_doc(created_job),
+                "data": created_job,
                 "total_jds": 1
             }
     
     
-    def _convert_mongodb_doc(self, doc: Dict[str, Any]) -> Dict[str, Any]:
-        if doc is None:
-            return None
-        
-        doc_copy = doc.copy()
-        
-        for key, value in doc_copy.items():
-            if key == "_id":
-                doc_copy[key] = str(value)
-            elif isinstance(value, datetime.datetime):
-                doc_copy[key] = value.isoformat()
-            elif isinstance(value, list):
-                doc_copy[key] = [self._convert_mongodb_doc(item) if isinstance(item, dict) else item for item in value]
-            elif isinstance(value, dict):
-                doc_copy[key] = self._convert_mongodb_doc(value)
+    @staticmethod
+    @timed("storage.extract_github_links")
+    def extract_github_links(pdf_content: Union[bytes, BinaryIO]) -> List[str]:
+        github_links = []
+        if not pdf_content:
+            return github_links
+
+        try:
+            with tempfile.NamedTemporaryFile(suffix='.pdf', mode='wb', delete=False) as temp_pdf:
+                if isinstance(pdf_content, bytes):
+                    temp_pdf.write(pdf_content)
+                else:
+                    # Copy spooled uploads in chunks instead of reading them into memory
+                    pdf_content.seek(0)
+                    shutil.copyfileobj(pdf_content, temp_pdf)
+                    pdf_content.seek(0)
+                temp_pdf.flush()
+                
+                github_analyzer = GitHubLinkAnalyzer()
+                logger.debug(f"Processing PDF file: {temp_pdf.name}")
+                links = github_analyzer.extract_links_from_pdf(temp_pdf.name)
+                logger.debug(f"Extracted links: {links}")
+                github_links = github_analyzer.filter_github_links(links)
+                logger.debug(f"Filtered GitHub links: {github_links}")
+                
+            os.unlink(temp_pdf.name)
             
-        return doc_copy
-    
-    def upload_resume(self, job_role: str, resume_content: str, pdf_content: bytes = None, job_title: str = None) -> Dict[str, Any]:
+        except Exception as e:
+            logger.error(f"Error extracting GitHub links from PDF: {str(e)}")
+
+        return github_links
+
+    def iter_candidate_fingerprints(self, since: Optional[datetime.datetime] = None):
+        """
+        Yields ((job_role, job_title, candidate_name), minhash, uploaded_at)
+        for every fingerprinted candidate, or only those uploaded after `since`
+        """
+        match = {"job_descriptions.candidates.minhash": {"$exists": True}}
+        if since is not None:
+            match["job_descriptions.candidates.uploaded_at"] = {"$gt": since}
+        pipeline = [
+            # Skips the roles with nothing new before unwinding; the match after the
+            # unwinds keeps only the new candidates of those roles
+            {"$match": match},
+            {"$unwind": "$job_descriptions"},
+            {"$unwind": "$job_descriptions.candidates"},
+            {"$match": match},
+            {"$project": {
+                "_id": 0,
+                "job_role": 1,
+                "title": "$job_descriptions.title",
+                "candidate_name": "$job_descriptions.candidates.candidate_name",
+                "minhash": "$job_descriptions.candidates.minhash",
+                "uploaded_at": "$job_descriptions.candidates.uploaded_at"
+            }}
+        ]
+        for doc in self.jobs_collection.aggregate(pipeline):
+            key = (doc["job_role"].lower(), doc.get("title", "").lower(), doc["candidate_name"])
+            yield key, doc["minhash"], doc.get("uploaded_at")
+
+    def candidate_embeddings(self, job_role: str, job_title: str, candidate_name: str) -> Optional[Dict[str, Any]]:
+        """The stored embeddings of a candidate, for a near-duplicate upload of the same resume to reuse"""
+        pipeline = [
+            {"$match": {"job_role": {"$regex": f"^{re.escape(job_role)}$", "$options": "i"}}},
+            {"$unwind": "$job_descriptions"},
+            {"$match": {"job_descriptions.title": {"$regex": f"^{re.escape(job_title)}$", "$options": "i"}}},
+            {"$unwind": "$job_descriptions.candidates"},
+            {"$match": {"job_descriptions.candidates.candidate_name": candidate_name}},
+            {"$limit": 1},
+            {"$project": {
+                "_id": 0,
+                "embeddings": "$job_descriptions.candidates.embeddings",
+                "chunk_embeddings": "$job_descriptions.candidates.chunk_embeddings",
+                "section_embeddings": "$job_descriptions.candidates.section_embeddings"
+            }}
+        ]
+        docs = list(self.jobs_collection.aggregate(pipeline))
+        # Resumes stored before segmentation have no section embeddings to reuse
+        if not docs or not docs[0].get("embeddings") or docs[0].get("section_embeddings") is None:
+            return None
+        doc = docs[0]
+        return {
+            "embeddings": doc["embeddings"],
+            "chunk_embeddings": doc.get("chunk_embeddings"),
+            "section_embeddings": doc["section_embeddings"]
+        }
+
+    @staticmethod
+    def _jd_title_matches(title: str) -> Dict[str, Any]:
+        return {"$eq": [{"$toLower": {"$ifNull": ["$$jd.title", ""]}}, title.lower()]}
+
+    @classmethod
+    def _candidate_upsert_pipeline(cls, job_title: str, candidate_data: Dict[str, Any], keep_analysis: bool) -> List[Dict[str, Any]]:
+        """Update pipeline that replaces the candidate in its JD, or appends it when new"""
+        return cls._candidates_upsert_pipeline(job_title, [candidate_data], [keep_analysis])
+
+    @classmethod
+    def _candidates_upsert_pipeline(cls, job_title: str, candidates_data: List[Dict[str, Any]], keep_analysis: List[bool]) -> List[Dict[str, Any]]:
+        """
+        Update pipeline that replaces each given candidate in its JD in place,
+        and appends the new ones in order. Names must be unique.
+        """
+        incoming = {"$literal": candidates_data}
+        index = {"$indexOfArray": [{"$literal": [c["candidate_name"] for c in candidates_data]}, "$$c.candidate_name"]}
+        new_candidate = {"$arrayElemAt": ["$$incoming", "$$i"]}
+        replacement = {
+            "$cond": [
+                {"$and": [{"$arrayElemAt": [{"$literal": keep_analysis}, "$$i"]}, {"$gt": ["$$c.analysis", None]}]},
+                {"$mergeObjects": [new_candidate, {"analysis": "$$c.analysis"}]},
+                new_candidate
+            ]
+        } if any(keep_analysis) else new_candidate
+
+        candidates = {
+            "$let": {
+                "vars": {"existing": {"$ifNull": ["$$jd.candidates", []]}, "incoming": incoming},
+                "in": {
+                    "$concatArrays": [
+                        {"$map": {
+                            "input": "$$existing",
+                            "as": "c",
+                            "in": {"$let": {
+                                "vars": {"i": index},
+                                "in": {"$cond": [{"$lt": ["$$i", 0]}, "$$c", replacement]}
+                            }}
+                        }},
+                        {"$filter": {
+                            "input": "$$incoming",
+                            "as": "n",
+                            "cond": {"$not": [{"$in": ["$$n.candidate_name", {"$ifNull": ["$$existing.candidate_name", []]}]}]}
+                        }}
+                    ]
+                }
+            }
+        }
+        return [{
+            "$set": {
+                "job_descriptions": {
+                    "$map": {
+                        "input": "$job_descriptions",
+                        "as": "jd",
+                        "in": {
+                            "$cond": [
+                                cls._jd_title_matches(job_title),
+                                {"$mergeObjects": ["$$jd", {"candidates": candidates}]},
+                                "$$jd"
+                            ]
+                        }
+                    }
+                }
+            }
+        }]
+
+    @classmethod
+    def _candidate_projection(cls, job_title: str, candidate_name: Union[str, List[str]]) -> Dict[str, Any]:
+        """Projects the matching JD and, if present, stubs of the named candidates before the write"""
+        names = [candidate_name] if isinstance(candidate_name, str) else list(candidate_name)
+        return {
+            "job_role": 1,
+            "job_descriptions": {
+                "$map": {
+                    "input": {"$filter": {
+                        "input": {"$ifNull": ["$job_descriptions", []]},
+                        "as": "jd",
+                        "cond": cls._jd_title_matches(job_title)
+                    }},
+                    "as": "jd",
+                    "in": {
+                        "title": "$$jd.title",
+                        "location": "$$jd.location",
+                        "candidates": {
+                            "$map": {
+                                "input": {"$filter": {
+                                    "input": {"$ifNull": ["$$jd.candidates", []]},
+                                    "as": "c",
+                                    "cond": {"$in": ["$$c.candidate_name", {"$literal": names}]}
+                                }},
+                                "as": "c",
+                                "in": {
+                                    "candidate_name": "$$c.candidate_name",
+                                    "has_analysis": {"$gt": ["$$c.analysis", None]}
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+
+    @timed("storage.upload_resume")
+    def upload_resume(
+        self,
+        job_role: str,
+        resume_content: str,
+        pdf_content: bytes = None,
+        job_title: str = None,
+        embeddings: Optional[list] = None,
+        chunk_embeddings: Optional[Dict[str, Any]] = None,
+        section_embeddings: Optional[Dict[str, Any]] = None,
+        github_links: Optional[List[str]] = None,
+        minhash: Optional[np.ndarray] = None,
+        duplicate_of: Optional[Dict[str, Any]] = None,
+        screening: Optional[ScreeningPolicy] = None,
+        jd_matcher: Optional[JDMatcher] = None
+    ) -> Dict[str, Any]:
         if not job_role or not isinstance(job_role, str):
             return {"status": "error", "message": "Invalid job role provided"}
         
         if not job_title:
             return {"status": "error", "message": "Job title is required"}
         
-        # Case-insensitive search
-        job = self.jobs_collection.find_one({
-            "job_role": {
-                "$regex": f"^{re.escape(job_role)}$",
-                "$options": "i"  # case-insensitive
-            }
-        })
+        # Case-insensitive search; only the JD titles are needed to validate the request
+        job = self.jobs_collection.find_one(
+            {
+                "job_role": {
+                    "$regex": f"^{re.escape(job_role)}$",
+                    "$options": "i"  # case-insensitive
+                }
+            },
+            {"job_role": 1, "job_descriptions.title": 1, "job_descriptions.embeddings": 1, "job_descriptions.job_description": 1}
+        )
         
         if not job or not job.get("job_descriptions"):
             # Debug logging
@@ -210,97 +467,84 @@ class RecruitmentDataStorage:
             }
 
         try:
-            parse = DocumentParser()
-            embeddings = parse.get_embeddings(resume_content)
-            embeddings = embeddings.tolist() if isinstance(embeddings, np.ndarray) else []
+            # Embeddings and links may already be known from the document cache
+            if embeddings is None:
+                parse = DocumentParser()
+                embeddings, chunk_matrix, section_embeddings = parse.embed_resume(resume_content)
+                chunk_embeddings = pack_matrix(chunk_matrix)
+            embeddings = embeddings.tolist() if isinstance(embeddings, np.ndarray) else list(embeddings or [])
             
-            llm_analyzer = LLMAnalyzer()
-            candidate_name = llm_analyzer.extract_candidate_name(resume_content)
+            # A near-duplicate of an earlier resume is the same person only if it carries the same name;
+            # resumes written from one template are near-duplicates too
+            if duplicate_of and name_in_text(duplicate_of.get("candidate_name"), resume_content):
+                candidate_name = duplicate_of["candidate_name"]
+            else:
+                llm_analyzer = LLMAnalyzer()
+                candidate_name = llm_analyzer.extract_candidate_name(resume_content)
             
             # Extract GitHub links from the original PDF content
-            github_links = []
-            if pdf_content:
-                try:
-                    with tempfile.NamedTemporaryFile(suffix='.pdf', mode='wb', delete=False) as temp_pdf:
-                        temp_pdf.write(pdf_content)
-                        temp_pdf.flush()
-                        
-                        github_analyzer = GitHubLinkAnalyzer()
-                        logger.debug(f"Processing PDF file: {temp_pdf.name}")
-                        links = github_analyzer.extract_links_from_pdf(temp_pdf.name)
-                        logger.debug(f"Extracted links: {links}")
-                        github_links = github_analyzer.filter_github_links(links)
-                        logger.debug(f"Filtered GitHub links: {github_links}")
-                        
-                    os.unlink(temp_pdf.name)
-                    
-                except Exception as e:
-                    logger.error(f"Error extracting GitHub links from PDF: {str(e)}")
+            if github_links is None:
+                github_links = self.extract_github_links(pdf_content)
 
-            candidate_data = {
-                "candidate_name": candidate_name,
-                "resume_content": resume_content,
-                "embeddings": embeddings,
-                "github_links": github_links,
-                "uploaded_at": datetime.datetime.utcnow()
-            }
+            candidate_data = self._candidate_record(
+                job["job_role"], matching_jd,
+                {
+                    "candidate_name": candidate_name,
+                    "resume_content": resume_content,
+                    "embeddings": embeddings,
+                    "chunk_embeddings": chunk_embeddings,
+                    "section_embeddings": section_embeddings,
+                    "github_links": github_links,
+                    "minhash": minhash,
+                    "duplicate_of": duplicate_of
+                },
+                screening, jd_matcher
+            )
+            keep_analysis = self._keeps_analysis(duplicate_of, job_role, job_title, candidate_name)
 
-            # Find the index of the matching job description
-            jd_index = next(
-                (i for i, jd in enumerate(job["job_descriptions"]) 
-                if jd.get("title", "").lower() == job_title.lower()),
-                None
+            # One atomic round trip: concurrent uploads to the same JD can neither
+            # lose each other's writes nor add the same candidate twice
+            before = self.jobs_collection.find_one_and_update(
+                {"_id": job["_id"]},
+                self._candidate_upsert_pipeline(matching_jd["title"], candidate_data, keep_analysis),
+                projection=self._candidate_projection(matching_jd["title"], candidate_name),
+                return_document=ReturnDocument.BEFORE
             )
+            if not before or not before.get("job_descriptions"):
+                return {"status": "error", "message": f"Job title '{job_title}' not found"}
 
-            if "candidates" in job["job_descriptions"][jd_index]:
-                existing_candidates = job["job_descriptions"][jd_index]["candidates"]
-                existing_candidate = next(
-                    (c for c in existing_candidates if c["candidate_name"] == candidate_name),
-                    None
-                )
-                
-                if existing_candidate:
-                    update_query = {
-                        "_id": job["_id"],
-                        f"job_descriptions.{jd_index}.candidates.candidate_name": candidate_name
-                    }
-                    update_operation = {
-                        "$set": {
-                            f"job_descriptions.{jd_index}.candidates.$": candidate_data
-                        }
-                    }
-                    self.jobs_collection.update_one(update_query, update_operation)
-                    status = "updated"
-                    message = "Candidate information updated successfully"
-                else:
-                    update_query = {"_id": job["_id"]}
-                    update_operation = {
-                        "$push": {
-                            f"job_descriptions.{jd_index}.candidates": candidate_data
-                        }
-                    }
-                    self.jobs_collection.update_one(update_query, update_operation)
-                    status = "created"
-                    message = "New candidate added successfully"
+            jd = before["job_descriptions"][0]
+            existing = jd["candidates"][0] if jd.get("candidates") else None
+            analysis_reused = bool(keep_analysis and existing and existing.get("has_analysis"))
+            if existing:
+                status = "updated"
+                message = "Candidate information updated successfully"
             else:
-                update_query = {"_id": job["_id"]}
-                update_operation = {
-                    "$set": {
-                        f"job_descriptions.{jd_index}.candidates": [candidate_data]
-                    }
-                }
-                self.jobs_collection.update_one(update_query, update_operation)
                 status = "created"
-                message = "First candidate added successfully"
+                message = "New candidate added successfully"
 
-            updated_job = self.jobs_collection.find_one({"_id": job["_id"]})
+            self.summaries.record_upload(
+                before["job_role"], jd["title"], candidate_data, jd.get("location"),
+                keep_analysis=analysis_reused
+            )
+            self._invalidate_ranking(before["job_role"], jd["title"])
             
             return {
                 "status": status,
                 "message": message,
-                "data": self._convert_mongodb_doc(updated_job),
+                "data": {
+                    "job_id": str(before["_id"]),
+                    "job_role": before["job_role"],
+                    "job_title": jd["title"],
+                    "candidate_name": candidate_name,
+                    "uploaded_at": candidate_data["uploaded_at"].isoformat()
+                },
                 "candidate_name": candidate_name,
-                "github_links": github_links
+                "github_links": github_links,
+                "duplicate_of": duplicate_of,
+                "analysis_reused": analysis_reused,
+                "screening": candidate_data.get("screening"),
+                "alternative_matches": candidate_data.get("alternative_matches", [])
             }
 
         except Exception as e:
@@ -311,7 +555,157 @@ class RecruitmentDataStorage:
             }
 
 
-    def store_analysis(self, job_role: str, candidate_name: str, job_title: str) -> Dict[str, Any]:
+    def _candidate_record(
+        self,
+        job_role: str,
+        jd: Dict[str, Any],
+        resume: Dict[str, Any],
+        screening: Optional[ScreeningPolicy] = None,
+        jd_matcher: Optional[JDMatcher] = None
+    ) -> Dict[str, Any]:
+        """The candidate as stored in its JD, from a parsed, embedded and named resume"""
+        embeddings = resume.get("embeddings")
+        embeddings = embeddings.tolist() if isinstance(embeddings, np.ndarray) else list(embeddings or [])
+        candidate_data = {
+            "candidate_name": resume["candidate_name"],
+            "resume_content": resume["resume_content"],
+            "embeddings": embeddings,
+            "chunk_embeddings": resume.get("chunk_embeddings"),
+            "section_embeddings": resume.get("section_embeddings"),
+            "github_links": resume.get("github_links") or [],
+            "uploaded_at": resume.get("uploaded_at") or datetime.datetime.utcnow()
+        }
+        if resume.get("minhash") is not None:
+            candidate_data["minhash"] = pack_signature(resume["minhash"])
+        if resume.get("duplicate_of"):
+            candidate_data["duplicate_of"] = resume["duplicate_of"]
+        if screening is not None:
+            candidate_data["screening"] = self._screen(screening, job_role, jd, candidate_data)
+        if jd_matcher is not None:
+            candidate_data["alternative_matches"] = self._alternative_matches(jd_matcher, job_role, jd["title"], embeddings)
+        return candidate_data
+
+    @staticmethod
+    def _keeps_analysis(duplicate_of: Optional[Dict[str, Any]], job_role: str, job_title: str, candidate_name: str) -> bool:
+        # The same resume of the same person for the same JD keeps its earlier analysis
+        return bool(duplicate_of) \
+            and duplicate_of.get("candidate_name") == candidate_name \
+            and duplicate_of.get("job_title", "").lower() == job_title.lower() \
+            and duplicate_of.get("job_role", "").lower() == job_role.lower()
+
+    @timed("storage.bulk_upload_resumes")
+    def bulk_upload_resumes(
+        self,
+        job_role: str,
+        job_title: str,
+        resumes: List[Dict[str, Any]],
+        screening: Optional[ScreeningPolicy] = None,
+        jd_matcher: Optional[JDMatcher] = None
+    ) -> Dict[str, Any]:
+        """
+        upload_resume for a batch of resumes that are already parsed, embedded
+        and named (see bulk_ingest.py). Each item has the upload_resume fields
+        plus candidate_name. All of them are written to the JD in one update,
+        and their summaries in one bulk write. A name that appears twice keeps
+        its last resume.
+        """
+        job = self.jobs_collection.find_one(
+            {"job_role": {"$regex": f"^{re.escape(job_role)}$", "$options": "i"}},
+            {
+                "job_role": 1,
+                "job_descriptions.title": 1,
+                "job_descriptions.embeddings": 1,
+                "job_descriptions.job_description": 1
+            }
+        )
+        matching_jd = next(
+            (jd for jd in (job or {}).get("job_descriptions") or [] if jd.get("title", "").lower() == job_title.lower()),
+            None
+        )
+        if not matching_jd:
+            return {"status": "error", "message": f"Job title '{job_title}' not found for role '{job_role}'"}
+
+        try:
+            latest = {resume["candidate_name"]: resume for resume in resumes}
+            candidates_data = [
+                self._candidate_record(job["job_role"], matching_jd, resume, screening, jd_matcher)
+                for resume in latest.values()
+            ]
+            keep = [
+                self._keeps_analysis(resume.get("duplicate_of"), job_role, job_title, resume["candidate_name"])
+                for resume in latest.values()
+            ]
+
+            before = self.jobs_collection.find_one_and_update(
+                {"_id": job["_id"]},
+                self._candidates_upsert_pipeline(matching_jd["title"], candidates_data, keep),
+                projection=self._candidate_projection(matching_jd["title"], list(latest)),
+                return_document=ReturnDocument.BEFORE
+            )
+            if not before or not before.get("job_descriptions"):
+                return {"status": "error", "message": f"Job title '{job_title}' not found"}
+
+            jd = before["job_descriptions"][0]
+            existing = {c["candidate_name"]: bool(c.get("has_analysis")) for c in jd.get("candidates") or []}
+            reused = [k and existing.get(c["candidate_name"], False) for c, k in zip(candidates_data, keep)]
+            self.summaries.record_uploads(before["job_role"], jd["title"], candidates_data, jd.get("location"), reused)
+            self._invalidate_ranking(before["job_role"], jd["title"])
+
+            return {
+                "status": "success",
+                "message": f"{len(candidates_data)} candidates written",
+                "job_role": before["job_role"],
+                "job_title": jd["title"],
+                "candidates": [
+                    {
+                        "candidate_name": c["candidate_name"],
+                        "status": "updated" if c["candidate_name"] in existing else "created",
+                        "analysis_reused": analysis_reused,
+                        "screening": c.get("screening"),
+                        "github_links": c["github_links"]
+                    }
+                    for c, analysis_reused in zip(candidates_data, reused)
+                ]
+            }
+
+        except Exception as e:
+            logger.error(f"Bulk resume upload error: {str(e)}")
+            return {"status": "error", "message": f"Failed to write {len(resumes)} resumes: {str(e)}"}
+
+    def _screen(self, policy: ScreeningPolicy, job_role: str, jd: Dict[str, Any], candidate_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Pre-scores a resume against its JD and decides whether it gets the full analysis"""
+        result = policy.pre_score(
+            candidate_data["embeddings"],
+            jd.get("embeddings"),
+            candidate_data["resume_content"],
+            jd.get("job_description", ""),
+            section_profile=profile_vector(candidate_data.get("section_embeddings"))
+        )
+        better = None
+        if result["score"] is not None and result["score"] < policy.threshold and policy.top_n > 0:
+            better = self.summaries.count_better_screened(job_role, jd["title"], result["score"])
+        result["decision"] = policy.decide(result["score"], better)
+        return result
+
+    @staticmethod
+    def _alternative_matches(jd_matcher: JDMatcher, job_role: str, job_title: str, embeddings: List[float]) -> List[Dict[str, Any]]:
+        # A suggestion is nice to have; it must never fail the upload
+        try:
+            return jd_matcher.alternatives(embeddings, job_role, job_title)
+        except Exception as e:
+            logger.error(f"Cross-JD matching failed: {str(e)}")
+            return []
+
+    @timed("storage.store_analysis")
+    def store_analysis(
+        self, job_role: str, candidate_name: str, job_title: str, force: bool = True, check_readmes: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Analyzes a candidate against a JD and stores the result with the hashes
+        of its inputs. With force=False only the parts whose inputs changed are
+        regenerated (see analysis_inputs), and nothing when none did;
+        check_readmes=False leaves README contents out of that comparison.
+        """
         try:
             logger.debug(f"Starting analysis for candidate: {candidate_name}, job role: {job_role}, job title: {job_title}")
             
@@ -356,30 +750,62 @@ class RecruitmentDataStorage:
                 logger.error(f"Candidate not found: {candidate_name}")
                 return {"status": "failed", "message": "Candidate not found"}
 
+            github_links = candidate.get("github_links", [])
+            github_analyzer = GitHubLinkAnalyzer()
+            previous = candidate.get("analysis") or {}
+
+            # The inputs that need no fetching are compared first: READMEs are
+            # only fetched when the GitHub analysis is redone anyway, or might
+            # be because their contents changed (check_readmes)
+            inputs = current_inputs(candidate, matching_jd)
+            changed = stale_inputs(previous.get("inputs"), inputs)
+            redo_github = force or stale_parts(changed)[1]
+            readmes = {}
+            if github_links and (redo_github or check_readmes):
+                readmes = {link: github_analyzer.fetch_readme(link) for link in github_links}
+                inputs = current_inputs(candidate, matching_jd, readmes=readmes)
+                changed = stale_inputs(previous.get("inputs"), inputs)
+            if not force and not changed:
+                return {
+                    "status": "success",
+                    "message": "Analysis is up to date",
+                    "candidate_name": candidate_name,
+                    "reanalyzed": []
+                }
+            redo_analysis, redo_github = (True, True) if force else stale_parts(changed)
+            previous_parts = {part.get("type"): part for part in previous.get("analyses") or []}
+
             # Analyze resume and job description
-            analyzer = LLMAnalyzer()
-            analysis_result = analyzer.analyze_resume_and_jd(
-                jd_text=jd_text,
-                resume_text=candidate["resume_content"]
-            )
+            if redo_analysis or "candidate_analysis" not in previous_parts:
+                analyzer = LLMAnalyzer()
+                # Only the sections that matter for this JD go into the prompt
+                analysis_result = analyzer.analyze_resume_and_jd(
+                    jd_text=jd_text,
+                    resume_text=prompt_resume_text(candidate, matching_jd)
+                )
+                candidate_analysis = {"type": "candidate_analysis", "content": analysis_result["analysis_text"]}
+                structured = {
+                    "structured": analysis_result.get("structured"),
+                    "structured_error": analysis_result.get("structured_error")
+                }
+                redo_analysis = True
+            else:
+                candidate_analysis = previous_parts["candidate_analysis"]
+                structured = {key: previous.get(key) for key in ("structured", "structured_error")}
 
-            # Initialize GitHub analyzer
-            github_analyzer = GitHubLinkAnalyzer()
-            
-            # Structure the analysis data with candidate analysis
+            # Structure the analysis data with candidate analysis; `structured` holds the validated fields (analysis_schema)
             analysis = {
-                "analyses": [
-                    {
-                        "type": "candidate_analysis",
-                        "content": analysis_result["analysis_text"]
-                    }
-                ],
-                "github_links": candidate.get("github_links", [])
+                "analyses": [candidate_analysis],
+                "github_links": github_links,
+                **structured
             }
 
             # Analyze GitHub repositories if links are available
-            github_links = candidate.get("github_links", [])
-            if github_links:
+            if github_links and not redo_github:
+                analysis["analyses"] += [
+                    part for kind, part in previous_parts.items() if kind in ("github_analysis", "github_analysis_error")
+                ]
+            elif github_links:
                 try:
                     # Process each GitHub link individually
                     all_github_analyses = []
@@ -388,7 +814,8 @@ class RecruitmentDataStorage:
                             # Analyze single repository with correct parameters
                             repo_analysis = github_analyzer.analyze_readme(
                                 github_link=link,  # Pass as named parameter
-                                jd_text=jd_text
+                                jd_text=jd_text,
+                                readme_content=readmes.get(link)
                             )
                             if repo_analysis:
                                 all_github_analyses.append(f"Analysis for {link}:\n{repo_analysis}")
@@ -411,6 +838,17 @@ class RecruitmentDataStorage:
                         "content": error_msg
                     })
 
+            if github_links and not redo_github:
+                # The kept GitHub analysis was made from the READMEs recorded with it
+                inputs = {key: value for key, value in inputs.items() if key != "readmes"}
+                if "readmes" in (previous.get("inputs") or {}):
+                    inputs["readmes"] = previous["inputs"]["readmes"]
+            analysis["inputs"] = recorded_inputs(
+                inputs,
+                failed=str(candidate_analysis.get("content") or "").startswith("Error"),
+                structured_error=bool(structured.get("structured_error"))
+            )
+
             # Update the database with the complete analysis structure
             update_query = {"_id": job["_id"]}
             update_operation = {
@@ -432,13 +870,19 @@ class RecruitmentDataStorage:
                 logger.error("Failed to update analysis in database")
                 return {"status": "error", "message": "Failed to store analysis in database"}
 
+            self.summaries.record_analysis(job["job_role"], matching_jd["title"], candidate["candidate_name"], analysis)
+
             # Fetch and return the updated document
             updated_job = self.jobs_collection.find_one({"_id": job["_id"]})
             return {
                 "status": "success",
                 "message": "Analysis completed and stored successfully",
-                "data": self._convert_mongodb_doc(updated_job),
-                "candidate_name": candidate_name
+                "data": updated_job,
+                "candidate_name": candidate_name,
+                "reanalyzed": [
+                    part for part, redone in (("candidate_analysis", redo_analysis), ("github_analysis", redo_github and bool(github_links)))
+                    if redone
+                ]
             }
 
         except Exception as e:
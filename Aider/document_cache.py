@@ -0,0 +1,168 @@
+import datetime
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from metrics import record_cache
+from mongo_connection import get_database
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the parsed form changes; older entries are re-parsed.
+# 2: line breaks kept in PDF/DOCX text, section embeddings for resumes
+CACHE_FORMAT = 2
+
+
+class DocumentCache:
+    """
+    Content-addressed cache for parsed uploads.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes and hold the extracted
+    text, the links found in the document, its pooled and per-chunk embeddings
+    and, for resumes, its per-section embeddings. The most
+    recently used entries are kept in memory (bounded by entry count and size);
+    every entry is also written to a Mongo collection so evicted entries, and
+    entries produced by other workers, can still be served without re-parsing.
+    """
+
+    def __init__(
+        self,
+        connection_string: Optional[str] = None,
+        max_entries: int = 256,
+        max_bytes: int = 64 * 1024 * 1024,
+        collection_name: str = "document_cache"
+    ):
+        self.connection_string = connection_string
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.collection_name = collection_name
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._collection = None
+        self._collection_failed = False
+
+    @staticmethod
+    def digest(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def _get_collection(self):
+        if self._collection is not None or self._collection_failed:
+            return self._collection
+        if not self.connection_string:
+            self._collection_failed = True
+            return None
+
+        try:
+            self._collection = get_database(self.connection_string)[self.collection_name]
+        except Exception as e:
+            logger.error(f"Document cache could not connect to MongoDB: {str(e)}")
+            self._collection_failed = True
+        return self._collection
+
+    @staticmethod
+    def _entry_size(entry: Dict[str, Any]) -> int:
+        size = len(entry.get("text", "").encode("utf-8"))
+        size += 8 * len(entry.get("embeddings") or [])
+        size += sum(len(link) for link in entry.get("github_links") or [])
+        size += len((entry.get("chunk_embeddings") or {}).get("data") or b"")
+        size += len((entry.get("section_embeddings") or {}).get("data") or b"")
+        return size
+
+    def _remember(self, digest: str, entry: Dict[str, Any]) -> None:
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if digest in self._entries:
+                self._total_bytes -= self._sizes[digest]
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            self._sizes[digest] = size
+            self._total_bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+            ):
+                evicted, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted)
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                record_cache("document_memory", True)
+                return entry
+        record_cache("document_memory", False)
+
+        collection = self._get_collection()
+        if collection is None:
+            return None
+
+        try:
+            doc = collection.find_one({"_id": digest})
+        except Exception as e:
+            logger.error(f"Error reading document cache: {str(e)}")
+            return None
+
+        if doc and doc.get("format") != CACHE_FORMAT:
+            doc = None
+        record_cache("document_mongo", bool(doc))
+        if not doc:
+            return None
+
+        entry = {
+            "text": doc.get("text", ""),
+            "github_links": doc.get("github_links", []),
+            "embeddings": doc.get("embeddings", []),
+            "chunk_embeddings": doc.get("chunk_embeddings"),
+            "section_embeddings": doc.get("section_embeddings")
+        }
+        self._remember(digest, entry)
+        return entry
+
+    def put(
+        self,
+        digest: str,
+        text: str,
+        github_links: Optional[List[str]] = None,
+        embeddings: Optional[Any] = None,
+        chunk_embeddings: Optional[Dict[str, Any]] = None,
+        section_embeddings: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        if isinstance(embeddings, np.ndarray):
+            embeddings = embeddings.tolist()
+
+        entry = {
+            "text": text,
+            "github_links": github_links or [],
+            "embeddings": embeddings or [],
+            "chunk_embeddings": chunk_embeddings,
+            "section_embeddings": section_embeddings
+        }
+        self._remember(digest, entry)
+
+        collection = self._get_collection()
+        if collection is not None:
+            try:
+                collection.update_one(
+                    {"_id": digest},
+                    {
+                        "$set": {**entry, "format": CACHE_FORMAT},
+                        "$setOnInsert": {"created_at": datetime.datetime.utcnow()}
+                    },
+                    upsert=True
+                )
+            except Exception as e:
+                logger.error(f"Error writing document cache: {str(e)}")
+
+        return entry
+
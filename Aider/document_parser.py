@@ -1,10 +1,10 @@
-from sentence_transformers import SentenceTransformer
 import os
 from dotenv import load_dotenv
-import docx
-import PyPDF2
 import numpy as np
-from typing import Union, Tuple
+import re
+import threading
+from metrics import stage, timed
+from typing import Any, Dict, Optional, Union, Tuple, BinaryIO, List
 from pathlib import Path
 import logging
 
@@ -14,34 +14,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class DocumentParser:
-    def __init__(self):
-        load_dotenv()
-        
+# all-MiniLM-L6-v2 truncates at 256 word pieces, roughly 180 words of resume text
+CHUNK_MAX_WORDS = 180
+CHUNK_OVERLAP_WORDS = 30
+
+_SECTION_BREAK = re.compile(r'\n\s*\n|\n(?=[A-Z][A-Za-z &/]{2,40}:?\s*\n)')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?;])\s+|\s*\n\s*|\s+(?=[•▪●◦·\-\*] )')
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# One model per process, shared by every DocumentParser and loaded on first use
+_model_lock = threading.Lock()
+_model_state = {"model": None, "status": "not_loaded", "error": None}
+
+
+def load_embedding_model():
+    if _model_state["status"] in ("loaded", "failed"):
+        return _model_state["model"]
+
+    with _model_lock:
+        if _model_state["status"] in ("loaded", "failed"):
+            return _model_state["model"]
+
+        _model_state["status"] = "loading"
         try:
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            # sentence_transformers pulls in torch, so it is only imported here
+            with stage("embedding.model_load"):
+                from sentence_transformers import SentenceTransformer
+                _model_state["model"] = SentenceTransformer(EMBEDDING_MODEL_NAME)
+            _model_state["status"] = "loaded"
             logger.info("Embedding model initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing embedding model: {str(e)}")
-            self.embedding_model = None
+            _model_state["error"] = str(e)
+            _model_state["status"] = "failed"
+
+    return _model_state["model"]
+
+
+def embedding_model_status() -> dict:
+    return {"status": _model_state["status"], "error": _model_state["error"]}
+
+
+class DocumentParser:
+    def __init__(self):
+        load_dotenv()
+
+    @property
+    def embedding_model(self):
+        return load_embedding_model()
+
+    def warm_up(self) -> bool:
+        return self.embedding_model is not None
 
-    def extract_text_from_file(self, file: Union[str, Path, bytes], filename: str) -> str:
+    @timed("parser.extract_text")
+    def extract_text_from_file(self, file: Union[str, Path, bytes, BinaryIO], filename: str) -> str:
         """Returns tuple of (extracted_text, error_message)"""
         file_extension = os.path.splitext(filename)[1].lower()
         
         try:
             if file_extension == '.pdf':
                 print("file extension is indeed pdf")
+                import PyPDF2
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = " ".join([page.extract_text() for page in pdf_reader.pages])
+                # Line breaks are kept: resume segmentation relies on heading lines
+                text = "\n\n".join([page.extract_text() or "" for page in pdf_reader.pages])
                 
                 if not text.strip():
                     return "", "PDF appears to be empty or unreadable"
                 return text, ""
                 
             elif file_extension == '.docx':
+                import docx
                 doc = docx.Document(file)
-                text = " ".join([paragraph.text for paragraph in doc.paragraphs])
+                text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
                 if not text.strip():
                     return "", "DOCX appears to be empty or unreadable"
                 return text, ""
@@ -88,17 +134,157 @@ class DocumentParser:
             logger.error(f"Failed to parse job description: {error}")
             raise ValueError(f"Failed to parse job description: {error}")
     
-    def get_embeddings(self, text: str) -> np.ndarray:
-        if not text.strip():
-            logger.error("Cannot generate embeddings for empty text")
-            return np.array([])
-            
+    @staticmethod
+    def chunk_text(text: str, max_words: int = CHUNK_MAX_WORDS, overlap_words: int = CHUNK_OVERLAP_WORDS) -> List[str]:
+        """
+        Splits text into windows that fit the embedding model.
+        Windows never cross a section break, are built from whole sentences where
+        possible and repeat the last sentences of the previous window as overlap.
+        """
+        chunks = []
+        heading = ""
+        for section in _SECTION_BREAK.split(text):
+            # A bare heading is carried into the section it introduces
+            if len(section.split()) <= 5 and not section.strip().endswith('.'):
+                heading = f"{heading} {section.strip()}".strip()
+                continue
+            if heading:
+                section = f"{heading}\n{section}"
+                heading = ""
+
+            sentences = []
+            for sentence in _SENTENCE_BREAK.split(section):
+                words = sentence.split()
+                # Sentences longer than a window are cut into window-sized pieces
+                for start in range(0, len(words), max_words):
+                    sentences.append(words[start:start + max_words])
+
+            window = []
+            window_words = 0
+            for words in sentences:
+                if window and window_words + len(words) > max_words:
+                    chunks.append(" ".join(w for sentence in window for w in sentence))
+                    overlap = []
+                    overlap_count = 0
+                    for previous in reversed(window):
+                        if overlap_count + len(previous) > overlap_words:
+                            break
+                        overlap.insert(0, previous)
+                        overlap_count += len(previous)
+                    window = overlap
+                    window_words = overlap_count
+                window.append(words)
+                window_words += len(words)
+
+            if window_words:
+                chunks.append(" ".join(w for sentence in window for w in sentence))
+
+        if heading:
+            chunks.append(" ".join(heading.split()))
+        return chunks
+
+    def _encode_chunks(self, chunks: List[str]) -> Optional[np.ndarray]:
+        """All chunks in a single batched model call; rows are normalized"""
         if self.embedding_model is None:
             logger.error("Embedding model not initialized")
-            return np.array([])
-
+            return None
         try:
-            return self.embedding_model.encode(text)
+            with stage("embedding.encode"):
+                return self.embedding_model.encode(
+                    chunks,
+                    batch_size=len(chunks),
+                    normalize_embeddings=True,
+                    convert_to_numpy=True
+                ).astype(np.float32)
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
-            return np.array([])
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def _pool(chunks: List[str], chunk_matrix: np.ndarray) -> np.ndarray:
+        """Word-count weighted mean of the chunk vectors, normalized"""
+        weights = np.array([len(chunk.split()) for chunk in chunks], dtype=np.float32)
+        pooled = (chunk_matrix * weights[:, None]).sum(axis=0) / weights.sum()
+        norm = np.linalg.norm(pooled)
+        if norm > 0:
+            pooled = pooled / norm
+        return pooled
+
+    def embed_document(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (pooled_vector, chunk_matrix) for a document.
+        All chunks are encoded in a single batched model call; the pooled vector is
+        the word-count weighted mean of the normalized chunk vectors.
+        """
+        empty = (np.array([]), np.zeros((0, 0), dtype=np.float32))
+        if not text or not text.strip():
+            logger.error("Cannot generate embeddings for empty text")
+            return empty
+
+        chunks = self.chunk_text(text)
+        if not chunks:
+            return empty
+
+        chunk_matrix = self._encode_chunks(chunks)
+        if chunk_matrix is None:
+            return empty
+        return self._pool(chunks, chunk_matrix), chunk_matrix
+
+    def embed_resume(self, text: str) -> Tuple[np.ndarray, np.ndarray, Optional[Dict[str, Any]]]:
+        """
+        Like embed_document, plus one vector per resume section (see
+        resume_sections). The text is chunked section by section, so the
+        section vectors are pooled from the same single batch of chunks and
+        cost no extra model call.
+        """
+        return self.embed_resumes([text])[0]
+
+    def embed_resumes(self, texts: List[str]) -> List[Tuple[np.ndarray, np.ndarray, Optional[Dict[str, Any]]]]:
+        """embed_resume for many resumes, with the chunks of all of them encoded in one model call"""
+        from resume_sections import group_sections, pack_sections, section_text
+
+        empty = (np.array([]), np.zeros((0, 0), dtype=np.float32), None)
+        chunks, owners, grouped = [], [], []
+        for document, text in enumerate(texts):
+            if not text or not text.strip():
+                logger.error("Cannot generate embeddings for empty text")
+                grouped.append({})
+                continue
+            grouped.append(group_sections(text))
+            for section, spans in enumerate(grouped[-1].values()):
+                for chunk in self.chunk_text(section_text(text, spans)):
+                    chunks.append(chunk)
+                    owners.append((document, section))
+        if not chunks:
+            return [empty for _ in texts]
+
+        chunk_matrix = self._encode_chunks(chunks)
+        if chunk_matrix is None:
+            return [empty for _ in texts]
+
+        documents = np.asarray([document for document, _ in owners])
+        sections = np.asarray([section for _, section in owners])
+        results = []
+        for document, sections_of in enumerate(grouped):
+            rows = np.flatnonzero(documents == document)
+            if not len(rows):
+                results.append(empty)
+                continue
+            names, spans, vectors = [], [], []
+            for section, (name, section_spans) in enumerate(sections_of.items()):
+                members = rows[sections[rows] == section]
+                if not len(members):
+                    continue
+                names.append(name)
+                spans.append(section_spans)
+                vectors.append(self._pool([chunks[i] for i in members], chunk_matrix[members]))
+            results.append((
+                self._pool([chunks[i] for i in rows], chunk_matrix[rows]),
+                chunk_matrix[rows],
+                pack_sections(names, spans, np.asarray(vectors))
+            ))
+        return results
+
+    def get_embeddings(self, text: str) -> np.ndarray:
+        pooled, _ = self.embed_document(text)
+        return pooled
\ No newline at end of file
@@ -0,0 +1,157 @@
+import datetime
+import logging
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, Any, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from bson.binary import Binary
+
+logger = logging.getLogger(__name__)
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_SIZE = 5
+REFRESH_OVERLAP_SECONDS = 60
+
+_SHIFT = np.uint64(32)
+_rng = np.random.RandomState(1)
+# Fixed seed so signatures stored in Mongo stay comparable across processes.
+# Multiply-shift hashing: odd 64-bit multipliers, high 32 bits of a*x + b (mod 2**64)
+_PERM_A = _rng.randint(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.randint(0, 1 << 63, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+_WORD = re.compile(r'[a-z0-9+#]+')
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        words = words + [""] * (size - len(words))
+    shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """128 MinHash values over word 5-shingles of the text"""
+    hashes = shingle_hashes(text)
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) >> _SHIFT
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def name_in_text(name: Optional[str], text: str) -> bool:
+    """Whether every word of the name occurs in the text, ignoring case"""
+    words = _WORD.findall((name or "").lower())
+    if not words:
+        return False
+    text_words = set(_WORD.findall(text.lower()))
+    return all(word in text_words for word in words)
+
+
+def pack_signature(signature: np.ndarray) -> Binary:
+    return Binary(np.asarray(signature, dtype=np.uint32).tobytes())
+
+
+def unpack_signature(packed: Optional[bytes]) -> Optional[np.ndarray]:
+    if not packed:
+        return None
+    signature = np.frombuffer(bytes(packed), dtype=np.uint32)
+    return signature if signature.size == NUM_PERMUTATIONS else None
+
+
+class NearDuplicateIndex:
+    """
+    MinHash LSH index over resume texts.
+
+    Signatures are split into LSH_BANDS bands of LSH_ROWS values; two documents
+    become candidates when any band matches exactly, and candidates are then
+    confirmed by the fraction of equal MinHash values (an estimate of their
+    shingle Jaccard similarity).
+
+    Every process holds its own index. Uploads written by other workers or by
+    bulk_ingest.py are picked up by calling load() again with the fingerprints
+    uploaded since `watermark` (see refresh_due), so they are missed for at
+    most one refresh interval.
+    """
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(LSH_BANDS)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.loaded_at = 0.0
+        self.watermark: Optional[datetime.datetime] = None
+
+    @staticmethod
+    def _bands(signature: np.ndarray) -> Iterable[Tuple[int, bytes]]:
+        for band in range(LSH_BANDS):
+            yield band, signature[band * LSH_ROWS:(band + 1) * LSH_ROWS].tobytes()
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        with self._lock:
+            if key in self._signatures:
+                self._remove(key)
+            self._signatures[key] = signature
+            for band, bucket_key in self._bands(signature):
+                self._buckets[band][bucket_key].append(key)
+
+    def _remove(self, key: Hashable) -> None:
+        signature = self._signatures.pop(key)
+        for band, bucket_key in self._bands(signature):
+            bucket = self._buckets[band].get(bucket_key)
+            if bucket and key in bucket:
+                bucket.remove(key)
+
+    def query(self, signature: np.ndarray, threshold: Optional[float] = None) -> List[Tuple[Hashable, float]]:
+        """Returns (key, estimated_similarity) for indexed documents above the threshold, best first"""
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates = set()
+            for band, bucket_key in self._bands(signature):
+                candidates.update(self._buckets[band].get(bucket_key, ()))
+
+            matches = []
+            for key in candidates:
+                similarity = float(np.mean(self._signatures[key] == signature))
+                if similarity >= threshold:
+                    matches.append((key, similarity))
+
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def load(self, fingerprints: Iterable[Tuple[Hashable, Any, Optional[datetime.datetime]]]) -> int:
+        """Adds (key, packed signature, uploaded_at) fingerprints; returns how many"""
+        count = 0
+        for key, packed, uploaded_at in fingerprints:
+            signature = unpack_signature(packed)
+            if signature is not None:
+                self.add(key, signature)
+                count += 1
+            if uploaded_at and (self.watermark is None or uploaded_at > self.watermark):
+                self.watermark = uploaded_at
+        if not self.loaded:
+            logger.info(f"Near-duplicate index loaded with {count} fingerprints")
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+        return count
+
+    def refresh_due(self, interval: float) -> bool:
+        return not self.loaded or time.monotonic() - self.loaded_at >= interval
+
+    def refresh_since(self) -> Optional[datetime.datetime]:
+        """Where the next load() should start; overlaps a little, as writes commit out of upload order"""
+        if self.watermark is None:
+            return None
+        return self.watermark - datetime.timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+
+    def __len__(self) -> int:
+        return len(self._signatures)
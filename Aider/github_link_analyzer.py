@@ -1,18 +1,21 @@
-import fitz  # PyMuPDF
 import re
 import requests
 import logging
 from typing import List, Dict, Optional
-from groq import Groq
 import os
 from contextlib import suppress
 from dotenv import load_dotenv
+from metrics import timed, record_llm_usage
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+README_MODEL = os.getenv("README_ANALYSIS_MODEL", "llama-3.3-70b-versatile")
+# Bump when the README analysis prompt changes (see analysis_inputs)
+README_PROMPT_VERSION = 1
+
 class GitHubLinkAnalyzer:
     """
     extract_links_from_pdf: Extracts all links from a PDF file
@@ -23,10 +26,13 @@ class GitHubLinkAnalyzer:
     
     def __init__(self):
         
+        from groq import Groq
         self.client = Groq(api_key=os.getenv('GROQ_API_KEY'))
     
+    @timed("github.extract_links")
     def extract_links_from_pdf(self, pdf_path: str) -> List[str]:
         try:
+            import fitz  # PyMuPDF
             logger.debug(f"Opening PDF file: {pdf_path}")
             with fitz.open(pdf_path) as doc:
                 all_links = []
@@ -62,11 +68,13 @@ class GitHubLinkAnalyzer:
             logger.error(f"Error filtering GitHub links: {str(e)}")
             return []
     
+    @timed("github.fetch_readme")
     def fetch_readme(self, github_link: str) -> Optional[str]:
         
+        raw_base = os.getenv('GITHUB_RAW_BASE_URL', 'https://raw.githubusercontent.com').rstrip('/') + '/'
         readme_urls = [
-            github_link.replace('https://github.com/', 'https://raw.githubusercontent.com/') + '/main/README.md',
-            github_link.replace('https://github.com/', 'https://raw.githubusercontent.com/') + '/master/README.md',
+            github_link.replace('https://github.com/', raw_base) + '/main/README.md',
+            github_link.replace('https://github.com/', raw_base) + '/master/README.md',
             github_link.rstrip('/') + '/raw/main/README.md',
             github_link.rstrip('/') + '/raw/master/README.md'
         ]
@@ -86,8 +94,10 @@ class GitHubLinkAnalyzer:
     
     
 
-    def analyze_readme(self, github_link: str, jd_text: str) -> str:
-        readme_content = self.fetch_readme(github_link)
+    @timed("github.analyze_readme")
+    def analyze_readme(self, github_link: str, jd_text: str, readme_content: Optional[str] = None) -> str:
+        if readme_content is None:
+            readme_content = self.fetch_readme(github_link)
             
         if not readme_content:
             return "No README content available for analysis."
@@ -123,11 +133,12 @@ class GitHubLinkAnalyzer:
                                 Format your response in clear, structured markdown."""
                         }
                     ],
-                    model="llama-3.3-70b-versatile",
+                    model=README_MODEL,
                     max_tokens=1024,
                     temperature=0
                 )
                 
+                record_llm_usage("analyze_readme", chat_completion)
                 analysis = chat_completion.choices[0].message.content
                 return analysis
         
@@ -0,0 +1,248 @@
+"""
+Idempotency-Key support for the expensive POST endpoints.
+
+The first request with a given key claims it in the `idempotency_keys`
+collection and runs; its response is stored there (a TTL index expires it).
+A retry with the same key gets the stored response back, or, if the first
+attempt is still running, waits for it: in the same worker it awaits the
+running task directly, in other workers it polls the stored record. A key
+reused with a different request is rejected with 422. Server errors and
+rate-limit rejections are not stored, so those can be retried.
+"""
+import asyncio
+import datetime
+import hashlib
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
+
+from metrics import Counter
+from mongo_connection import get_database
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_REQUESTS = Counter(
+    "recruitment_idempotency_requests_total",
+    "Requests carrying an Idempotency-Key by outcome",
+    ["scope", "outcome"]
+)
+
+MAX_KEY_LENGTH = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# (status code, body, media type)
+StoredResponse = Tuple[int, bytes, str]
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """Hash of everything that identifies the request behind a key"""
+    sha256 = hashlib.sha256()
+    for part in parts:
+        sha256.update(str(part).encode("utf-8"))
+        sha256.update(b"\x00")
+    return sha256.hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(
+        self,
+        connection_string: Optional[str] = None,
+        ttl_seconds: int = 24 * 3600,
+        lease_seconds: int = 300,
+        wait_seconds: float = 120.0,
+        poll_interval: float = 0.5,
+        collection_name: str = "idempotency_keys"
+    ):
+        self.connection_string = connection_string
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.wait_seconds = wait_seconds
+        self.poll_interval = poll_interval
+        self.collection_name = collection_name
+        self.owner = uuid.uuid4().hex
+
+        self._inflight: Dict[str, "asyncio.Future[StoredResponse]"] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._collection = None
+
+    def _get_collection(self):
+        if self._collection is None:
+            collection = get_database(self.connection_string)[self.collection_name]
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._collection = collection
+        return self._collection
+
+    @staticmethod
+    def _now() -> datetime.datetime:
+        return datetime.datetime.utcnow()
+
+    def _claim(self, doc_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Claims the key; returns None when claimed, otherwise the existing record"""
+        collection = self._get_collection()
+        now = self._now()
+        record = {
+            "_id": doc_id,
+            "fingerprint": fingerprint,
+            "state": "in_progress",
+            "owner": self.owner,
+            "locked_until": now + datetime.timedelta(seconds=self.lease_seconds),
+            "created_at": now,
+            "expires_at": now + datetime.timedelta(seconds=self.ttl_seconds)
+        }
+        try:
+            collection.insert_one(record)
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # A worker that died mid-request leaves an in-progress record behind; take it over once its lease ran out
+        taken = collection.find_one_and_update(
+            {"_id": doc_id, "state": "in_progress", "fingerprint": fingerprint, "locked_until": {"$lt": now}},
+            {"$set": {"owner": self.owner, "locked_until": record["locked_until"]}}
+        )
+        if taken:
+            return None
+        return collection.find_one({"_id": doc_id}) or {"state": "in_progress", "fingerprint": fingerprint}
+
+    def _complete(self, doc_id: str, response: StoredResponse) -> None:
+        status_code, body, media_type = response
+        now = self._now()
+        self._get_collection().update_one(
+            {"_id": doc_id, "owner": self.owner},
+            {"$set": {
+                "state": "completed",
+                "status_code": status_code,
+                "body": body,
+                "media_type": media_type,
+                "completed_at": now,
+                "expires_at": now + datetime.timedelta(seconds=self.ttl_seconds)
+            }}
+        )
+
+    def _release(self, doc_id: str) -> None:
+        self._get_collection().delete_one({"_id": doc_id, "owner": self.owner, "state": "in_progress"})
+
+    @staticmethod
+    def _stored(record: Dict[str, Any]) -> StoredResponse:
+        return record["status_code"], bytes(record["body"]), record.get("media_type") or "application/json"
+
+    @staticmethod
+    def _to_response(stored: StoredResponse, replayed: bool) -> Response:
+        status_code, body, media_type = stored
+        headers = {REPLAY_HEADER: "true"} if replayed else None
+        return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+    @staticmethod
+    def _mismatch() -> HTTPException:
+        return HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different request"
+        )
+
+    @staticmethod
+    def _storable(status_code: int) -> bool:
+        # Rate-limit rejections and server errors are transient: let the client retry them
+        return status_code < 500 and status_code != 429
+
+    async def _wait_for_other_worker(self, doc_id: str, fingerprint: str) -> Optional[StoredResponse]:
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            record = await run_in_threadpool(self._get_collection().find_one, {"_id": doc_id})
+            if record is None:
+                # The first attempt failed and released the key
+                return None
+            if record.get("fingerprint") != fingerprint:
+                raise self._mismatch()
+            if record.get("state") == "completed":
+                return self._stored(record)
+            if record.get("locked_until") and record["locked_until"] < self._now():
+                return None
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": str(max(1, int(self.poll_interval * 4)))}
+        )
+
+    async def execute(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        handler: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        """Runs handler at most once per (scope, key) and replays its response for retries"""
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+        doc_id = f"{scope}:{key}"
+
+        while True:
+            inflight = self._inflight.get(doc_id)
+            if inflight is not None:
+                if self._fingerprints.get(doc_id) != fingerprint:
+                    raise self._mismatch()
+                IDEMPOTENCY_REQUESTS.inc(scope=scope, outcome="joined")
+                # shield: a client hanging up on the retry must not cancel the original run
+                stored = await asyncio.shield(inflight)
+                return self._to_response(stored, replayed=True)
+
+            existing = await run_in_threadpool(self._claim, doc_id, fingerprint)
+            if existing is None:
+                break
+            if existing.get("fingerprint") != fingerprint:
+                raise self._mismatch()
+            if existing.get("state") == "completed":
+                IDEMPOTENCY_REQUESTS.inc(scope=scope, outcome="replayed")
+                return self._to_response(self._stored(existing), replayed=True)
+            if existing.get("owner") == self.owner and doc_id in self._inflight:
+                # Claimed by another request of this worker while we were talking to Mongo
+                continue
+
+            IDEMPOTENCY_REQUESTS.inc(scope=scope, outcome="waited")
+            stored = await self._wait_for_other_worker(doc_id, fingerprint)
+            if stored is not None:
+                return self._to_response(stored, replayed=True)
+            # Released or abandoned: loop round and try to claim it ourselves
+
+        IDEMPOTENCY_REQUESTS.inc(scope=scope, outcome="executed")
+        future: "asyncio.Future[StoredResponse]" = asyncio.get_running_loop().create_future()
+        self._inflight[doc_id] = future
+        self._fingerprints[doc_id] = fingerprint
+        try:
+            try:
+                response = await handler()
+                stored = (response.status_code, bytes(response.body), response.media_type or "application/json")
+            except HTTPException as e:
+                if not self._storable(e.status_code):
+                    raise
+                stored = (e.status_code, json.dumps({"detail": e.detail}).encode("utf-8"), "application/json")
+        except BaseException as e:
+            try:
+                await run_in_threadpool(self._release, doc_id)
+            except Exception as release_error:
+                logger.error(f"Could not release idempotency key {doc_id}: {str(release_error)}")
+            if not future.done():
+                future.set_exception(e if isinstance(e, Exception) else HTTPException(status_code=500, detail="Request was cancelled"))
+                # Mark retrieved so an exception nobody joined on is not logged as unhandled
+                future.exception()
+            raise
+        else:
+            try:
+                if self._storable(stored[0]):
+                    await run_in_threadpool(self._complete, doc_id, stored)
+                else:
+                    await run_in_threadpool(self._release, doc_id)
+            except Exception as e:
+                # The work is done; a retry after this will simply run it again
+                logger.error(f"Could not record idempotency key {doc_id}: {str(e)}")
+            future.set_result(stored)
+            return self._to_response(stored, replayed=False)
+        finally:
+            self._inflight.pop(doc_id, None)
+            self._fingerprints.pop(doc_id, None)
@@ -0,0 +1,118 @@
+"""
+Cross-JD matching: which other open JDs fit a resume.
+
+Every JD embedding across all roles is kept per worker in one L2-normalized
+float32 matrix, so scoring a resume against all of them is a single
+matrix-vector product and a partial sort. The matrix is reloaded when
+upload_jd bumps the `jds` generation counter (see listing_cache).
+"""
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from listing_cache import GENERATIONS_COLLECTION, local_generation, read_generation
+from metrics import TimedCollection, record_cache, stage
+from mongo_connection import get_database
+from vector_utils import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+JDS_GENERATION_ID = "jds"
+
+
+class JDMatrix:
+    def __init__(self, keys: List[Tuple[str, str, Optional[str]]], matrix: np.ndarray):
+        self.keys = keys  # (job_role, title, location)
+        self.matrix = matrix
+        self._lookup = {(role.lower(), title.lower()): i for i, (role, title, _) in enumerate(keys)}
+
+    def index_of(self, job_role: str, job_title: str) -> Optional[int]:
+        return self._lookup.get((job_role.lower(), job_title.lower()))
+
+    def top_k(self, vector: np.ndarray, k: int, exclude: Optional[int] = None, min_similarity: float = 0.0) -> List[Tuple[int, float]]:
+        if not len(self.keys) or vector.shape != (self.matrix.shape[1],):
+            return []
+        scores = self.matrix @ vector
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] >= min_similarity]
+
+
+class JDMatcher:
+    def __init__(self, connection_string: Optional[str] = None, top_k: int = 3, min_similarity: float = 0.3, check_interval: float = 0.5):
+        self.connection_string = connection_string
+        self.top_k = top_k
+        self.min_similarity = min_similarity
+        self.check_interval = check_interval
+
+        self._entry: Optional[Tuple[int, JDMatrix]] = None
+        self._checked: Tuple[float, int] = (0.0, 0)
+        self._lock = threading.Lock()
+
+    def _generation(self) -> int:
+        now = time.monotonic()
+        checked_at, generation = self._checked
+        if now - checked_at >= self.check_interval:
+            generation = read_generation(get_database(self.connection_string)[GENERATIONS_COLLECTION], JDS_GENERATION_ID)
+            self._checked = (now, generation)
+        return max(generation, local_generation(JDS_GENERATION_ID))
+
+    def _load(self) -> JDMatrix:
+        jobs = TimedCollection(get_database(self.connection_string)['jobs'])
+        keys, rows = [], []
+        dimension = None
+        projection = {"job_role": 1, "job_descriptions.title": 1, "job_descriptions.location": 1, "job_descriptions.embeddings": 1}
+        for job in jobs.find({"job_descriptions": {"$exists": True}}, projection):
+            for jd in job.get("job_descriptions") or []:
+                vector = jd.get("embeddings") or []
+                dimension = dimension or len(vector)
+                if not vector or len(vector) != dimension or not jd.get("title"):
+                    continue
+                keys.append((job["job_role"], jd["title"], jd.get("location")))
+                rows.append(vector)
+        matrix = normalize_rows(np.asarray(rows, dtype=np.float32)) if rows else np.zeros((0, dimension or 0), dtype=np.float32)
+        return JDMatrix(keys, np.ascontiguousarray(matrix))
+
+    def matrix(self) -> JDMatrix:
+        generation = self._generation()
+        entry = self._entry
+        if entry is not None and entry[0] == generation:
+            record_cache("jd_matrix", True)
+            return entry[1]
+        record_cache("jd_matrix", False)
+        with self._lock:
+            entry = self._entry
+            if entry is None or entry[0] != generation:
+                with stage("jd_matching.load_matrix"):
+                    entry = (generation, self._load())
+                self._entry = entry
+        return entry[1]
+
+    def alternatives(self, vector: Sequence[float], job_role: str, job_title: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The JDs other than (job_role, job_title) that are closest to a resume embedding"""
+        vector = np.asarray(vector or [], dtype=np.float32)
+        if vector.ndim != 1 or not vector.size:
+            return []
+        jd_matrix = self.matrix()
+        with stage("jd_matching.score"):
+            matches = jd_matrix.top_k(
+                normalize_rows(vector),
+                k or self.top_k,
+                exclude=jd_matrix.index_of(job_role, job_title),
+                min_similarity=self.min_similarity
+            )
+        return [
+            {
+                "job_role": jd_matrix.keys[i][0],
+                "job_title": jd_matrix.keys[i][1],
+                "location": jd_matrix.keys[i][2],
+                "similarity": round(score, 4)
+            }
+            for i, score in matches
+        ]
@@ -0,0 +1,60 @@
+"""
+Single-pass JSON encoding for API responses.
+
+Mongo documents are returned as they come from the driver: ObjectId,
+datetime, NumPy values and binary embeddings (bson.Binary) are encoded
+directly by the response class instead of being converted in Python first.
+orjson is used when installed; the standard library encoder is the fallback.
+"""
+import base64
+import datetime
+import json
+from typing import Any
+
+import numpy as np
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+def encode_default(obj: Any) -> Any:
+    """Fallback for types neither encoder handles natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        # Covers bson.Binary, i.e. packed chunk embeddings
+        return base64.b64encode(bytes(obj)).decode("ascii")
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=encode_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            content,
+            default=encode_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that serializes Mongo documents in one pass"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,307 @@
+"""
+BM25 keyword index over resume text, for hard-skill queries ("Kubernetes",
+"Rust", "C++").
+
+Postings are kept per term in two `array` buffers (document ids as uint32,
+term frequencies as uint16), so 100k resumes cost a few bytes per posting
+rather than a Python object each, and an upload only appends to the buffers
+of its own terms. A query views the buffers of its terms as NumPy arrays and
+accumulates BM25 scores for all documents with bincount, so latency depends
+on the postings of the query terms, not on the number of resumes. A
+re-uploaded candidate gets a new document id; the old one is masked out as
+dead and dropped from the postings by compact().
+"""
+import datetime
+import logging
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ann_index import candidate_documents
+from metrics import stage
+from mongo_connection import get_database
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str, str]  # (job_role, job_title, candidate_name)
+
+# Keeps skill tokens such as c++, c#, node.js and ci/cd intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it of on or that the this to was were will with "
+    "i me my we our you your he she they their".split()
+)
+MAX_TF = 65535
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._terms: Dict[str, int] = {}
+        self._postings: List[Tuple[array, array]] = []
+        self._keys: List[Key] = []
+        self._lengths = array("I")
+        self._roles = array("i")
+        self._titles = array("i")
+        self._alive = bytearray()
+        self._role_codes: Dict[str, int] = {}
+        self._title_codes: Dict[Tuple[str, str], int] = {}
+        self._doc_of: Dict[Key, int] = {}
+        self._total_length = 0
+        self._dead = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    @property
+    def postings_bytes(self) -> int:
+        return sum(ids.itemsize * len(ids) + tfs.itemsize * len(tfs) for ids, tfs in self._postings)
+
+    def add(self, key: Key, text: str) -> None:
+        """Indexes (or re-indexes) one resume"""
+        counts = Counter(tokenize(text))
+        role_key, title_key = key[0].lower(), key[1].lower()
+        with self._lock:
+            previous = self._doc_of.get(key)
+            if previous is not None:
+                self._alive[previous] = 0
+                self._total_length -= self._lengths[previous]
+                self._dead += 1
+
+            doc_id = len(self._keys)
+            self._keys.append(key)
+            self._doc_of[key] = doc_id
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._total_length += length
+            self._roles.append(self._role_codes.setdefault(role_key, len(self._role_codes)))
+            self._titles.append(self._title_codes.setdefault((role_key, title_key), len(self._title_codes)))
+            self._alive.append(1)
+
+            for term, tf in counts.items():
+                term_id = self._terms.get(term)
+                if term_id is None:
+                    term_id = self._terms[term] = len(self._postings)
+                    self._postings.append((array("I"), array("H")))
+                ids, tfs = self._postings[term_id]
+                ids.append(doc_id)
+                tfs.append(min(tf, MAX_TF))
+
+            if self._dead > 1000 and self._dead > len(self._keys) // 4:
+                self.compact()
+
+    def compact(self) -> None:
+        """Drops the postings of replaced resumes"""
+        with self._lock:
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            for term_id, (ids, tfs) in enumerate(self._postings):
+                doc_ids = np.frombuffer(ids, dtype=np.uint32)
+                keep = alive[doc_ids]
+                if not keep.all():
+                    kept_ids = array("I", doc_ids[keep].tobytes())
+                    kept_tfs = array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes())
+                    del doc_ids
+                    self._postings[term_id] = (kept_ids, kept_tfs)
+            self._dead = 0
+
+    def _mask(self, job_role: Optional[str], job_title: Optional[str]) -> Optional[np.ndarray]:
+        mask = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        if job_role:
+            code = self._role_codes.get(job_role.lower())
+            if code is None:
+                return None
+            mask &= np.frombuffer(self._roles, dtype=np.int32) == code
+        if job_title:
+            if job_role:
+                code = self._title_codes.get((job_role.lower(), job_title.lower()))
+                codes = [code] if code is not None else []
+            else:
+                codes = [c for (_, title), c in self._title_codes.items() if title == job_title.lower()]
+            if not codes:
+                return None
+            mask &= np.isin(np.frombuffer(self._titles, dtype=np.int32), codes)
+        return mask
+
+    def search(
+        self,
+        query: str,
+        k: int = 20,
+        job_role: Optional[str] = None,
+        job_title: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Top-k resumes by BM25, with the query terms each one contains"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            count = len(self._keys)
+            term_ids = [self._terms[t] for t in terms if t in self._terms]
+            if not count or not term_ids:
+                return []
+            mask = self._mask(job_role, job_title)
+            if mask is None or not mask.any():
+                return []
+
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.float32)
+            live_docs = max(len(self._doc_of), 1)
+            average_length = max(self._total_length / live_docs, 1.0)
+            norms = self.k1 * (1 - self.b + self.b * lengths / average_length)
+
+            scores = np.zeros(count, dtype=np.float32)
+            matched: Dict[str, np.ndarray] = {}
+            for term, term_id in zip([t for t in terms if t in self._terms], term_ids):
+                ids, tfs = self._postings[term_id]
+                doc_ids = np.frombuffer(ids, dtype=np.uint32).astype(np.int64)
+                tf = np.frombuffer(tfs, dtype=np.uint16).astype(np.float32)
+                df = int(alive[doc_ids].sum())
+                if df == 0:
+                    continue
+                idf = np.log(1 + (live_docs - df + 0.5) / (df + 0.5))
+                weights = idf * tf * (self.k1 + 1) / (tf + norms[doc_ids])
+                scores += np.bincount(doc_ids, weights=weights, minlength=count).astype(np.float32)
+                matched[term] = doc_ids
+
+            scores[~mask] = 0
+            hits = np.flatnonzero(scores > 0)
+            k = min(k, len(hits))
+            if k == 0:
+                return []
+            top = hits[np.argpartition(-scores[hits], k - 1)[:k]] if k < len(hits) else hits
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            results = []
+            for doc_id in top:
+                key = self._keys[doc_id]
+                results.append({
+                    "job_role": key[0],
+                    "job_title": key[1],
+                    "candidate_name": key[2],
+                    "bm25": round(float(scores[doc_id]), 4),
+                    "matched_terms": [term for term, ids in matched.items() if _contains(ids, doc_id)]
+                })
+            return results
+
+
+def _contains(sorted_ids: np.ndarray, doc_id: int) -> bool:
+    # Document ids are appended in increasing order, so postings stay sorted
+    position = np.searchsorted(sorted_ids, doc_id)
+    return position < len(sorted_ids) and sorted_ids[position] == doc_id
+
+
+class ResumeKeywordIndex:
+    """
+    The keyword index used by the API: built from Mongo on first use, fed by
+    upload_resume, and caught up with other workers' uploads every
+    `refresh_interval` seconds through an uploaded_at watermark. A refresh
+    skips the resumes this worker already indexed at the same uploaded_at.
+    """
+
+    def __init__(self, connection_string: Optional[str] = None, refresh_interval: float = 30.0):
+        self.connection_string = connection_string
+        self.refresh_interval = refresh_interval
+
+        self.index: Optional[BM25Index] = None
+        self.watermark: Optional[datetime.datetime] = None
+        self._indexed_at: Dict[Key, datetime.datetime] = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stored(uploaded_at: datetime.datetime) -> datetime.datetime:
+        # Mongo keeps milliseconds
+        return uploaded_at.replace(microsecond=uploaded_at.microsecond // 1000 * 1000, tzinfo=None)
+
+    def _ingest(self, index: BM25Index, since: Optional[datetime.datetime]) -> int:
+        added = 0
+        for doc in candidate_documents(get_database(self.connection_string)['jobs'], ["resume_content"], since=since):
+            if not doc.get("candidate_name"):
+                continue
+            key = (doc["job_role"], doc["job_title"], doc["candidate_name"])
+            uploaded_at = doc.get("uploaded_at")
+            if uploaded_at and (self.watermark is None or uploaded_at > self.watermark):
+                self.watermark = uploaded_at
+            if uploaded_at and self._indexed_at.get(key) == self._stored(uploaded_at):
+                continue
+            index.add(key, doc.get("resume_content") or "")
+            added += 1
+            if uploaded_at:
+                self._indexed_at[key] = self._stored(uploaded_at)
+        return added
+
+    def ensure_loaded(self) -> BM25Index:
+        with self._lock:
+            if self.index is None:
+                index = BM25Index()
+                with stage("bm25.build"):
+                    added = self._ingest(index, None)
+                logger.info(f"Built keyword index over {added} resumes, {index.postings_bytes / 1e6:.1f} MB of postings")
+                self.index = index
+                self._refreshed_at = time.monotonic()
+        self.refresh()
+        return self.index
+
+    def refresh(self, force: bool = False) -> int:
+        if self.index is None or (not force and time.monotonic() - self._refreshed_at < self.refresh_interval):
+            return 0
+        self._refreshed_at = time.monotonic()
+        with stage("bm25.refresh"):
+            return self._ingest(self.index, self.watermark)
+
+    def add(self, job_role: str, job_title: str, candidate_name: str, text: str, uploaded_at: Optional[datetime.datetime] = None) -> None:
+        if self.index is not None:
+            key = (job_role, job_title, candidate_name)
+            self.index.add(key, text)
+            if uploaded_at:
+                self._indexed_at[key] = self._stored(uploaded_at)
+
+    def search(self, query: str, k: int = 20, job_role: Optional[str] = None, job_title: Optional[str] = None) -> List[Dict[str, Any]]:
+        index = self.ensure_loaded()
+        with stage("bm25.search"):
+            return index.search(query, k=k, job_role=job_role, job_title=job_title)
+
+
+def reciprocal_rank_fusion(
+    keyword_results: Sequence[Dict[str, Any]],
+    semantic_results: Sequence[Dict[str, Any]],
+    k: int,
+    keyword_weight: float = 0.5,
+    rrf_k: int = 60
+) -> List[Dict[str, Any]]:
+    """
+    Merges the two result lists by weighted reciprocal rank. Ranks are used
+    instead of raw scores because BM25 scores are unbounded and cosine
+    similarities are not comparable to them.
+    """
+    fused: Dict[Key, Dict[str, Any]] = {}
+    for weight, results in ((keyword_weight, keyword_results), (1 - keyword_weight, semantic_results)):
+        for rank, result in enumerate(results, start=1):
+            key = (result["job_role"], result["job_title"], result["candidate_name"])
+            entry = fused.setdefault(key, {
+                "job_role": key[0],
+                "job_title": key[1],
+                "candidate_name": key[2],
+                "score": 0.0,
+                "bm25": None,
+                "similarity": None,
+                "matched_terms": []
+            })
+            entry["score"] += weight / (rrf_k + rank)
+            for field in ("bm25", "similarity", "matched_terms"):
+                if field in result:
+                    entry[field] = result[field]
+
+    ranked = sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:k]
+    for entry in ranked:
+        entry["score"] = round(entry["score"], 6)
+    return ranked
@@ -0,0 +1,135 @@
+"""
+Read-through cache for the role and title listings.
+
+The listings only change when a role or a JD is added, so they are cached per
+worker and invalidated by a generation counter kept in Mongo
+(`cache_generations`, document `listings`). Writers bump the counter; readers
+compare it with the generation their entry was loaded under. The counter is
+re-read at most every `check_interval` seconds, and a bump made in this
+process is seen immediately. At most `max_entries` listings are kept (least
+recently used first out), since the per-role titles are keyed by the role the
+client asked for. Other per-worker caches keep their own named
+counters in the same collection (bump_generation/read_generation).
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from metrics import record_cache
+from mongo_connection import get_database
+
+logger = logging.getLogger(__name__)
+
+GENERATIONS_COLLECTION = "cache_generations"
+LISTINGS_GENERATION_ID = "listings"
+
+_local_generations: Dict[str, int] = {}
+_local_lock = threading.Lock()
+
+
+def _observe(name: str, generation: int) -> None:
+    with _local_lock:
+        if generation > _local_generations.get(name, 0):
+            _local_generations[name] = generation
+
+
+def local_generation(name: str) -> int:
+    """Latest generation of `name` bumped or read by this process"""
+    return _local_generations.get(name, 0)
+
+
+def bump_generation(db, name: str) -> int:
+    doc = db[GENERATIONS_COLLECTION].find_one_and_update(
+        {"_id": name},
+        {"$inc": {"generation": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    generation = int(doc["generation"])
+    _observe(name, generation)
+    return generation
+
+
+def read_generation(collection, name: str) -> int:
+    """Current generation of `name` from the cache_generations collection"""
+    doc = collection.find_one({"_id": name})
+    generation = int(doc["generation"]) if doc else 0
+    _observe(name, generation)
+    return max(generation, local_generation(name))
+
+
+def bump_listings_generation(db) -> int:
+    """Invalidates the cached listings in every worker; call after a role or JD write"""
+    return bump_generation(db, LISTINGS_GENERATION_ID)
+
+
+class ListingCache:
+    def __init__(self, connection_string: Optional[str] = None, check_interval: float = 0.5, max_entries: int = 256):
+        self.connection_string = connection_string
+        self.check_interval = check_interval
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[str, Tuple[int, Any, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._collection = None
+        self._remote_generation = 0
+        self._checked_at = 0.0
+
+    def _get_collection(self):
+        if self._collection is None:
+            self._collection = get_database(self.connection_string)[GENERATIONS_COLLECTION]
+        return self._collection
+
+    def generation(self) -> int:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            try:
+                self._remote_generation = read_generation(self._get_collection(), LISTINGS_GENERATION_ID)
+                self._checked_at = now
+            except Exception as e:
+                # Without the counter nothing can be trusted; force a reload
+                logger.error(f"Could not read listings generation: {str(e)}")
+                return -1
+        return max(self._remote_generation, local_generation(LISTINGS_GENERATION_ID))
+
+    @staticmethod
+    def etag(value: Any) -> str:
+        body = json.dumps(value, sort_keys=True, default=str).encode("utf-8")
+        return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    def get(self, key: str, loader: Callable[[], Any], cache_empty: bool = True) -> Tuple[Any, str]:
+        """
+        Returns (value, etag), calling loader on a miss. None values are not
+        cached, nor empty ones unless cache_empty (a lookup that found nothing).
+        """
+        generation = self.generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation and generation >= 0:
+                self._entries.move_to_end(key)
+                record_cache("listings", True)
+                return entry[1], entry[2]
+
+        record_cache("listings", False)
+        value = loader()
+        if value is None:
+            return None, ""
+
+        etag = self.etag(value)
+        if generation >= 0 and (value or cache_empty):
+            with self._lock:
+                self._entries[key] = (generation, value, etag)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value, etag
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -1,12 +1,10 @@
 import os
 import json
 import time
-from groq import Groq
 from dotenv import load_dotenv
-from github_link_analyzer import GitHubLinkAnalyzer
-from document_parser import DocumentParser
-import numpy as np
 from contextlib import suppress
+from metrics import timed, record_llm_usage
+from analysis_schema import STRUCTURED_INSTRUCTIONS, split_structured
 load_dotenv()
 
 import logging
@@ -15,6 +13,17 @@ import logging
 logging.basicConfig(level=logging.ERROR)
 logger = logging.getLogger(__name__)
 
+PROMPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompt1.txt')
+ANALYSIS_MODEL = os.getenv("ANALYSIS_MODEL", "llama-3.3-70b-versatile")
+# Bump when the instructions around prompt1.txt in analyze_resume_and_jd change,
+# so stored analyses are reported stale (see analysis_inputs)
+# 2: structured JSON block (analysis_schema)
+PROMPT_VERSION = 2
+
+
+def prompt_template() -> str:
+    with open(PROMPT_PATH, 'r') as f:
+        return f.read()
 
 
 class LLMAnalyzer:
@@ -22,6 +31,7 @@ class LLMAnalyzer:
     
     def __init__(self, db=None):
         
+        from groq import Groq
         self.client = Groq(api_key=os.getenv('GROQ_API_KEY'))
         
         
@@ -30,12 +40,13 @@ class LLMAnalyzer:
     
     
 
+    @timed("llm.extract_candidate_name")
     def extract_candidate_name(self, resume_text: str) -> str:
         
         from contextlib import suppress
 
         with suppress(Exception):
-            name_extraction = self.client.chat.completions.create(
+            completion = self.client.chat.completions.create(
                 messages=[
                     {
                         "role": "system", 
@@ -59,7 +70,9 @@ class LLMAnalyzer:
                 model="llama-3.3-70b-versatile",
                 temperature=0,
                 max_tokens=50  
-            ).choices[0].message.content.strip()
+            )
+            record_llm_usage("extract_candidate_name", completion)
+            name_extraction = completion.choices[0].message.content.strip()
 
             
             if not name_extraction or name_extraction.lower() == 'unknown candidate':
@@ -76,11 +89,12 @@ class LLMAnalyzer:
 
     from contextlib import suppress
 
+    @timed("llm.job_title")
     def job_title(self, jd_text: str) -> str:
        
         with suppress(Exception):
           
-            title_extraction = self.client.chat.completions.create(
+            completion = self.client.chat.completions.create(
                 messages=[
                     {
                         "role": "system", 
@@ -104,7 +118,9 @@ class LLMAnalyzer:
                 model="llama-3.3-70b-versatile",
                 temperature=0,
                 max_tokens=50  
-            ).choices[0].message.content.strip()
+            )
+            record_llm_usage("job_title", completion)
+            title_extraction = completion.choices[0].message.content.strip()
             
             
             if not title_extraction or title_extraction.lower() == 'unknown title':
@@ -115,6 +131,7 @@ class LLMAnalyzer:
 
     from contextlib import suppress
 
+    @timed("llm.analyze_resume_and_jd")
     def analyze_resume_and_jd(self, resume_text: str, jd_text: str) -> dict:
         try:
             # Initialize with default values
@@ -141,10 +158,9 @@ class LLMAnalyzer:
             
             # Perform primary analysis
             try:
-                with open('Aider/app/prompt1.txt', 'r') as f:
-                    prompt_template = f.read()
+                template = prompt_template()
 
-                primary_analysis = self.client.chat.completions.create(
+                completion = self.client.chat.completions.create(
                     messages=[
                         {"role": "system", "content": "You are a professional HR recruiter analyzing resumes."},
                         {"role": "user", "content": f"""
@@ -156,12 +172,16 @@ class LLMAnalyzer:
                         Resume:
                             {resume_text}
 
-                        {prompt_template}
+                        {template}
+
+                        {STRUCTURED_INSTRUCTIONS}
                         """}
                     ],
-                    model="llama-3.3-70b-versatile",
+                    model=ANALYSIS_MODEL,
                     temperature=0
-                ).choices[0].message.content
+                )
+                record_llm_usage("analyze_resume_and_jd", completion)
+                primary_analysis = completion.choices[0].message.content
                 
                 if not primary_analysis:
                     primary_analysis = "Error: No analysis was generated"
@@ -169,9 +189,17 @@ class LLMAnalyzer:
                 logger.error(f"Error in primary analysis: {e}")
                 primary_analysis = f"Error performing analysis: {str(e)}"
 
+            structured, structured_error = None, None
+            if not primary_analysis.startswith("Error"):
+                primary_analysis, structured, structured_error = split_structured(primary_analysis)
+                if structured_error:
+                    logger.warning(f"Analysis stored without structured fields: {structured_error}")
+
             # Return only the analysis results
             return {
                 "analysis_text": primary_analysis,
+                "structured": structured,
+                "structured_error": structured_error
                 # "github_analysis": github_analysis
             }
             
@@ -188,4 +216,19 @@ class LLMAnalyzer:
 
     
 
-    
\ No newline at end of file
+    
+    @timed("llm.compare_candidates")
+    def compare_candidates(self, prompt: str, max_tokens: int) -> str:
+        """One comparative call over a packed shortlist (see comparative_analysis); returns the JSON text"""
+        completion = self.client.chat.completions.create(
+            messages=[
+                {"role": "system", "content": "You are a professional HR recruiter comparing candidates for one job. Answer in JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            model=ANALYSIS_MODEL,
+            temperature=0,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"}
+        )
+        record_llm_usage("compare_candidates", completion)
+        return completion.choices[0].message.content or ""
@@ -1,19 +1,41 @@
 import datetime
+import itertools
 from io import BytesIO
-import json
 import tempfile
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, Request, Header, Query
 from pymongo.errors import ConnectionFailure
-from typing import List, Dict, Any, Optional, Union
-from fastapi.responses import JSONResponse
+from typing import List, Dict, Any, Optional, Tuple, Union
+from fastapi.responses import PlainTextResponse, Response
+from json_response import FastJSONResponse
 import uvicorn
 from pydantic import BaseModel, Field
 import os
 import logging
+import threading
+import time
+from contextlib import asynccontextmanager
 from bson import ObjectId
-from document_parser import DocumentParser
+from document_parser import DocumentParser, embedding_model_status
 from llm_analyzer import LLMAnalyzer
 from data_storage import RecruitmentDataStorage
+from document_cache import DocumentCache
+from vector_utils import pack_matrix
+from fingerprint import NearDuplicateIndex, minhash_signature, name_in_text
+from admission import admit, pools
+from idempotency import IdempotencyStore, request_fingerprint
+from listing_cache import ListingCache
+from candidate_ranking import CandidateRanker
+from candidate_clustering import CandidateClusterer
+from jd_matching import JDMatcher
+from screening import ScreeningPolicy, LOW_MATCH, record_decision, record_promotion
+from ann_index import CandidateSearchIndex
+from keyword_index import ResumeKeywordIndex, reciprocal_rank_fusion
+from analysis_inputs import stale_analyses
+from analysis_schema import SENIORITY_LEVELS
+from comparative_analysis import ShortlistComparer, load_shortlist
+from starlette.concurrency import run_in_threadpool
+from metrics import IN_FLIGHT, stage, record_cache, render_prometheus, start_request_trace, finish_request_trace
+from upload_limits import UploadSizeLimitMiddleware, hash_upload, MAX_UPLOAD_BYTES
 from dotenv import load_dotenv
 load_dotenv()
 from data_handle import DataHandle
@@ -25,18 +47,6 @@ from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional
 
 
-class JsonEncoder(json.JSONEncoder):
-    """
-    """
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        if isinstance(obj, bytes):
-            return obj.decode('utf-8')
-        return super().default(obj)
-
 class StoreAnalysisInput(BaseModel):
     job_role: str = Field(..., description="Job role to analyze against")
     resume_content: str = Field(..., description="Resume content to analyze")
@@ -49,6 +59,7 @@ class StoreAnalysisResponse(BaseModel):
     candidate_name: Optional[str]
     total_candidates: Optional[int]
     job_id: Optional[str]
+    reanalyzed: Optional[List[str]] = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -72,6 +83,12 @@ class DirectJDInput(BaseModel):
             str: lambda v: v.replace('\n', '\\n')
         }
 
+class CompareCandidatesInput(BaseModel):
+    job_role: str
+    job_title: str
+    candidate_names: List[str] = Field(..., min_length=2, max_length=50)
+    token_budget: Optional[int] = Field(None, ge=1000, le=100000, description="Estimated prompt plus answer tokens per call")
+
 class UploadJDInput(BaseModel):
     job_role: str
     location: str
@@ -96,12 +113,78 @@ class ResumeUploadInput(BaseModel):
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model off the startup path so the API accepts requests immediately
+    if os.getenv("EMBEDDING_WARMUP", "1") == "1":
+        threading.Thread(target=document_parser.warm_up, name="embedding-warmup", daemon=True).start()
+    if os.getenv("CANDIDATE_SUMMARY_BACKFILL", "1") == "1":
+        threading.Thread(target=backfill_candidate_summaries, name="summary-backfill", daemon=True).start()
+    if os.getenv("ANN_INDEX_WARMUP", "1") == "1":
+        threading.Thread(target=warm_up_search_index, name="ann-warmup", daemon=True).start()
+    yield
+    candidate_search_index.save()
+
+
+def warm_up_search_index() -> None:
+    try:
+        candidate_search_index.ensure_loaded()
+        resume_keyword_index.ensure_loaded()
+    except Exception as e:
+        logger.error(f"Candidate search index warm-up failed: {str(e)}")
+
+
+def index_uploaded_resume(job_role: str, job_title: str, candidate_name: str, text: str, embeddings, uploaded_at: Optional[str] = None) -> None:
+    uploaded_at = datetime.datetime.fromisoformat(uploaded_at) if uploaded_at else None
+    resume_keyword_index.add(job_role, job_title, candidate_name, text, uploaded_at)
+    if embeddings:
+        candidate_search_index.add(job_role, job_title, candidate_name, embeddings, uploaded_at)
+
+
+def backfill_candidate_summaries() -> None:
+    """Builds the candidate summaries once for databases created before they existed"""
+    try:
+        data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
+        if data_handle.summaries.collection.estimated_document_count() == 0 and data_handle.jobs_collection.estimated_document_count() > 0:
+            data_handle.backfill_candidate_summaries()
+    except Exception as e:
+        logger.error(f"Candidate summary backfill failed: {str(e)}")
+
+
 app = FastAPI(
     title="Recruitment Analyzer API",
     description="API for analyzing resumes against job descriptions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    token, spans = start_request_trace()
+    IN_FLIGHT.inc(kind="request", name=request.method)
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        IN_FLIGHT.dec(kind="request", name=request.method)
+        route = request.scope.get("route")
+        finish_request_trace(
+            token,
+            spans,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status_code,
+            elapsed=time.perf_counter() - started
+        )
+
 class AnalysisResponse(BaseModel):
     candidate_name: str
     job_title: str
@@ -166,6 +249,101 @@ class CandidateBase(BaseModel):
 
 class CandidateDetail(CandidateBase):
     analysis: Optional[Dict[str, Any]]
+    screening: Optional[Dict[str, Any]] = None
+    alternative_matches: Optional[List[Dict[str, Any]]] = None
+
+class CandidateSummary(BaseModel):
+    candidate_name: str
+    job_role: str
+    job_title: str
+    job_location: Optional[str] = None
+    uploaded_at: Optional[str] = None
+    analysis_status: str
+    score: Optional[int] = None
+    matched_skills: List[str] = []
+    missing_skills: List[str] = []
+    seniority: Optional[str] = None
+    risk_flags: Optional[int] = None
+    analyzed_at: Optional[str] = None
+    github_links: int = 0
+
+class CandidatePageResponse(BaseModel):
+    status: str
+    message: str
+    data: List[CandidateSummary]
+    total_candidates: int
+    page: int
+    page_size: int
+
+class RankedCandidate(BaseModel):
+    rank: int
+    candidate_name: str
+    similarity: float
+    uploaded_at: Optional[str] = None
+    analysis_status: Optional[str] = None
+    analysis_score: Optional[int] = None
+
+class RankingResponse(BaseModel):
+    status: str
+    message: str
+    job_role: str
+    job_title: str
+    method: str = "pooled"
+    data: List[RankedCandidate]
+    total_candidates: int
+    unscored_candidates: int
+    page: int
+    page_size: int
+
+class ClusterExemplar(BaseModel):
+    candidate_name: str
+    similarity: float
+
+class CandidateCluster(BaseModel):
+    cluster_id: int
+    size: int
+    label: List[str]
+    cohesion: float
+    exemplars: List[ClusterExemplar]
+    members: List[str]
+
+class ClusterResponse(BaseModel):
+    status: str
+    message: str
+    job_role: str
+    job_title: str
+    k: int
+    data: List[CandidateCluster]
+    total_candidates: int
+    unscored_candidates: int
+
+class CandidateMatch(BaseModel):
+    candidate_name: str
+    job_role: str
+    job_title: str
+    similarity: float
+
+class CandidateSearchResponse(BaseModel):
+    status: str
+    message: str
+    query: str
+    data: List[CandidateMatch]
+
+class ResumeMatch(BaseModel):
+    candidate_name: str
+    job_role: str
+    job_title: str
+    score: float
+    bm25: Optional[float] = None
+    similarity: Optional[float] = None
+    matched_terms: List[str] = []
+
+class ResumeSearchResponse(BaseModel):
+    status: str
+    message: str
+    query: str
+    mode: str
+    data: List[ResumeMatch]
 
 class CandidateResponse(BaseModel):
     status: str
@@ -182,10 +360,106 @@ class CandidateResponse(BaseModel):
 
 document_parser = DocumentParser()
 
+document_cache = DocumentCache(
+    connection_string=os.getenv("MONGODB_CONNECTION_STRING"),
+    max_entries=int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+
+idempotency_store = IdempotencyStore(
+    os.getenv("MONGODB_CONNECTION_STRING"),
+    ttl_seconds=int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600))),
+    lease_seconds=int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "300"))
+)
+listing_cache = ListingCache(
+    os.getenv("MONGODB_CONNECTION_STRING"),
+    check_interval=float(os.getenv("LISTING_CACHE_CHECK_SECONDS", "0.5")),
+    max_entries=int(os.getenv("LISTING_CACHE_MAX_ENTRIES", "256"))
+)
+candidate_ranker = CandidateRanker(
+    os.getenv("MONGODB_CONNECTION_STRING"),
+    max_entries=int(os.getenv("RANKING_CACHE_MAX_JDS", "32")),
+    check_interval=float(os.getenv("RANKING_CACHE_CHECK_SECONDS", "0.5"))
+)
+candidate_search_index = CandidateSearchIndex(
+    os.getenv("MONGODB_CONNECTION_STRING"),
+    directory=os.getenv("ANN_INDEX_DIR", "ann_index"),
+    nprobe=int(os.getenv("ANN_NPROBE", "16")),
+    refresh_interval=float(os.getenv("ANN_REFRESH_SECONDS", "30")),
+    save_every=int(os.getenv("ANN_SAVE_EVERY", "500"))
+)
+resume_keyword_index = ResumeKeywordIndex(
+    os.getenv("MONGODB_CONNECTION_STRING"),
+    refresh_interval=float(os.getenv("KEYWORD_INDEX_REFRESH_SECONDS", "30"))
+)
+candidate_clusterer = CandidateClusterer(
+    candidate_ranker,
+    os.getenv("MONGODB_CONNECTION_STRING"),
+    max_entries=int(os.getenv("CLUSTER_CACHE_MAX_JDS", "32"))
+)
+jd_matcher = JDMatcher(
+    os.getenv("MONGODB_CONNECTION_STRING"),
+    top_k=int(os.getenv("ALTERNATIVE_MATCHES", "3")),
+    min_similarity=float(os.getenv("ALTERNATIVE_MATCH_MIN_SIMILARITY", "0.3")),
+    check_interval=float(os.getenv("JD_MATRIX_CHECK_SECONDS", "0.5"))
+)
+screening_policy = ScreeningPolicy(
+    threshold=float(os.getenv("SCREENING_THRESHOLD", "0.35")),
+    top_n=int(os.getenv("SCREENING_TOP_N", "10")),
+    keyword_weight=float(os.getenv("SCREENING_KEYWORD_WEIGHT", "0"))
+) if os.getenv("SCREENING_ENABLED", "1") == "1" else None
+duplicate_index = NearDuplicateIndex(
+    threshold=float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+)
+NEAR_DUPLICATE_REFRESH_SECONDS = float(os.getenv("NEAR_DUPLICATE_REFRESH_SECONDS", "30"))
+COMPARISON_TOKEN_BUDGET = int(os.getenv("COMPARISON_TOKEN_BUDGET", "6000"))
+COMPARISON_CANDIDATE_TOKENS = int(os.getenv("COMPARISON_CANDIDATE_TOKENS", "600"))
+
+
+def find_near_duplicate(data_handle: RecruitmentDataStorage, signature, job_role: str, job_title: str) -> Optional[Dict[str, Any]]:
+    # Catches up with resumes written by other workers and bulk_ingest.py
+    if duplicate_index.refresh_due(NEAR_DUPLICATE_REFRESH_SECONDS):
+        with stage("near_duplicate.refresh"):
+            duplicate_index.load(data_handle.iter_candidate_fingerprints(since=duplicate_index.refresh_since()))
+
+    with stage("near_duplicate.query"):
+        matches = duplicate_index.query(signature)
+    record_cache("near_duplicate", bool(matches))
+    if not matches:
+        return None
+
+    # Prefer an earlier upload for the same JD, then the closest match anywhere
+    same_jd = [m for m in matches if m[0][:2] == (job_role.lower(), job_title.lower())]
+    (role, title, name), similarity = (same_jd or matches)[0]
+    return {
+        "job_role": role,
+        "job_title": title,
+        "candidate_name": name,
+        "similarity": round(similarity, 3)
+    }
+
 
 
-@app.post("/jobs/", response_model=JobResponse)
-async def create_role(job : JobRole):
+@app.get("/health/ready")
+async def health_ready():
+    model = embedding_model_status()
+    ready = model["status"] == "loaded"
+    return FastJSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "starting" if model["status"] in ("not_loaded", "loading") else "degraded",
+            "embedding_model": model
+        }
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/jobs/", response_model=JobResponse, dependencies=[Depends(admit("write"))])
+def create_role(job : JobRole):
     try:
         connection_string = os.getenv("MONGODB_CONNECTION_STRING") 
         data_handle =RecruitmentDataStorage(connection_string)
@@ -212,7 +486,7 @@ async def create_role(job : JobRole):
             "required_experience" : result["required_experience"]
         }
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content = response_data
         )
@@ -226,7 +500,7 @@ async def create_role(job : JobRole):
 
 
 
-@app.post("/jobs/upload-jd/file", response_model=JDResponse)
+@app.post("/jobs/upload-jd/file", response_model=JDResponse, dependencies=[Depends(admit("parse"))])
 async def upload_jd_file(
     job_role: str = Form(...),
     location: str = Form(...),
@@ -234,23 +508,29 @@ async def upload_jd_file(
 ):
     try:
         
-        content = await parse_uploaded_file(file)
+        document = await load_uploaded_document(file)
+        content = document["text"]
         
         llm_analyzer = LLMAnalyzer()
-        title = llm_analyzer.job_title(content)
-        data_handle =RecruitmentDataStorage(os.getenv("MONGODB_CONNECTION_STRING"))
+        title = await pools["llm"].run(llm_analyzer.job_title, content)
+        data_handle = await run_in_threadpool(RecruitmentDataStorage, os.getenv("MONGODB_CONNECTION_STRING"))
         
-        result = data_handle.upload_jd(
+        result = await run_in_threadpool(
+            data_handle.upload_jd,
             job_role=job_role,
             job_description=content,
             location=location,
-            title=title
+            title=title,
+            embeddings=document["embeddings"] or None,
+            chunk_embeddings=document.get("chunk_embeddings")
         )
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content=result
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing file upload: {str(e)}")
         raise HTTPException(
@@ -258,23 +538,26 @@ async def upload_jd_file(
             detail=f"Failed to process job description: {str(e)}"
         )
 
-@app.post("/jobs/upload-jd/direct", response_model=JDResponse)
+@app.post("/jobs/upload-jd/direct", response_model=JDResponse, dependencies=[Depends(admit("embed"))])
 async def upload_jd_direct(job_input: DirectJDInput):
     try:
-        data_handle =RecruitmentDataStorage(os.getenv("MONGODB_CONNECTION_STRING"))
-        
+        data_handle = await run_in_threadpool(RecruitmentDataStorage, os.getenv("MONGODB_CONNECTION_STRING"))
         
-        result = data_handle.upload_jd(
+        # upload_jd encodes the JD itself; the route already holds an embed slot
+        result = await run_in_threadpool(
+            data_handle.upload_jd,
             job_role=job_input.job_role,
             job_description=job_input.jd_content,
             location=job_input.location,
             title=job_input.title
         )
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content=result
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing direct input: {str(e)}")
         raise HTTPException(
@@ -282,40 +565,107 @@ async def upload_jd_direct(job_input: DirectJDInput):
             detail=f"Failed to process job description: {str(e)}"
         )
 
-async def parse_uploaded_file(file: UploadFile) -> str:
-    try:
-        allowed_extensions = ['.pdf', '.docx', '.txt']
-        
-        if not file or not file.filename:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid or missing file"
-            )
-           
-        extension = os.path.splitext(file.filename)[1].lower()
-        
-        if extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
-            )
+async def read_uploaded_document(file: UploadFile, digest: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns the digest of an upload and its cached document or, on a miss, its
+    freshly extracted text and GitHub links without embeddings (see
+    embed_uploaded_document)
+    """
+    allowed_extensions = ['.pdf', '.docx', '.txt']
+    
+    if not file or not file.filename:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid or missing file"
+        )
        
-        content = await file.read()
-
-        content_text = document_parser.extract_text_from_file(
-            file=content, 
-            filename=file.filename
+    extension = os.path.splitext(file.filename)[1].lower()
+    
+    if extension not in allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
         )
-        
-        
-        if isinstance(content_text, tuple):
-            content_text = content_text[0]
-        if isinstance(content_text, bytes):
-            content_text = content_text.decode('utf-8')
-            
-        logger.info("Document parsed successfully")
-        return content_text
+   
+    # The upload stays in its spooled temporary file; it is only streamed, never copied
+    if digest is None:
+        digest, _ = await hash_upload(file)
+    
+    cached = await run_in_threadpool(document_cache.get, digest)
+    if cached is not None:
+        logger.info(f"Document cache hit for {file.filename}")
+        return digest, cached
+
+    content_text, error_msg = await run_in_threadpool(
+        document_parser.extract_text_from_file,
+        file=file.file, 
+        filename=file.filename
+    )
+    
+    if error_msg:
+        raise HTTPException(status_code=400, detail=error_msg)
+    if not content_text:
+        raise HTTPException(status_code=400, detail="No content could be extracted from the file")
+    if isinstance(content_text, bytes):
+        content_text = content_text.decode('utf-8')
+    
+    github_links = await run_in_threadpool(RecruitmentDataStorage.extract_github_links, file.file) if extension == '.pdf' else []
+    logger.info("Document parsed successfully")
+    return digest, {
+        "text": content_text,
+        "github_links": github_links,
+        "embeddings": None,
+        "chunk_embeddings": None,
+        "section_embeddings": None
+    }
+
+
+def has_embeddings(document: Dict[str, Any], sections: bool = False) -> bool:
+    return document.get("embeddings") is not None and (not sections or document.get("section_embeddings") is not None)
+
+
+async def embed_uploaded_document(digest: str, document: Dict[str, Any], sections: bool = False) -> Dict[str, Any]:
+    """
+    Adds the embeddings a document read by read_uploaded_document lacks and
+    caches it; with sections=True (resumes) also its per-section embeddings
+    """
+    if has_embeddings(document, sections):
+        return document
+
+    section_embeddings = None
+    if sections:
+        # A document cached as a JD only lacks the resume embeddings
+        embeddings, chunk_matrix, section_embeddings = await pools["embed"].run(document_parser.embed_resume, document["text"])
+    else:
+        embeddings, chunk_matrix = await pools["embed"].run(document_parser.embed_document, document["text"])
+
+    return await run_in_threadpool(
+        document_cache.put,
+        digest,
+        text=document["text"],
+        github_links=document["github_links"],
+        embeddings=embeddings,
+        chunk_embeddings=pack_matrix(chunk_matrix),
+        section_embeddings=section_embeddings
+    )
+
 
+async def load_uploaded_document(file: UploadFile, digest: Optional[str] = None, sections: bool = False) -> Dict[str, Any]:
+    """
+    Returns the cached (or freshly parsed) text, GitHub links and embeddings of
+    an upload; with sections=True (resumes) also its per-section embeddings
+    """
+    digest, document = await read_uploaded_document(file, digest)
+    return await embed_uploaded_document(digest, document, sections)
+
+
+async def parse_uploaded_file(file: UploadFile) -> str:
+    try:
+        document = await load_uploaded_document(file)
+        return document["text"]
+
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Parsing error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -328,41 +678,99 @@ async def parse_uploaded_file(file: UploadFile) -> str:
 async def upload_resume(
     job_role: str = Form(...),
     job_title: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    if not idempotency_key:
+        return await process_resume_upload(job_role, job_title, file)
+
+    digest = None
+    if file and file.filename:
+        digest, _ = await hash_upload(file)
+    return await idempotency_store.execute(
+        "upload-resume",
+        idempotency_key,
+        request_fingerprint(job_role, job_title, file.filename, digest),
+        lambda: process_resume_upload(job_role, job_title, file, digest)
+    )
+
+
+async def process_resume_upload(job_role: str, job_title: str, file: UploadFile, digest: Optional[str] = None) -> FastJSONResponse:
     try:
-       
-        pdf_content = await file.read()
-        file_obj = BytesIO(pdf_content)
-        
-        content_text, error_msg = document_parser.extract_text_from_file(
-            file=file_obj,
-            filename=file.filename
-        )
-        
-        if error_msg:
-            raise HTTPException(status_code=400, detail=error_msg)
-            
-        if not content_text:
-            raise HTTPException(status_code=400, detail="No content could be extracted from the file")
+        data_handle = await run_in_threadpool(RecruitmentDataStorage, os.getenv("MONGODB_CONNECTION_STRING"))
+        # The parse slot covers reading the file only, and is taken here rather
+        # than as a route dependency so that idempotent replays never wait for one
+        async with pools["parse"].slot():
+            digest, document = await read_uploaded_document(file, digest)
+            with stage("near_duplicate.signature"):
+                signature = minhash_signature(document["text"])
+
+        # The duplicate check comes before the embeddings: the same person's earlier
+        # resume lends its embeddings instead of another model call
+        duplicate_of = await run_in_threadpool(find_near_duplicate, data_handle, signature, job_role, job_title)
+        if duplicate_of:
+            logger.info(f"Resume is a near-duplicate of {duplicate_of}")
+        if not has_embeddings(document, sections=True):
+            reused = None
+            if duplicate_of and name_in_text(duplicate_of["candidate_name"], document["text"]):
+                reused = await run_in_threadpool(
+                    data_handle.candidate_embeddings,
+                    duplicate_of["job_role"], duplicate_of["job_title"], duplicate_of["candidate_name"]
+                )
+            if reused:
+                document = {**document, **reused}
+            else:
+                document = await embed_uploaded_document(digest, document, sections=True)
         
-        data_handle =RecruitmentDataStorage(os.getenv("MONGODB_CONNECTION_STRING"))
-        upload_result = data_handle.upload_resume(
+        # Name extraction is an LLM call
+        upload_result = await pools["llm"].run(
+            data_handle.upload_resume,
             job_role=job_role,
             job_title=job_title,
-            resume_content=content_text,
-            pdf_content=pdf_content
+            resume_content=document["text"],
+            embeddings=document["embeddings"] or None,
+            chunk_embeddings=document.get("chunk_embeddings"),
+            section_embeddings=document.get("section_embeddings"),
+            github_links=document["github_links"],
+            minhash=signature,
+            duplicate_of=duplicate_of,
+            screening=screening_policy,
+            jd_matcher=jd_matcher if os.getenv("ALTERNATIVE_MATCHES", "3") != "0" else None
         )
         
         if upload_result["status"] in ["created", "updated"]:
-            analysis_result = data_handle.store_analysis(
+            duplicate_index.add(
+                (job_role.lower(), job_title.lower(), upload_result["candidate_name"]),
+                signature
+            )
+            # Tokenizing the resume (and the odd compaction) is CPU work; keep it off the event loop
+            await run_in_threadpool(
+                index_uploaded_resume,
+                upload_result["data"]["job_role"],
+                upload_result["data"]["job_title"],
+                upload_result["candidate_name"],
+                document["text"],
+                document["embeddings"],
+                upload_result["data"].get("uploaded_at")
+            )
+        
+        screening = upload_result.get("screening") or {}
+        if upload_result["status"] in ["created", "updated"] and not upload_result.get("analysis_reused") and screening:
+            record_decision(screening["decision"], len(upload_result.get("github_links") or []))
+
+        if upload_result["status"] in ["created", "updated"] and screening.get("decision") == LOW_MATCH and not upload_result.get("analysis_reused"):
+            upload_result["analysis"] = None
+            upload_result["message"] += "; below the screening threshold, analysis skipped (promote to analyze)"
+        elif upload_result["status"] in ["created", "updated"] and not upload_result.get("analysis_reused"):
+            analysis_result = await pools["llm"].run(
+                data_handle.store_analysis,
                 job_role=job_role,
                 candidate_name=upload_result["candidate_name"],
                 job_title=job_title
             )
             upload_result["analysis"] = analysis_result.get("candidate_analysis")
         
-        return JSONResponse(status_code=200, content=upload_result)
+        return FastJSONResponse(status_code=200, content=upload_result)
         
     except HTTPException:
         raise
@@ -372,14 +780,34 @@ async def upload_resume(
 
 
 @app.post("/analysis/store", response_model=StoreAnalysisResponse)
-async def store_analysis(job_role: str, candidate_name: str, job_title: str):
+async def store_analysis(
+    job_role: str,
+    candidate_name: str,
+    job_title: str,
+    force: bool = Query(True, description="Regenerate everything; false redoes only the parts whose inputs changed"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    if not idempotency_key:
+        return await process_store_analysis(job_role, candidate_name, job_title, force)
+
+    return await idempotency_store.execute(
+        "analysis-store",
+        idempotency_key,
+        request_fingerprint(job_role, candidate_name, job_title, force),
+        lambda: process_store_analysis(job_role, candidate_name, job_title, force)
+    )
+
+
+async def process_store_analysis(job_role: str, candidate_name: str, job_title: str, force: bool = True) -> FastJSONResponse:
     try:
-        data_handle =RecruitmentDataStorage(os.getenv("MONGODB_URI"))
+        data_handle = await run_in_threadpool(RecruitmentDataStorage, os.getenv("MONGODB_URI"))
         
-        result = data_handle.store_analysis(
+        result = await pools["llm"].run(
+            data_handle.store_analysis,
             job_role=job_role,
             candidate_name=candidate_name,
-            job_title=job_title
+            job_title=job_title,
+            force=force
         )
         
         if result["status"] in ["failed", "error"]:
@@ -388,7 +816,7 @@ async def store_analysis(job_role: str, candidate_name: str, job_title: str):
                 detail=result["message"]
             )
             
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content=result
         )
@@ -402,8 +830,162 @@ async def store_analysis(job_role: str, candidate_name: str, job_title: str):
             detail=f"Failed to store analysis: {str(e)}"
         )
 
-@app.get("/jobs/{job_role}", response_model=JobResponse)
-async def get_jobrole(job_role: str):
+@app.post("/analysis/promote", response_model=StoreAnalysisResponse)
+async def promote_candidate(
+    job_role: str,
+    candidate_name: str,
+    job_title: str,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Runs the full analysis for a candidate that screening held back"""
+    data_handle = await run_in_threadpool(DataHandle, os.getenv("MONGODB_CONNECTION_STRING"))
+    summary = (await run_in_threadpool(data_handle.summaries.lookup, job_role, job_title, [candidate_name])).get(candidate_name)
+
+    async def promote() -> FastJSONResponse:
+        # Checked inside the idempotent call: a retry of a successful promote replays it instead of getting 409
+        if summary and summary.get("analysis_status") == "completed":
+            raise HTTPException(
+                status_code=409,
+                detail=f"Candidate '{candidate_name}' has already been analyzed"
+            )
+        return await process_store_analysis(job_role, candidate_name, job_title)
+
+    if idempotency_key:
+        response = await idempotency_store.execute(
+            "analysis-promote",
+            idempotency_key,
+            request_fingerprint(job_role, candidate_name, job_title),
+            promote
+        )
+    else:
+        response = await promote()
+
+    if summary and summary.get("analysis_status") == LOW_MATCH and response.status_code == 200 \
+            and response.headers.get("Idempotent-Replayed") != "true":
+        record_promotion(summary.get("github_links") or 0)
+    return response
+
+
+@app.post("/analysis/compare")
+async def compare_candidates(request: CompareCandidatesInput):
+    """Ranks a shortlist of one JD's candidates against each other, in as few LLM calls as the token budget allows"""
+    try:
+        names = list(dict.fromkeys(request.candidate_names))
+        data_handle = await run_in_threadpool(DataHandle, os.getenv("MONGODB_CONNECTION_STRING"))
+        shortlist = await run_in_threadpool(load_shortlist, data_handle.jobs_collection, request.job_role, request.job_title, names)
+        if shortlist is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Job description '{request.job_title}' not found for role '{request.job_role}'"
+            )
+        jd, candidates = shortlist
+        found = {candidate["candidate_name"].lower() for candidate in candidates}
+        missing = [name for name in names if name.lower() not in found]
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Candidates not found for '{request.job_title}': {', '.join(missing)}"
+            )
+
+        comparer = ShortlistComparer(
+            LLMAnalyzer(),
+            token_budget=COMPARISON_TOKEN_BUDGET,
+            candidate_tokens=COMPARISON_CANDIDATE_TOKENS
+        )
+        result = await pools["llm"].run(comparer.compare, jd, candidates, request.token_budget)
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "status": "success" if not result["not_compared"] else "partial",
+                "message": f"Compared {len(result['ranking'])} candidates in {result['calls']} call(s)",
+                **result
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error comparing candidates: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to compare candidates: {str(e)}"
+        )
+
+
+@app.get("/screening/funnel", dependencies=[Depends(admit("read"))])
+def screening_funnel(job_role: Optional[str] = None, job_title: Optional[str] = None):
+    """Candidates per analysis status (pending, low_match, completed), overall or for one role or JD"""
+    try:
+        data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
+        counts = data_handle.summaries.status_counts(job_role, job_title)
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "status": "success",
+                "job_role": job_role,
+                "job_title": job_title,
+                "screening": {
+                    "enabled": screening_policy is not None,
+                    "threshold": screening_policy.threshold if screening_policy else None,
+                    "top_n": screening_policy.top_n if screening_policy else None
+                },
+                "total_candidates": sum(counts.values()),
+                "by_status": counts
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error computing screening funnel: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to compute screening funnel: {str(e)}"
+        )
+
+
+@app.get("/analysis/stale", dependencies=[Depends(admit("read"))])
+def list_stale_analyses(
+    job_role: Optional[str] = None,
+    job_title: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200)
+):
+    """
+    Stored analyses whose inputs (resume, JD, prompt, model or linked
+    repositories) changed since they were generated, a page at a time; the
+    scan stops once the page is full. README contents are not fetched here;
+    reanalyze.py --check-readmes compares them too.
+    """
+    try:
+        data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
+        with stage("analysis.staleness"):
+            # One extra to tell whether another page follows
+            stale = list(itertools.islice(
+                stale_analyses(data_handle.jobs_collection, job_role, job_title),
+                (page - 1) * page_size, page * page_size + 1
+            ))
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "status": "success",
+                "job_role": job_role,
+                "job_title": job_title,
+                "page": page,
+                "page_size": page_size,
+                "has_more": len(stale) > page_size,
+                "data": stale[:page_size]
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Error checking analysis staleness: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to check analysis staleness: {str(e)}"
+        )
+
+
+@app.get("/jobs/{job_role}", response_model=JobResponse, dependencies=[Depends(admit("read"))])
+def get_jobrole(job_role: str):
     try:
         
         data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
@@ -415,7 +997,7 @@ async def get_jobrole(job_role: str):
                 detail="Job role not found"
             )
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content=result
         )
@@ -426,11 +1008,22 @@ async def get_jobrole(job_role: str):
             detail = f"Failed to retrieve job role: {str(e)}"
         )
 
-@app.get("/jobs/titles/all", response_model=JobTitlesResponse)
-async def get_all_titles():
+def listing_response(request: Request, content: Any, etag: str) -> Response:
+    """JSON response with an ETag; answers 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse(status_code=200, content=content, headers=headers)
+
+
+@app.get("/jobs/titles/all", response_model=JobTitlesResponse, dependencies=[Depends(admit("read"))])
+def get_all_titles(request: Request):
     try:
-        data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
-        titles = data_handle.get_all_job_titles()
+        titles, etag = listing_cache.get(
+            "titles",
+            lambda: DataHandle(os.getenv("MONGODB_CONNECTION_STRING")).get_all_job_titles()
+        )
         
         if titles is None:
             raise HTTPException(
@@ -445,11 +1038,10 @@ async def get_all_titles():
             "total_titles": len(titles)
         }
         
-        return JSONResponse(
-            status_code=200,
-            content=result
-        )
+        return listing_response(request, result, etag)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving job titles: {str(e)}")
         raise HTTPException(
@@ -458,11 +1050,15 @@ async def get_all_titles():
         )
     
 
-@app.get("/jobs/titles/{role}", response_model=JobTitlesResponse)
-async def get_titles_by_role(role: str):
+@app.get("/jobs/titles/{role}", response_model=JobTitlesResponse, dependencies=[Depends(admit("read"))])
+def get_titles_by_role(role: str, request: Request):
     try:
-        data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
-        titles = data_handle.get_job_titles_by_role(role)
+        # Roles match case-insensitively; an unknown role is not cached
+        titles, etag = listing_cache.get(
+            f"titles:{role.lower()}",
+            lambda: DataHandle(os.getenv("MONGODB_CONNECTION_STRING")).get_job_titles_by_role(role),
+            cache_empty=False
+        )
         
         if titles is None:
             raise HTTPException(
@@ -483,10 +1079,7 @@ async def get_titles_by_role(role: str):
             "total_titles": len(titles)
         }
         
-        return JSONResponse(
-            status_code=200,
-            content=result
-        )
+        return listing_response(request, result, etag)
         
     except HTTPException:
         raise
@@ -496,39 +1089,63 @@ async def get_titles_by_role(role: str):
             status_code=500,
             detail=f"Failed to retrieve job titles: {str(e)}"
         )
+
+
+def load_available_roles() -> List[str]:
+    data_handler = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
+    if not data_handler.verify_connection():
+        raise HTTPException(
+            status_code=503,
+            detail="Database service unavailable"
+        )
+    return list(data_handler.list_available_roles() or [])
+
    
-@app.get("/job/roles", response_model=List[str], tags=["roles"])
-async def get_available_roles() -> List[str]:
+@app.get("/job/roles", response_model=List[str], tags=["roles"], dependencies=[Depends(admit("read"))])
+def get_available_roles(request: Request) -> List[str]:
     try:
-        data_handler = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
-        
-        if not data_handler.verify_connection():
-            raise HTTPException(
-                status_code=503,
-                detail="Database service unavailable"
-            )
-        
-        roles = data_handler.list_available_roles()
-        
-        if roles is None:
-            return []
-            
-        return list(roles)  
+        roles, etag = listing_cache.get("roles", load_available_roles)
+        return listing_response(request, roles, etag)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error retrieving roles: {str(e)}"
         )
-    finally:
-        if 'data_handler' in locals():
-            data_handler.client.close()
       
-@app.get("/candidates/all", response_model=CandidateResponse)
-async def get_all_candidates():
+@app.get("/candidates/all", response_model=CandidatePageResponse, dependencies=[Depends(admit("read"))])
+def get_all_candidates(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    job_role: Optional[str] = None,
+    job_title: Optional[str] = None,
+    status: Optional[str] = Query(None, description="Analysis status: pending, low_match or completed"),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    name: Optional[str] = Query(None, description="Case-insensitive substring of the candidate name"),
+    sort: str = Query("uploaded_at", pattern="^(uploaded_at|score|candidate_name)$"),
+    skill: Optional[List[str]] = Query(None, description="Matched skill from the structured analysis; repeat to require several"),
+    missing_skill: Optional[str] = None,
+    seniority: Optional[str] = Query(None, pattern=f"^({'|'.join(SENIORITY_LEVELS)})$"),
+    max_risk_flags: Optional[int] = Query(None, ge=0)
+):
     try:
         data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
-        candidates = data_handle.get_all_candidates()
+        candidates = data_handle.list_candidates(
+            page=page,
+            page_size=page_size,
+            job_role=job_role,
+            job_title=job_title,
+            status=status,
+            min_score=min_score,
+            name=name,
+            sort=sort,
+            skills=skill,
+            missing_skill=missing_skill,
+            seniority=seniority,
+            max_risk_flags=max_risk_flags
+        )
         
         if candidates is None:
             raise HTTPException(
@@ -539,15 +1156,19 @@ async def get_all_candidates():
         result = {
             "status": "success",
             "message": "Candidates retrieved successfully",
-            "data": candidates,
-            "total_candidates": len(candidates)
+            "data": candidates["items"],
+            "total_candidates": candidates["total"],
+            "page": page,
+            "page_size": page_size
         }
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content=result
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving candidates: {str(e)}")
         raise HTTPException(
@@ -556,8 +1177,184 @@ async def get_all_candidates():
         )
    
 
-@app.get("/candidates/{candidate_name}", response_model=CandidateResponse)
-async def get_candidate_by_name(candidate_name: str):
+@app.get("/jobs/{job_role}/{job_title}/ranking", response_model=RankingResponse, dependencies=[Depends(admit("read"))])
+def rank_candidates(
+    job_role: str,
+    job_title: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    min_similarity: Optional[float] = Query(None, ge=-1.0, le=1.0),
+    method: str = Query("pooled", pattern="^(pooled|sections|maxsim)$")
+):
+    """Candidates of a JD ranked by embedding similarity to the JD, without LLM calls"""
+    try:
+        ranking = candidate_ranker.rank(
+            job_role, job_title, page=page, page_size=page_size, min_similarity=min_similarity, method=method
+        )
+        if ranking is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Job description '{job_title}' not found for role '{job_role}'"
+            )
+
+        # Attach the analysis state of the candidates on this page
+        data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
+        summaries = data_handle.summaries.lookup(
+            ranking["job_role"], ranking["job_title"], [item["candidate_name"] for item in ranking["items"]]
+        )
+        for item in ranking["items"]:
+            summary = summaries.get(item["candidate_name"], {})
+            item["analysis_status"] = summary.get("analysis_status")
+            item["analysis_score"] = summary.get("score")
+
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "status": "success",
+                "message": "Candidates ranked by similarity to the job description",
+                "job_role": ranking["job_role"],
+                "job_title": ranking["job_title"],
+                "method": ranking["method"],
+                "data": ranking["items"],
+                "total_candidates": ranking["total"],
+                "unscored_candidates": ranking["unscored"],
+                "page": page,
+                "page_size": page_size
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ranking candidates for {job_role}/{job_title}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to rank candidates: {str(e)}"
+        )
+
+
+@app.get("/search/candidates", response_model=CandidateSearchResponse, dependencies=[Depends(admit("embed"))])
+def search_candidates(
+    q: str = Query(..., min_length=1, max_length=2000),
+    k: int = Query(20, ge=1, le=200),
+    job_role: Optional[str] = None,
+    nprobe: Optional[int] = Query(None, ge=1, le=256)
+):
+    """Semantic search over every uploaded resume, across roles and JDs"""
+    try:
+        query_vector = document_parser.get_embeddings(q)
+        matches = candidate_search_index.search(query_vector, k=k, job_role=job_role, nprobe=nprobe)
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "status": "success",
+                "message": f"Found {len(matches)} matching candidates",
+                "query": q,
+                "data": matches
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching candidates: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search candidates: {str(e)}"
+        )
+
+
+async def admit_resume_search(mode: str = Query("hybrid", pattern="^(hybrid|keyword|semantic)$")):
+    # Only a query embedding needs an embed slot; keyword search is a read
+    async with pools["read" if mode == "keyword" else "embed"].slot():
+        yield
+
+
+@app.get("/search/resumes", response_model=ResumeSearchResponse, dependencies=[Depends(admit_resume_search)])
+def search_resumes(
+    q: str = Query(..., min_length=1, max_length=2000),
+    k: int = Query(20, ge=1, le=200),
+    job_role: Optional[str] = None,
+    job_title: Optional[str] = None,
+    mode: str = Query("hybrid", pattern="^(hybrid|keyword|semantic)$"),
+    keyword_weight: float = Query(0.5, ge=0.0, le=1.0)
+):
+    """Keyword (BM25), semantic, or fused search over resume text, optionally within a role or JD"""
+    try:
+        # Each list is fetched deeper than k so the fusion has overlap to work with
+        depth = k if mode != "hybrid" else max(k * 4, 50)
+        keyword_results, semantic_results = [], []
+        if mode in ("hybrid", "keyword"):
+            keyword_results = resume_keyword_index.search(q, k=depth, job_role=job_role, job_title=job_title)
+        if mode in ("hybrid", "semantic"):
+            query_vector = document_parser.get_embeddings(q)
+            semantic_results = candidate_search_index.search(query_vector, k=depth, job_role=job_role, job_title=job_title)
+
+        weight = {"keyword": 1.0, "semantic": 0.0}.get(mode, keyword_weight)
+        matches = reciprocal_rank_fusion(keyword_results, semantic_results, k, keyword_weight=weight)
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "status": "success",
+                "message": f"Found {len(matches)} matching resumes",
+                "query": q,
+                "mode": mode,
+                "data": matches
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching resumes: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search resumes: {str(e)}"
+        )
+
+
+@app.get("/jobs/{job_role}/{job_title}/clusters", response_model=ClusterResponse, dependencies=[Depends(admit("read"))])
+def cluster_candidates(
+    job_role: str,
+    job_title: str,
+    k: Optional[int] = Query(None, ge=1, le=50, description="Number of clusters; chosen from the number of candidates by default"),
+    include_members: bool = True
+):
+    """Candidates of a JD grouped into clusters of similar profiles, with keyword labels and exemplars"""
+    try:
+        result = candidate_clusterer.clusters(job_role, job_title, k=k, include_members=include_members)
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Job description '{job_title}' not found for role '{job_role}'"
+            )
+
+        return FastJSONResponse(
+            status_code=200,
+            content={
+                "status": "success",
+                "message": f"Candidates grouped into {len(result['clusters'])} clusters",
+                "job_role": result["job_role"],
+                "job_title": result["job_title"],
+                "k": result["k"],
+                "data": result["clusters"],
+                "total_candidates": result["total"],
+                "unscored_candidates": result["unscored"]
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error clustering candidates for {job_role}/{job_title}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to cluster candidates: {str(e)}"
+        )
+
+
+@app.get("/candidates/{candidate_name}", response_model=CandidateResponse, dependencies=[Depends(admit("read"))])
+def get_candidate_by_name(candidate_name: str):
     try:
         data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
         candidate = data_handle.get_candidate_by_name(candidate_name)
@@ -575,7 +1372,7 @@ async def get_candidate_by_name(candidate_name: str):
             "total_candidates": 1
         }
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content=result
         )
@@ -590,8 +1387,8 @@ async def get_candidate_by_name(candidate_name: str):
         )
    
 
-@app.get("/candidates/role/{job_role}", response_model=CandidateResponse)
-async def get_candidates_by_role(job_role: str):
+@app.get("/candidates/role/{job_role}", response_model=CandidateResponse, dependencies=[Depends(admit("read"))])
+def get_candidates_by_role(job_role: str):
     try:
         data_handle = DataHandle(os.getenv("MONGODB_CONNECTION_STRING"))
         candidates = data_handle.get_candidates_by_job_role(job_role)
@@ -615,7 +1412,7 @@ async def get_candidates_by_role(job_role: str):
             "total_candidates": len(candidates)
         }
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=200,
             content=result
         )
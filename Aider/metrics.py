@@ -0,0 +1,271 @@
+"""
+In-process instrumentation: stage timers, counters and a Prometheus text exporter.
+
+Every `stage(...)` block is recorded in the stage latency histogram and, when it
+runs inside an HTTP request, appended to that request's breakdown so slow
+requests can be logged stage by stage.
+"""
+import contextvars
+import functools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "2.0"))
+
+_current_spans: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "current_spans", default=None
+)
+
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(self._sums[key])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+STAGE_LATENCY = Histogram(
+    "recruitment_stage_duration_seconds",
+    "Latency of internal processing stages (parsing, embedding, Mongo, LLM, GitHub)",
+    ["stage"]
+)
+STAGE_ERRORS = Counter(
+    "recruitment_stage_errors_total",
+    "Stages that ended with an exception",
+    ["stage"]
+)
+REQUEST_LATENCY = Histogram(
+    "recruitment_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"]
+)
+IN_FLIGHT = Gauge(
+    "recruitment_in_flight",
+    "Requests and stages currently executing",
+    ["kind", "name"]
+)
+LLM_TOKENS = Counter(
+    "recruitment_llm_tokens_total",
+    "Tokens used by LLM calls",
+    ["operation", "type"]
+)
+CACHE_REQUESTS = Counter(
+    "recruitment_cache_requests_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"]
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Times a block as a named stage"""
+    IN_FLIGHT.inc(kind="stage", name=name)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        IN_FLIGHT.dec(kind="stage", name=name)
+        STAGE_LATENCY.observe(elapsed, stage=name)
+        spans = _current_spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def timed(name: str):
+    """Decorator form of stage()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(operation: str, completion) -> None:
+    usage = getattr(completion, "usage", None)
+    if usage is None:
+        return
+    LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, operation=operation, type="prompt")
+    LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, operation=operation, type="completion")
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def start_request_trace() -> Tuple[contextvars.Token, List[Tuple[str, float]]]:
+    spans: List[Tuple[str, float]] = []
+    return _current_spans.set(spans), spans
+
+
+def finish_request_trace(token: contextvars.Token, spans: List[Tuple[str, float]], method: str, route: str, status: int, elapsed: float) -> None:
+    _current_spans.reset(token)
+    REQUEST_LATENCY.observe(elapsed, method=method, route=route, status=str(status))
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        breakdown: Dict[str, float] = {}
+        for name, duration in spans:
+            breakdown[name] = breakdown.get(name, 0.0) + duration
+        details = ", ".join(f"{name}={duration * 1000:.0f}ms" for name, duration in sorted(breakdown.items(), key=lambda item: -item[1]))
+        logger.warning(f"Slow request {method} {route} -> {status} in {elapsed * 1000:.0f}ms: {details or 'no stages recorded'}")
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class TimedCollection:
+    """Wraps a pymongo collection so every round trip is recorded as a mongo.<operation> stage"""
+
+    _TIMED = {
+        "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+        "delete_one", "delete_many", "aggregate", "distinct", "count_documents",
+        "find_one_and_update", "find_one_and_replace", "bulk_write", "create_index"
+    }
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name not in self._TIMED or not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def timed_call(*args, **kwargs):
+            with stage(f"mongo.{name}"):
+                return attribute(*args, **kwargs)
+        return timed_call
+
+    def __getitem__(self, name):
+        return self._collection[name]
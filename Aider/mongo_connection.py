@@ -0,0 +1,32 @@
+"""
+The MongoDB client and database shared by everything in the process.
+
+A MongoClient is thread-safe and keeps its own connection pool and monitor
+threads, so there is one per connection string, created on first use. The
+database name comes from MONGODB_DATABASE (default `recruitment_db`). Never
+close a client obtained here: every other component is using it too.
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+from pymongo import MongoClient
+
+DATABASE_NAME = os.getenv("MONGODB_DATABASE", "recruitment_db")
+
+_clients: Dict[str, MongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(connection_string: Optional[str] = None) -> MongoClient:
+    connection_string = connection_string or os.getenv("MONGODB_CONNECTION_STRING")
+    with _clients_lock:
+        client = _clients.get(connection_string)
+        if client is None:
+            client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
+            _clients[connection_string] = client
+    return client
+
+
+def get_database(connection_string: Optional[str] = None, database_name: Optional[str] = None):
+    return get_client(connection_string)[database_name or DATABASE_NAME]
@@ -0,0 +1,83 @@
+"""
+Re-runs the stored analyses whose inputs changed (see analysis_inputs).
+
+Only what is stale is regenerated: after a JD edit only that JD's candidates
+are redone, after a README change only the GitHub analysis of the candidates
+that link it, and after a prompt or model change every analysis.
+
+    python reanalyze.py --dry-run
+    python reanalyze.py --job-role Backend --job-title "Backend Engineer"
+    python reanalyze.py --check-readmes --workers 4
+
+Analyses stored before input hashes were recorded are reported as
+"unrecorded"; --skip-unrecorded leaves them alone.
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from analysis_inputs import UNRECORDED, stale_analyses
+
+load_dotenv()
+logger = logging.getLogger("reanalyze")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-uri", default=os.getenv("MONGODB_CONNECTION_STRING"))
+    parser.add_argument("--job-role")
+    parser.add_argument("--job-title")
+    parser.add_argument("--check-readmes", action="store_true",
+                        help="fetch the linked READMEs and compare their contents too (network, no LLM calls)")
+    parser.add_argument("--skip-unrecorded", action="store_true")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=2, help="concurrent analyses")
+    parser.add_argument("--dry-run", action="store_true", help="only list the stale analyses")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    from data_storage import RecruitmentDataStorage
+    storage = RecruitmentDataStorage(args.mongodb_uri)
+
+    fetch_readme = None
+    if args.check_readmes:
+        from github_link_analyzer import GitHubLinkAnalyzer
+        fetch_readme = GitHubLinkAnalyzer().fetch_readme
+
+    stale = []
+    for item in stale_analyses(storage.jobs_collection, args.job_role, args.job_title, fetch_readme):
+        if args.skip_unrecorded and UNRECORDED in item["stale_inputs"]:
+            continue
+        stale.append(item)
+        print(f"{item['job_role']} / {item['job_title']} / {item['candidate_name']}: {', '.join(item['stale_inputs'])}")
+        if args.limit and len(stale) >= args.limit:
+            break
+
+    print(f"{len(stale)} stale analyses")
+    if args.dry_run or not stale:
+        return 0
+
+    def reanalyze(item):
+        return item, storage.store_analysis(
+            item["job_role"], item["candidate_name"], item["job_title"], force=False, check_readmes=args.check_readmes
+        )
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        for item, result in executor.map(reanalyze, stale):
+            if result["status"] != "success":
+                failed += 1
+                logger.error(f"{item['candidate_name']} ({item['job_title']}): {result['message']}")
+            else:
+                logger.info(f"{item['candidate_name']} ({item['job_title']}): redid {', '.join(result.get('reanalyzed') or []) or 'nothing'}")
+
+    print(f"{len(stale) - failed} reanalyzed, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Resume segmentation into sections (summary, experience, skills, projects,
+education, other) and section-aware scoring.
+
+A section starts at a heading line ("Work Experience", "SKILLS:",
+"Education & Certifications") or at an inline heading ("Skills: Python, Go").
+Text before the first heading (name, contact details, profile) is the
+summary. Sections of the same kind are merged, and each kind gets one vector.
+The vectors are stored as one packed float16 matrix with the section names
+and their character spans in the resume text:
+
+    {"names": [...], "spans": [[[start, end], ...], ...], "dtype", "shape", "data"}
+
+Because scoring is linear in the section vectors, a candidate's
+section-weighted score against a JD is the dot product of the JD vector with
+one precomputed profile vector (profile_vector).
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from vector_utils import normalize_rows, pack_matrix, unpack_matrix
+
+SECTION_ORDER = ("summary", "experience", "skills", "projects", "education", "other")
+
+SECTION_ALIASES = {
+    "experience": (
+        "experience", "work experience", "professional experience", "employment", "employment history",
+        "work history", "career history", "professional background", "internships", "internship"
+    ),
+    "skills": (
+        "skills", "technical skills", "key skills", "core skills", "core competencies", "competencies",
+        "technologies", "tech stack", "tools", "tools and technologies", "technical proficiency", "expertise"
+    ),
+    "projects": (
+        "projects", "personal projects", "academic projects", "key projects", "side projects",
+        "open source", "open source contributions", "portfolio"
+    ),
+    "education": (
+        "education", "academic background", "academics", "qualifications", "certifications",
+        "certificates", "education and certifications", "courses", "training"
+    ),
+    "summary": (
+        "summary", "profile", "professional summary", "objective", "career objective", "about", "about me"
+    ),
+    "other": (
+        "hobbies", "interests", "hobbies and interests", "languages", "references", "achievements",
+        "awards", "publications", "volunteering", "volunteer experience", "activities", "extracurricular activities"
+    )
+}
+_HEADING_OF = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+_ALIAS_PATTERN = "|".join(sorted((re.escape(a) for a in _HEADING_OF), key=len, reverse=True))
+# A whole line that is a heading, optionally decorated ("== SKILLS ==", "Skills:")
+_HEADING_LINE = re.compile(rf"^[\W_]*({_ALIAS_PATTERN})[\W_]*$", re.IGNORECASE)
+# "Skills: Python, Go" on one line
+_INLINE_HEADING = re.compile(rf"^[\W_]*({_ALIAS_PATTERN})\s*[:\-–|]\s+\S", re.IGNORECASE)
+# Upper-case headings inside text that lost its line breaks
+_FLAT_HEADING = re.compile(rf"(?<![A-Za-z])({'|'.join(re.escape(a.upper()) for a in sorted(_HEADING_OF, key=len, reverse=True))})(?![A-Za-z])")
+
+
+def _normalize_heading(heading: str) -> str:
+    return re.sub(r"\s+", " ", heading.replace("&", "and")).strip().lower()
+
+
+def _heading_section(line: str) -> Optional[Tuple[str, bool]]:
+    """(section, inline) if the line starts a section"""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 60:
+        return None
+    text = stripped.replace("&", "and")
+    match = _HEADING_LINE.match(text)
+    if match:
+        return _HEADING_OF[_normalize_heading(match.group(1))], False
+    match = _INLINE_HEADING.match(text)
+    if match:
+        return _HEADING_OF[_normalize_heading(match.group(1))], True
+    return None
+
+
+def segment_resume(text: str) -> List[Tuple[str, int, int]]:
+    """(section, start, end) character spans covering the resume, in document order"""
+    if not text:
+        return []
+    boundaries: List[Tuple[int, str]] = [(0, "summary")]
+
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        found = _heading_section(line)
+        if found:
+            boundaries.append((offset, found[0]))
+        offset += len(line)
+
+    if len(boundaries) == 1 and text.count("\n") < 3:
+        # Flattened text: fall back to upper-case headings
+        for match in _FLAT_HEADING.finditer(text):
+            boundaries.append((match.start(), _HEADING_OF[_normalize_heading(match.group(1))]))
+
+    spans = []
+    for (start, section), (end, _) in zip(boundaries, boundaries[1:] + [(len(text), "")]):
+        if text[start:end].strip():
+            spans.append((section, start, end))
+    return spans
+
+
+def group_sections(text: str, spans: Optional[List[Tuple[str, int, int]]] = None) -> Dict[str, List[Tuple[int, int]]]:
+    """Spans of each section kind, in SECTION_ORDER"""
+    grouped: Dict[str, List[Tuple[int, int]]] = {}
+    for section, start, end in spans if spans is not None else segment_resume(text):
+        grouped.setdefault(section, []).append((start, end))
+    return {section: grouped[section] for section in SECTION_ORDER if section in grouped}
+
+
+def section_text(text: str, spans: Sequence[Sequence[int]]) -> str:
+    return "\n".join(text[start:end].strip() for start, end in spans)
+
+
+def pack_sections(names: List[str], spans: List[List[Tuple[int, int]]], matrix: np.ndarray) -> Optional[Dict[str, Any]]:
+    packed = pack_matrix(matrix)
+    if packed is None:
+        return None
+    packed["names"] = list(names)
+    packed["spans"] = [[list(span) for span in section_spans] for section_spans in spans]
+    return packed
+
+
+def unpack_sections(packed: Optional[Dict[str, Any]]) -> Tuple[List[str], np.ndarray]:
+    if not packed or not packed.get("names"):
+        return [], np.zeros((0, 0), dtype=np.float32)
+    return list(packed["names"]), unpack_matrix(packed)
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """'experience:0.4,skills:0.3' -> {'experience': 0.4, 'skills': 0.3}"""
+    weights = {}
+    for part in (spec or "").split(","):
+        if ":" in part:
+            name, value = part.split(":", 1)
+            weights[name.strip().lower()] = float(value)
+    return weights
+
+
+SECTION_WEIGHTS = parse_weights(os.getenv(
+    "SECTION_WEIGHTS", "experience:0.4,skills:0.3,projects:0.2,education:0.05,summary:0.05,other:0"
+))
+
+
+def profile_vector(packed: Optional[Dict[str, Any]], weights: Optional[Dict[str, float]] = None) -> Optional[np.ndarray]:
+    """
+    Unit-length weighted mean of the normalized section vectors, over the
+    sections the resume has. Its dot product with a normalized JD vector is
+    the section-weighted similarity, on the same scale as the pooled cosine.
+    """
+    weights = SECTION_WEIGHTS if weights is None else weights
+    names, matrix = unpack_sections(packed)
+    if not names:
+        return None
+    w = np.array([weights.get(name, 0.0) for name in names], dtype=np.float32)
+    if w.sum() <= 0:
+        return None
+    return normalize_rows((normalize_rows(matrix) * w[:, None]).sum(axis=0))
+
+
+def section_similarities(packed: Optional[Dict[str, Any]], jd_vector: Sequence[float]) -> Dict[str, float]:
+    names, matrix = unpack_sections(packed)
+    jd_vector = np.asarray(jd_vector if jd_vector is not None else [], dtype=np.float32)
+    if not names or jd_vector.shape != (matrix.shape[1],):
+        return {}
+    scores = normalize_rows(matrix) @ normalize_rows(jd_vector)
+    return {name: round(float(score), 4) for name, score in zip(names, scores)}
+
+
+def relevant_resume_text(
+    text: str,
+    packed: Optional[Dict[str, Any]],
+    jd_vector: Optional[Sequence[float]] = None,
+    min_similarity: float = 0.3,
+    weights: Optional[Dict[str, float]] = None
+) -> str:
+    """
+    The resume restricted to the sections worth sending to the LLM: every
+    section with a positive weight, plus zero-weight sections (hobbies,
+    languages, ...) only when they are close to the JD. Falls back to the
+    whole text when the resume was not segmented.
+    """
+    weights = SECTION_WEIGHTS if weights is None else weights
+    if not packed or not packed.get("names") or not packed.get("spans"):
+        return text
+    similarities = section_similarities(packed, jd_vector) if jd_vector is not None else {}
+
+    parts = []
+    for name, spans in zip(packed["names"], packed["spans"]):
+        if weights.get(name, 0.0) > 0 or name == "summary" or similarities.get(name, 0.0) >= min_similarity:
+            parts.append(section_text(text, spans))
+    return "\n\n".join(part for part in parts if part) or text
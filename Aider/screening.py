@@ -0,0 +1,110 @@
+"""
+Tiered screening ahead of the LLM analysis.
+
+Every upload gets a cheap pre-score: the cosine similarity of the resume and
+JD embeddings (section-weighted when the resume was segmented, see
+resume_sections), optionally blended with the share of the JD's most frequent
+terms that the resume mentions. Only candidates at or above `threshold`, or
+among the `top_n` best pre-scores of their JD so far, go on to the full
+analysis (one large-model call plus one per GitHub repository). The rest are
+stored with the `low_match` status and can be promoted later.
+"""
+import datetime
+import logging
+from collections import Counter as TermCounter
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from keyword_index import tokenize
+from metrics import Counter
+from vector_utils import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+ANALYZE = "analyze"
+LOW_MATCH = "low_match"
+
+SCREENING_DECISIONS = Counter(
+    "recruitment_screening_decisions_total",
+    "Uploads by screening decision (analyze, low_match) and promotions of low-match candidates",
+    ["decision"]
+)
+# Calls saved = skipped - promoted; a promotion makes the calls that were skipped at upload
+SCREENING_LLM_CALLS = Counter(
+    "recruitment_screening_llm_calls_total",
+    "LLM calls (analysis plus GitHub README analyses) skipped at upload by screening, and made later by promotions",
+    ["outcome"]
+)
+
+
+def keyword_coverage(resume_text: str, jd_text: str, max_terms: int = 40) -> Optional[float]:
+    """Share of the JD's `max_terms` most frequent terms that appear in the resume"""
+    jd_terms = [term for term, _ in TermCounter(
+        token for token in tokenize(jd_text) if len(token) > 1 and not token.isdigit()
+    ).most_common(max_terms)]
+    if not jd_terms:
+        return None
+    resume_terms = set(tokenize(resume_text))
+    return sum(1 for term in jd_terms if term in resume_terms) / len(jd_terms)
+
+
+class ScreeningPolicy:
+    def __init__(self, threshold: float = 0.35, top_n: int = 10, keyword_weight: float = 0.0):
+        self.threshold = threshold
+        self.top_n = top_n
+        self.keyword_weight = keyword_weight
+
+    def pre_score(
+        self,
+        resume_vector: Sequence[float],
+        jd_vector: Sequence[float],
+        resume_text: str = "",
+        jd_text: str = "",
+        section_profile: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        resume_vector = np.asarray(resume_vector if resume_vector is not None else [], dtype=np.float32)
+        jd_vector = np.asarray(jd_vector if jd_vector is not None else [], dtype=np.float32)
+        similarity = section_similarity = None
+        if resume_vector.ndim == 1 and resume_vector.shape == jd_vector.shape and resume_vector.size:
+            similarity = float(normalize_rows(resume_vector) @ normalize_rows(jd_vector))
+            if section_profile is not None and section_profile.shape == jd_vector.shape:
+                # Section-weighted: experience and skills count more than hobbies (see resume_sections)
+                section_similarity = float(section_profile @ normalize_rows(jd_vector))
+
+        coverage = keyword_coverage(resume_text, jd_text) if self.keyword_weight > 0 else None
+        if similarity is None:
+            # Without both embeddings nothing can be screened out
+            score = None
+        else:
+            score = section_similarity if section_similarity is not None else similarity
+            if coverage is not None:
+                score = (1 - self.keyword_weight) * score + self.keyword_weight * coverage
+
+        return {
+            "score": round(score, 4) if score is not None else None,
+            "similarity": round(similarity, 4) if similarity is not None else None,
+            "section_similarity": round(section_similarity, 4) if section_similarity is not None else None,
+            "keyword_coverage": round(coverage, 4) if coverage is not None else None,
+            "threshold": self.threshold,
+            "screened_at": datetime.datetime.utcnow()
+        }
+
+    def decide(self, score: Optional[float], better_candidates: Optional[int] = None) -> str:
+        """`better_candidates`: how many candidates of the JD have a higher pre-score"""
+        if score is None or score >= self.threshold:
+            return ANALYZE
+        if self.top_n > 0 and better_candidates is not None and better_candidates < self.top_n:
+            return ANALYZE
+        return LOW_MATCH
+
+
+def record_decision(decision: str, github_links: int = 0) -> None:
+    SCREENING_DECISIONS.inc(decision=decision)
+    if decision == LOW_MATCH:
+        SCREENING_LLM_CALLS.inc(1 + github_links, outcome="skipped")
+
+
+def record_promotion(github_links: int = 0) -> None:
+    SCREENING_DECISIONS.inc(decision="promoted")
+    SCREENING_LLM_CALLS.inc(1 + github_links, outcome="promoted")
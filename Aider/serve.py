@@ -0,0 +1,136 @@
+"""
+Production entry point with pre-forked workers.
+
+The embedding model (and torch) is loaded once in the parent process, then the
+parent forks the uvicorn workers. Every worker serves the same listening socket
+and shares the read-only model weights with the parent copy-on-write, instead
+of loading its own copy. Dead workers are restarted; SIGTERM/SIGINT stop all.
+
+    python serve.py --workers 4 --port 8000
+
+For development keep using `python main.py` (single process with --reload).
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+logger = logging.getLogger("serve")
+
+
+def _create_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, args) -> None:
+    # torch sizes its thread pool per process; one pool per worker oversubscribes the CPUs
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(args.torch_threads)
+
+    config = uvicorn.Config(
+        app,
+        log_level=args.log_level,
+        timeout_keep_alive=args.keep_alive,
+        lifespan="on"
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            _run_worker(app, sock, args)
+        except Exception:
+            logger.exception("Worker crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--torch-threads", type=int, default=int(os.getenv("TORCH_THREADS_PER_WORKER", "1")))
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-preload", action="store_true",
+                        help="Let every worker load its own model (for comparison measurements)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.no_preload:
+        # Workers find the model already loaded, so their warm-up thread is a no-op.
+        # The parent must not run an encode: a torch thread pool started before
+        # fork() is not usable in the children.
+        from document_parser import load_embedding_model
+        started = time.perf_counter()
+        if load_embedding_model() is None:
+            logger.warning("Embedding model could not be preloaded; workers will retry on first use")
+        else:
+            logger.info(f"Embedding model preloaded in {time.perf_counter() - started:.1f}s")
+
+    import main as api
+
+    sock = _create_socket(args.host, args.port)
+    # Move everything allocated so far out of the collector's reach: a GC pass in a
+    # worker would otherwise write to these objects and un-share their pages
+    gc.freeze()
+
+    workers = set()
+    stopping = False
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    for _ in range(args.workers):
+        workers.add(_spawn(api.app, sock, args))
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers (parent pid {os.getpid()})")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}; restarting")
+            time.sleep(1)
+            workers.add(_spawn(api.app, sock, args))
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
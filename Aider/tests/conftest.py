@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+AIDER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(AIDER_DIR, "benchmarks")
+
+if AIDER_DIR not in sys.path:
+    sys.path.insert(0, AIDER_DIR)
+# Appended, not prepended: benchmarks/ has modules named like the app's
+if BENCHMARKS_DIR not in sys.path:
+    sys.path.append(BENCHMARKS_DIR)
+
+import pymongo  # noqa: E402
+import pytest  # noqa: E402
+
+# Tests that need a real mongod use this; everything else gets mongomock
+RealMongoClient = pymongo.MongoClient
+
+# The app modules bind pymongo, groq and sentence_transformers at import, so
+# the fakes (see benchmarks/fakes.py) go in before any test module is collected
+os.environ.setdefault("ANN_INDEX_DIR", tempfile.mkdtemp(prefix="ann_index_"))
+os.environ.setdefault("ANN_INDEX_WARMUP", "0")
+os.environ.setdefault("CANDIDATE_SUMMARY_BACKFILL", "0")
+import fakes  # noqa: E402
+
+FAKE_MONGO = fakes.install()
+os.environ["EMBEDDING_WARMUP"] = "0"
+
+
+@pytest.fixture
+def mongo():
+    for name in FAKE_MONGO.list_database_names():
+        FAKE_MONGO.drop_database(name)
+    return FAKE_MONGO
+
+
+@pytest.fixture
+def api(mongo):
+    from starlette.testclient import TestClient
+    import main
+    return TestClient(main.app)
@@ -0,0 +1,80 @@
+import asyncio
+
+import data_storage
+import main
+from admission import pools
+
+
+def test_upload_frees_the_parse_slot_before_name_extraction(api, monkeypatch):
+    held = []
+
+    def upload_resume(self, **kwargs):
+        held.append(pools["parse"].active)
+        return {"status": "error", "message": "stubbed"}
+
+    monkeypatch.setattr(data_storage.RecruitmentDataStorage, "upload_resume", upload_resume)
+    response = api.post(
+        "/jobs/upload-resume/file",
+        data={"job_role": "Backend", "job_title": "Backend Engineer"},
+        files={"file": ("ada.txt", b"Ada Lovelace\nPython, Go, Kubernetes", "text/plain")}
+    )
+    assert response.status_code == 200
+    assert held == [0]
+
+
+def test_creating_a_job_role_is_admitted_as_a_write(api, monkeypatch):
+    held = []
+
+    def add_jobrole(self, **kwargs):
+        held.append((pools["write"].active, pools["read"].active))
+        return {"_id": "1", **kwargs}
+
+    monkeypatch.setattr(data_storage.RecruitmentDataStorage, "add_jobrole", add_jobrole)
+    response = api.post("/jobs/", json={
+        "job_role": "Backend", "department": "Engineering", "worktype": "Remote",
+        "salary": "100k", "require_experience": "3 years"
+    })
+    assert response.status_code == 200, response.text
+    assert held == [(1, 0)]
+
+
+def test_upload_indexes_the_resume_off_the_event_loop(api, monkeypatch):
+    on_loop = []
+
+    def add(job_role, job_title, candidate_name, text, uploaded_at=None):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+
+    def upload_resume(self, **kwargs):
+        return {
+            "status": "created", "message": "stubbed", "candidate_name": "Ada Lovelace", "analysis_reused": True,
+            "data": {"job_role": kwargs["job_role"], "job_title": kwargs["job_title"]}
+        }
+
+    monkeypatch.setattr(data_storage.RecruitmentDataStorage, "upload_resume", upload_resume)
+    monkeypatch.setattr(main.resume_keyword_index, "add", add)
+    monkeypatch.setattr(main.candidate_search_index, "add", lambda *args: None)
+    response = api.post(
+        "/jobs/upload-resume/file",
+        data={"job_role": "Backend", "job_title": "Backend Engineer"},
+        files={"file": ("ada.txt", b"Ada Lovelace\nPython, Go, Kubernetes", "text/plain")}
+    )
+    assert response.status_code == 200, response.text
+    assert on_loop == [False]
+
+
+def test_keyword_search_is_admitted_as_a_read(api, monkeypatch):
+    held = []
+
+    def search(query, k, job_role=None, job_title=None):
+        held.append((pools["read"].active, pools["embed"].active))
+        return []
+
+    monkeypatch.setattr(main.resume_keyword_index, "search", search)
+    monkeypatch.setattr(main.candidate_search_index, "search", lambda *args, **kwargs: [])
+    assert api.get("/search/resumes", params={"q": "python", "mode": "keyword"}).status_code == 200
+    assert api.get("/search/resumes", params={"q": "python", "mode": "hybrid"}).status_code == 200
+    assert held == [(1, 0), (0, 1)]
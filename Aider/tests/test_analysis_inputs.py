@@ -0,0 +1,112 @@
+import contextlib
+import io
+
+import pytest
+
+from analysis_inputs import UNRECORDED, current_inputs, recorded_inputs, stale_inputs, stale_parts
+from data_storage import RecruitmentDataStorage
+from github_link_analyzer import GitHubLinkAnalyzer
+
+LINK = "https://github.com/ada/engine"
+JD = {"job_role": "Backend", "title": "Backend Engineer", "job_description": "Python and Go services"}
+CANDIDATE = {"candidate_name": "Ada Lovelace", "resume_content": "Ada Lovelace\nPython, Go", "github_links": [LINK]}
+
+
+def recorded(readme="# Engine"):
+    return recorded_inputs(current_inputs(CANDIDATE, JD, readmes={LINK: readme}))
+
+
+def test_unrecorded_analysis_is_stale():
+    assert stale_inputs(None, current_inputs(CANDIDATE, JD)) == [UNRECORDED]
+    assert stale_parts([UNRECORDED]) == (True, True)
+
+
+def test_unchanged_inputs_are_up_to_date():
+    assert stale_inputs(recorded(), current_inputs(CANDIDATE, JD)) == []
+    assert stale_inputs(recorded(), current_inputs(CANDIDATE, JD, readmes={LINK: "# Engine"})) == []
+
+
+def test_jd_edit_redoes_both_parts():
+    changed = stale_inputs(recorded(), current_inputs(CANDIDATE, {**JD, "job_description": "Rust"}))
+    assert changed == ["jd"]
+    assert stale_parts(changed) == (True, True)
+
+
+def test_new_link_redoes_only_the_github_part():
+    candidate = {**CANDIDATE, "github_links": [LINK, "https://github.com/ada/notes"]}
+    changed = stale_inputs(recorded(), current_inputs(candidate, JD))
+    assert changed == ["links"]
+    assert stale_parts(changed) == (False, True)
+
+
+def test_changed_readme_redoes_only_the_github_part():
+    changed = stale_inputs(recorded(), current_inputs(CANDIDATE, JD, readmes={LINK: "# Engine v2"}))
+    assert changed == ["readmes"]
+    assert stale_parts(changed) == (False, True)
+
+
+def test_readme_that_cannot_be_fetched_is_unknown_not_changed():
+    assert stale_inputs(recorded(), current_inputs(CANDIDATE, JD, readmes={LINK: None})) == []
+
+
+def test_readme_that_was_missing_at_analysis_time_is_a_change_once_it_appears():
+    assert stale_inputs(recorded(readme=None), current_inputs(CANDIDATE, JD, readmes={LINK: "# Engine"})) == ["readmes"]
+
+
+def test_failed_analysis_is_stale():
+    assert stale_inputs(recorded_inputs(current_inputs(CANDIDATE, JD), failed=True), current_inputs(CANDIDATE, JD)) == ["failed"]
+
+
+@pytest.fixture
+def storage(mongo):
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage = RecruitmentDataStorage("mongodb://mongomock")
+    analysis = {"analyses": [{"type": "candidate_analysis", "content": "ok"}], "inputs": recorded()}
+    mongo.recruitment_db.jobs.insert_one({
+        "job_role": JD["job_role"],
+        "job_descriptions": [{
+            "title": JD["title"], "job_description": JD["job_description"],
+            "candidates": [{**CANDIDATE, "analysis": analysis}]
+        }]
+    })
+    return storage
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    fetched = []
+
+    def fetch_readme(self, link):
+        fetched.append(link)
+        return None
+
+    monkeypatch.setattr(GitHubLinkAnalyzer, "fetch_readme", fetch_readme)
+    return fetched
+
+
+def test_up_to_date_analysis_fetches_readmes_only_to_check_them(storage, fetches):
+    result = storage.store_analysis("Backend", "Ada Lovelace", "Backend Engineer", force=False, check_readmes=False)
+    assert result["message"] == "Analysis is up to date"
+    assert fetches == []
+
+    # The fetch fails: unknown, so still up to date
+    result = storage.store_analysis("Backend", "Ada Lovelace", "Backend Engineer", force=False)
+    assert result["message"] == "Analysis is up to date"
+    assert fetches == [LINK]
+
+
+def test_stale_analyses_are_paged(api, storage):
+    jobs = storage.db["jobs"]
+    job = jobs.find_one({})
+    jd = job["job_descriptions"][0]
+    jd["candidates"] = [
+        {**CANDIDATE, "candidate_name": f"Candidate {i}", "analysis": {"analyses": []}} for i in range(5)
+    ]
+    jobs.replace_one({"_id": job["_id"]}, job)
+
+    first = api.get("/analysis/stale", params={"page_size": 2}).json()
+    last = api.get("/analysis/stale", params={"page_size": 2, "page": 3}).json()
+    assert [item["candidate_name"] for item in first["data"]] == ["Candidate 0", "Candidate 1"]
+    assert first["has_more"]
+    assert [item["candidate_name"] for item in last["data"]] == ["Candidate 4"]
+    assert not last["has_more"]
@@ -0,0 +1,62 @@
+from analysis_inputs import current_inputs, recorded_inputs, stale_inputs, stale_parts
+from analysis_schema import clean_items, split_structured
+from candidate_summaries import CandidateSummaryStore
+
+REPORT = "## Report\nStrong backend candidate."
+
+
+def block(body):
+    return f"{REPORT}\n```json\n{body}\n```"
+
+
+def test_split_structured_validates_and_strips_the_block():
+    markdown, structured, error = split_structured(block(
+        '{"overall_score": 81, "matched_skills": ["Python", " Node.js. ", "python"], '
+        '"missing_skills": "Kafka; Rust", "seniority": "Senior engineer", "risk_flags": []}'
+    ))
+    assert error is None
+    assert markdown == REPORT
+    assert structured["overall_score"] == 81
+    assert structured["matched_skills"] == ["python", "node.js"]
+    assert structured["missing_skills"] == ["kafka", "rust"]
+    assert structured["seniority"] == "senior"
+
+
+def test_split_structured_uses_the_last_block():
+    text = '```json\n{"overall_score": 1}\n```\n' + block('{"overall_score": 70}')
+    _, structured, error = split_structured(text)
+    assert error is None and structured["overall_score"] == 70
+
+
+def test_split_structured_reports_missing_and_invalid_blocks():
+    assert split_structured(REPORT) == (REPORT, None, "no JSON block in the analysis")
+
+    markdown, structured, error = split_structured(block("{not: json}"))
+    assert markdown == REPORT and structured is None and error.startswith("invalid structured analysis")
+
+    _, structured, error = split_structured(block('{"overall_score": 250}'))
+    assert structured is None and error.startswith("invalid structured analysis")
+
+
+def test_analysis_without_valid_structured_fields_is_stale():
+    candidate = {"candidate_name": "Ada Lovelace", "resume_content": "Ada Lovelace\nPython"}
+    jd = {"job_description": "Python services"}
+    current = current_inputs(candidate, jd)
+    changed = stale_inputs(recorded_inputs(current, structured_error=True), current)
+    assert changed == ["structured_error"]
+    assert stale_parts(changed) == (True, False)
+
+
+def test_skill_filters_are_cleaned_like_the_stored_skills(mongo):
+    summaries = CandidateSummaryStore(mongo.recruitment_db)
+    summaries.collection.insert_many([
+        {"candidate_name": "Ada Lovelace", "matched_skills": ["python", "node.js"], "missing_skills": ["kafka"]},
+        {"candidate_name": "Grace Hopper", "matched_skills": ["python"], "missing_skills": ["rust"]},
+    ])
+
+    def names(**filters):
+        return sorted(item["candidate_name"] for item in summaries.list(**filters)[0])
+
+    assert clean_items([" Node.js. "]) == ["node.js"]
+    assert names(skills=[" Node.js. ", "PYTHON"]) == ["Ada Lovelace"]
+    assert names(missing_skill="Kafka.") == ["Ada Lovelace"]
@@ -0,0 +1,195 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import ann_index
+from ann_index import CandidateSearchIndex, IVFIndex
+
+DIMENSION = 16
+
+
+def random_vectors(count, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, DIMENSION)).astype(np.float32)
+
+
+def key(i):
+    return ("Backend", "Backend Engineer", f"Candidate {i}")
+
+
+@pytest.fixture
+def index():
+    index = IVFIndex(DIMENSION, nprobe=64)
+    vectors = random_vectors(200)
+    index.build([key(i) for i in range(200)], vectors, nlist=8)
+    return index, vectors
+
+
+def top_key(index, vector):
+    results = index.exact_search(vector, k=1)
+    return results[0][0] if results else None
+
+
+def test_search_finds_the_query_vector(index):
+    index, vectors = index
+    assert index.search(vectors[17], k=3)[0][0] == key(17)
+    assert len(index) == 200
+
+
+def test_add_and_replace(index):
+    index, vectors = index
+    extra = random_vectors(2, seed=1)
+    assert index.add(key(500), extra[0])
+    assert index.search(extra[0], k=1)[0][0] == key(500)
+
+    # Replacing a key drops its old vector
+    assert index.add(key(3), extra[1])
+    assert top_key(index, extra[1]) == key(3)
+    assert [found for found, _ in index.exact_search(vectors[3], k=200)].count(key(3)) == 1
+    assert len(index) == 201
+
+
+def test_add_rejects_wrong_dimension(index):
+    index, _ = index
+    assert not index.add(key(999), [1.0, 2.0])
+
+
+def test_compact_folds_the_delta(index):
+    index, vectors = index
+    extra = random_vectors(30, seed=2)
+    for i, vector in enumerate(extra):
+        index.add(key(1000 + i), vector)
+    index.add(key(0), extra[0] * -1)
+    assert index.pending == 31
+
+    index.compact()
+
+    assert index.pending == 0
+    assert len(index) == 230
+    for i, vector in enumerate(extra):
+        assert top_key(index, vector) == key(1000 + i)
+    assert top_key(index, extra[0] * -1) == key(0)
+
+
+@pytest.mark.parametrize("retrain", [False, True])
+def test_adds_during_compact_are_kept(index, monkeypatch, retrain):
+    index, vectors = index
+    if retrain:
+        # Outgrow the centroids so compact() retrains them
+        index.add_many((key(2000 + i), vector) for i, vector in enumerate(random_vectors(700, seed=3)))
+
+    # Hold compact() between its copy of the rows and the installation of the new layout
+    copied, resume = threading.Event(), threading.Event()
+    layout = IVFIndex._layout
+
+    def slow_layout(centroids, keys, vectors):
+        copied.set()
+        assert resume.wait(5)
+        return layout(centroids, keys, vectors)
+
+    monkeypatch.setattr(IVFIndex, "_layout", staticmethod(slow_layout))
+    compaction = threading.Thread(target=index.compact)
+    compaction.start()
+    assert copied.wait(5)
+
+    late = random_vectors(40, seed=4)
+    for i, vector in enumerate(late[:39]):
+        index.add(key(3000 + i), vector)
+    # A key replaced while the layout is computed keeps only its new vector
+    index.add(key(5), late[39])
+    resume.set()
+    compaction.join(5)
+    assert not compaction.is_alive()
+
+    for i, vector in enumerate(late[:39]):
+        assert top_key(index, vector) == key(3000 + i)
+    assert top_key(index, late[39]) == key(5)
+    ranked = [found for found, _ in index.exact_search(vectors[5], k=len(index))]
+    assert ranked.count(key(5)) == 1
+    assert len(index) == 200 + 39 + (700 if retrain else 0)
+
+
+def test_concurrent_adds_and_compactions(index):
+    index, _ = index
+    late = random_vectors(400, seed=5)
+    stop = threading.Event()
+
+    def compact_repeatedly():
+        while not stop.is_set():
+            index.compact()
+
+    compactor = threading.Thread(target=compact_repeatedly)
+    compactor.start()
+    try:
+        for i, vector in enumerate(late):
+            index.add(key(4000 + i), vector)
+    finally:
+        stop.set()
+        compactor.join(10)
+
+    assert len(index) == 600
+    for i, vector in enumerate(late):
+        assert top_key(index, vector) == key(4000 + i)
+
+
+def test_save_and_load(index, tmp_path):
+    index, vectors = index
+    index.add(key(700), random_vectors(1, seed=6)[0])
+    index.save(str(tmp_path))
+    first = set(os.listdir(tmp_path))
+
+    loaded = IVFIndex.load(str(tmp_path), nprobe=64)
+    assert len(loaded) == 201
+    assert loaded.search(vectors[42], k=1)[0][0] == key(42)
+
+    # A second save writes new files instead of rewriting the mapped ones
+    index.add(key(701), random_vectors(1, seed=7)[0])
+    index.save(str(tmp_path))
+    files = set(os.listdir(tmp_path))
+    assert {name for name in first if name.endswith(".npy")} <= files
+    assert not [name for name in files if name.endswith(".tmp")]
+    assert len(IVFIndex.load(str(tmp_path))) == 202
+    assert loaded.search(vectors[42], k=1)[0][0] == key(42)
+
+
+def test_save_versions_continue_across_processes(index, tmp_path):
+    index, _ = index
+    index.save(str(tmp_path))
+    other = IVFIndex.load(str(tmp_path))
+    other.save(str(tmp_path))
+    index.save(str(tmp_path))
+    assert ann_index._read_meta(str(tmp_path))["version"] == 3
+
+
+def test_search_index_saves_off_the_calling_thread(index, tmp_path, monkeypatch):
+    index, _ = index
+    search_index = CandidateSearchIndex(directory=str(tmp_path), save_every=1)
+    search_index.index = index
+    started, resume = threading.Event(), threading.Event()
+    save = index.save
+
+    def slow_save(directory):
+        started.set()
+        assert resume.wait(5)
+        save(directory)
+
+    monkeypatch.setattr(index, "save", slow_save)
+    search_index.add("Backend", "Backend Engineer", "New", random_vectors(1, seed=8)[0])
+    assert started.wait(5)
+    # add() returned while the save is still running
+    search_index.add("Backend", "Backend Engineer", "Newer", random_vectors(1, seed=9)[0])
+    resume.set()
+    assert search_index._saving.acquire(timeout=5)
+    search_index._saving.release()
+    assert ann_index._read_meta(str(tmp_path))["count"] >= 201
+
+
+def test_only_one_process_persists(tmp_path):
+    first = CandidateSearchIndex(directory=str(tmp_path))
+    second = CandidateSearchIndex(directory=str(tmp_path))
+    assert first._is_writer()
+    assert not second._is_writer()
+    first._writer_lock.close()
+    first._writer_lock = None
+    assert second._is_writer()
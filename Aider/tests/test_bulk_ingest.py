@@ -0,0 +1,156 @@
+import hashlib
+import json
+
+import pytest
+
+from bulk_ingest import DONE, FAILED, WRITTEN, Checkpoint, claimed_names, name_batch, plan
+from fingerprint import NearDuplicateIndex, minhash_signature
+
+JD = ("backend", "backend engineer")
+TEMPLATE = (
+    "Summary\nSoftware engineer with experience building backend services in Python and Go. "
+    "Skills\nPython, Go, PostgreSQL, Kubernetes, AWS, Docker, REST APIs, CI/CD pipelines. "
+    "Experience\nDesigned and operated high throughput services, led migrations and mentored engineers. "
+    "Education\nBSc Computer Science."
+)
+
+
+def parsed(path, text):
+    return {
+        "path": path, "digest": hashlib.sha256(text.encode()).hexdigest(), "text": text,
+        "github_links": [], "minhash": minhash_signature(text), "error": None
+    }
+
+
+def first_line(result):
+    return result["text"].splitlines()[0]
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"r{i}.txt"
+        path.write_text(f"resume {i}")
+        paths.append(str(path))
+    return paths
+
+
+def test_checkpoint_round_trip(tmp_path, files):
+    state = str(tmp_path / "state.json")
+    checkpoint = Checkpoint(state, "Backend", "Backend Engineer", interval=0)
+    checkpoint.remember_path(files[0], "d0")
+    checkpoint.mark("d0", FAILED, stage="write", error="boom")
+    checkpoint.mark("d0", WRITTEN, candidate_name="Ada Lovelace", path=files[0])
+
+    reloaded = Checkpoint(state, "backend", "backend engineer")
+    assert reloaded.known_digest(files[0]) == "d0"
+    assert reloaded.files["d0"]["status"] == WRITTEN
+    assert "error" not in reloaded.files["d0"] and "stage" not in reloaded.files["d0"]
+    assert reloaded.counts() == {WRITTEN: 1}
+
+
+def test_checkpoint_forgets_changed_files(tmp_path, files):
+    checkpoint = Checkpoint(str(tmp_path / "state.json"), "Backend", "Backend Engineer")
+    checkpoint.remember_path(files[0], "d0")
+    with open(files[0], "a") as f:
+        f.write(" and more")
+    assert checkpoint.known_digest(files[0]) is None
+
+
+def test_checkpoint_of_another_jd_is_refused(tmp_path):
+    state = tmp_path / "state.json"
+    state.write_text(json.dumps({"job_role": "Frontend", "job_title": "Frontend Engineer", "files": {}, "paths": {}}))
+    with pytest.raises(ValueError):
+        Checkpoint(str(state), "Backend", "Backend Engineer")
+
+
+def test_plan_resumes_where_the_run_stopped(tmp_path, files):
+    checkpoint = Checkpoint(str(tmp_path / "state.json"), "Backend", "Backend Engineer")
+    for i, (status, fields) in enumerate([
+        (DONE, {"candidate_name": "A"}),
+        (WRITTEN, {"candidate_name": "B"}),
+        (FAILED, {"candidate_name": "C", "stage": "analysis"}),
+    ]):
+        checkpoint.remember_path(files[i], f"d{i}")
+        checkpoint.files[f"d{i}"] = dict(fields, status=status)
+
+    to_parse, to_analyze, skipped = plan(checkpoint, files)
+    assert to_parse == [files[3]]
+    assert to_analyze == {"d1": "B"}
+    assert skipped == 2
+
+    to_parse, to_analyze, skipped = plan(checkpoint, files, retry_failed=True)
+    assert to_parse == [files[3]]
+    assert to_analyze == {"d1": "B", "d2": "C"}
+    assert skipped == 1
+
+
+def test_plan_reparses_files_that_failed_before_analysis(tmp_path, files):
+    checkpoint = Checkpoint(str(tmp_path / "state.json"), "Backend", "Backend Engineer")
+    checkpoint.remember_path(files[0], "d0")
+    checkpoint.files["d0"] = {"status": FAILED, "stage": "write", "candidate_name": "A"}
+    assert plan(checkpoint, files[:1]) == ([], {}, 1)
+    assert plan(checkpoint, files[:1], retry_failed=True) == ([files[0]], {}, 0)
+
+
+def test_same_name_in_a_batch_is_renamed():
+    batch = [parsed("/r/ada.txt", "Ada Lovelace\nMathematician, analytical engine, notes on Bernoulli numbers"),
+             parsed("/r/ada2.txt", "Ada Lovelace\nGardener, roses, tulips, landscaping and irrigation")]
+    claimed = {}
+    files = name_batch(batch, NearDuplicateIndex(), JD, lambda result: "Ada Lovelace", claimed)
+    assert [result["candidate_name"] for result in files] == ["Ada Lovelace", "Ada Lovelace (ada2)"]
+    assert set(claimed) == {"ada lovelace", "ada lovelace (ada2)"}
+
+
+def test_name_taken_by_an_earlier_run_is_renamed_unless_it_is_the_same_file():
+    claimed = {"ada lovelace": "/r/old.txt"}
+    batch = [parsed("/r/ada.txt", "Ada Lovelace\nMathematician")]
+    name_batch(batch, NearDuplicateIndex(), JD, lambda result: "Ada Lovelace", claimed)
+    assert batch[0]["candidate_name"] == "Ada Lovelace (ada)"
+
+    claimed = {"ada lovelace": "/r/ada.txt"}
+    batch = [parsed("/r/ada.txt", "Ada Lovelace\nMathematician, updated")]
+    name_batch(batch, NearDuplicateIndex(), JD, lambda result: "Ada Lovelace", claimed)
+    assert batch[0]["candidate_name"] == "Ada Lovelace"
+
+
+def test_near_duplicate_in_the_same_batch_supersedes_the_earlier_file():
+    index = NearDuplicateIndex(threshold=0.8)
+    batch = [parsed("/r/ada.txt", f"Ada Lovelace\n{TEMPLATE}"),
+             parsed("/r/ada-copy.txt", f"Ada Lovelace\n{TEMPLATE} Hobbies: chess")]
+    files = name_batch(batch, index, JD, first_line, {})
+    assert [result["path"] for result in files] == ["/r/ada-copy.txt"]
+    assert batch[0]["superseded_by"] == batch[1]["digest"]
+    assert index.query(batch[1]["minhash"])[0][0] == JD + ("Ada Lovelace",)
+
+
+def test_template_resumes_in_the_same_batch_keep_their_own_names():
+    index = NearDuplicateIndex(threshold=0.8)
+    batch = [parsed("/r/ada.txt", f"Ada Lovelace\n{TEMPLATE}"), parsed("/r/grace.txt", f"Grace Hopper\n{TEMPLATE}")]
+    files = name_batch(batch, index, JD, first_line, {})
+    assert [result["candidate_name"] for result in files] == ["Ada Lovelace", "Grace Hopper"]
+    assert not any(result.get("superseded_by") for result in batch)
+
+
+def test_stored_near_duplicate_keeps_its_name_without_extraction():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add(JD + ("Ada Lovelace",), minhash_signature(f"Ada Lovelace\n{TEMPLATE}"))
+    batch = [parsed("/r/ada.txt", f"Ada Lovelace\n{TEMPLATE} Hobbies: chess")]
+
+    def extract(result):
+        raise AssertionError("the stored name should have been reused")
+
+    files = name_batch(batch, index, JD, extract, {"ada lovelace": "/r/old.txt"})
+    assert files[0]["candidate_name"] == "Ada Lovelace"
+    assert files[0]["duplicate_of"]["candidate_name"] == "Ada Lovelace"
+
+
+def test_claimed_names_skip_superseded_and_failed_files(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "state.json"), "Backend", "Backend Engineer")
+    checkpoint.files.update({
+        "d0": {"status": DONE, "candidate_name": "Ada Lovelace", "path": "/r/ada.txt"},
+        "d1": {"status": DONE, "candidate_name": "Ada Lovelace", "path": "/r/ada-old.txt", "superseded_by": "d0"},
+        "d2": {"status": FAILED, "candidate_name": "Grace Hopper", "path": "/r/grace.txt"},
+    })
+    assert claimed_names(checkpoint) == {"ada lovelace": "/r/ada.txt"}
@@ -0,0 +1,122 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from candidate_clustering import CandidateClusterer, minibatch_kmeans, minibatch_update
+from candidate_ranking import CandidateRanker, candidates_generation_name
+from listing_cache import GENERATIONS_COLLECTION, bump_generation, local_generation
+
+UPLOADED = datetime.datetime(2026, 3, 1, 12, 0)
+GENERATION = candidates_generation_name("Platform", "Platform Engineer")
+
+BACKEND = "Python services with Kafka and PostgreSQL"
+DESIGN = "Figma prototypes and accessibility reviews"
+
+
+def candidate(name, embeddings, resume):
+    return {"candidate_name": name, "embeddings": embeddings, "resume_content": resume, "uploaded_at": UPLOADED}
+
+
+@pytest.fixture
+def jobs(mongo):
+    # Carry over the highest generation this worker has seen, as in test_listing_cache
+    mongo.recruitment_db[GENERATIONS_COLLECTION].insert_one({"_id": GENERATION, "generation": local_generation(GENERATION)})
+    jobs = mongo.recruitment_db.jobs
+    jobs.insert_one({
+        "job_role": "Platform",
+        "job_descriptions": [{
+            "title": "Platform Engineer",
+            "embeddings": [1.0, 1.0, 0.0],
+            "candidates": [
+                candidate("Ada Lovelace", [1.0, 0.1, 0.0], f"Ada. {BACKEND}"),
+                candidate("Grace Hopper", [0.9, 0.0, 0.1], f"Grace. {BACKEND}"),
+                candidate("Alan Turing", [1.0, 0.0, 0.0], f"Alan. {BACKEND}, 2019"),
+                candidate("Susan Kare", [0.1, 1.0, 0.0], f"Susan. {DESIGN}"),
+                candidate("Don Norman", [0.0, 0.9, 0.1], f"Don. {DESIGN}"),
+                candidate("Jony Ive", [0.0, 1.0, 0.0], f"Jony. {DESIGN}"),
+            ]
+        }]
+    })
+    return jobs
+
+
+def groups(result):
+    return {cluster["cluster_id"]: set(cluster["members"]) for cluster in result["clusters"]}
+
+
+def test_minibatch_update_moves_centroids_at_the_running_mean():
+    centroids = np.array([[1.0, 0.0], [0.0, -1.0]], dtype=np.float32)
+    moved, counts = minibatch_update(centroids, np.array([1.0, 4.0]), np.array([[0.0, 1.0]], dtype=np.float32))
+    # Half way between the old centroid and the new member, back on the unit sphere; the other centroid is untouched
+    np.testing.assert_allclose(moved, [[np.sqrt(0.5), np.sqrt(0.5)], [0.0, -1.0]], atol=1e-6)
+    assert counts.tolist() == [2.0, 4.0]
+
+
+def test_minibatch_kmeans_separates_groups_and_is_deterministic():
+    rng = np.random.default_rng(1)
+    axes = np.eye(3, dtype=np.float32)
+    vectors = np.concatenate([axis + 0.05 * rng.standard_normal((20, 3)).astype(np.float32) for axis in axes])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    centroids, counts = minibatch_kmeans(vectors, 3, batch_size=16)
+    assignments = np.argmax(vectors @ centroids.T, axis=1)
+    assert sorted(len(set(assignments[i:i + 20])) for i in (0, 20, 40)) == [1, 1, 1]
+    assert len(set(assignments)) == 3
+    assert counts.tolist() == [20.0, 20.0, 20.0]
+    np.testing.assert_allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+
+    again, _ = minibatch_kmeans(vectors, 3, batch_size=16)
+    np.testing.assert_array_equal(again, centroids)
+    # Never more clusters than vectors
+    assert minibatch_kmeans(vectors[:2], 5)[0].shape == (2, 3)
+
+
+def test_clusters_are_labelled_with_their_distinctive_terms(jobs):
+    clusterer = CandidateClusterer(CandidateRanker("mongodb://mongomock"), "mongodb://mongomock")
+    result = clusterer.clusters("platform", "PLATFORM ENGINEER", k=2)
+    assert (result["job_role"], result["job_title"], result["k"], result["total"]) == ("Platform", "Platform Engineer", 2, 6)
+
+    by_exemplar = {cluster["exemplars"][0]["candidate_name"]: cluster for cluster in result["clusters"]}
+    backend, design = by_exemplar["Alan Turing"], by_exemplar["Jony Ive"]
+    assert set(backend["members"]) == {"Ada Lovelace", "Grace Hopper", "Alan Turing"}
+    assert set(design["members"]) == {"Susan Kare", "Don Norman", "Jony Ive"}
+    # Shared by every member of one cluster and none of the other; names, numbers and stop words are not labels
+    assert set(backend["label"]) <= {"python", "services", "kafka", "postgresql"}
+    assert set(design["label"]) <= {"figma", "prototypes", "accessibility", "reviews"}
+    assert len(backend["label"]) == len(design["label"]) == 4
+
+    without = clusterer.clusters("Platform", "Platform Engineer", k=2, include_members=False)
+    assert all(cluster["members"] == [] for cluster in without["clusters"])
+    assert clusterer.clusters("Platform", "Go Engineer") is None
+
+
+def test_new_candidates_join_the_existing_clusters(jobs):
+    clusterer = CandidateClusterer(CandidateRanker("mongodb://mongomock", check_interval=0), "mongodb://mongomock")
+    before = groups(clusterer.clusters("Platform", "Platform Engineer", k=2))
+    centroids = clusterer._states[("platform", "platform engineer")].centroids.copy()
+
+    jobs.update_one({}, {"$push": {"job_descriptions.0.candidates": candidate("Guido van Rossum", [1.0, 0.2, 0.0], BACKEND)}})
+    bump_generation(jobs.database, GENERATION)
+    after = groups(clusterer.clusters("Platform", "Platform Engineer", k=2))
+
+    # Updated rather than refitted: the same cluster ids, and only the backend centroid moved
+    backend = next(cluster for cluster, members in before.items() if "Ada Lovelace" in members)
+    assert after[backend] == before[backend] | {"Guido van Rossum"}
+    assert {c: m for c, m in after.items() if c != backend} == {c: m for c, m in before.items() if c != backend}
+    state = clusterer._states[("platform", "platform engineer")]
+    assert state.fitted_size == 6
+    np.testing.assert_array_equal(np.delete(state.centroids, backend, axis=0), np.delete(centroids, backend, axis=0))
+    assert not np.array_equal(state.centroids[backend], centroids[backend])
+
+
+def test_a_jd_that_doubled_in_size_is_refitted(jobs):
+    clusterer = CandidateClusterer(CandidateRanker("mongodb://mongomock", check_interval=0), "mongodb://mongomock")
+    clusterer.clusters("Platform", "Platform Engineer", k=2)
+    newcomers = [candidate(f"Designer {i}", [0.0, 1.0, 0.05 * i], DESIGN) for i in range(6)]
+    jobs.update_one({}, {"$push": {"job_descriptions.0.candidates": {"$each": newcomers}}})
+    bump_generation(jobs.database, GENERATION)
+
+    result = clusterer.clusters("Platform", "Platform Engineer", k=2)
+    assert clusterer._states[("platform", "platform engineer")].fitted_size == 12
+    assert sorted(cluster["size"] for cluster in result["clusters"]) == [3, 9]
@@ -0,0 +1,91 @@
+import datetime
+
+import pytest
+
+from candidate_ranking import CandidateRanker, candidates_generation_name
+from listing_cache import bump_generation
+
+UPLOADED = datetime.datetime(2026, 3, 1, 12, 0)
+
+
+def candidate(name, embeddings):
+    return {"candidate_name": name, "embeddings": embeddings, "uploaded_at": UPLOADED}
+
+
+@pytest.fixture
+def jobs(mongo):
+    jobs = mongo.recruitment_db.jobs
+    jobs.insert_one({
+        "job_role": "Backend",
+        "job_descriptions": [{
+            "title": "Backend Engineer",
+            "embeddings": [1.0, 0.0],
+            "candidates": [
+                candidate("Ada Lovelace", [0.6, 0.8]),
+                candidate("Grace Hopper", [3.0, 0.0]),
+                candidate("Alan Turing", [0.0, -1.0]),
+                candidate("Edsger Dijkstra", [0.8, 0.6]),
+                # Not rankable: no embedding, or one of another model
+                candidate("Barbara Liskov", []),
+                candidate("Ken Thompson", [1.0, 0.0, 0.0]),
+            ]
+        }]
+    })
+    return jobs
+
+
+def names(ranking):
+    return [item["candidate_name"] for item in ranking["items"]]
+
+
+def test_candidates_are_ranked_by_cosine_similarity(jobs):
+    ranking = CandidateRanker("mongodb://mongomock").rank("backend", "BACKEND ENGINEER")
+    assert names(ranking) == ["Grace Hopper", "Edsger Dijkstra", "Ada Lovelace", "Alan Turing"]
+    assert [item["similarity"] for item in ranking["items"]] == [1.0, 0.8, 0.6, 0.0]
+    assert [item["rank"] for item in ranking["items"]] == [1, 2, 3, 4]
+    assert ranking["items"][0]["uploaded_at"] == UPLOADED.isoformat()
+    # The stored spelling, not the requested one
+    assert (ranking["job_role"], ranking["job_title"]) == ("Backend", "Backend Engineer")
+
+
+def test_candidates_without_a_usable_embedding_are_skipped(jobs):
+    ranking = CandidateRanker("mongodb://mongomock").rank("Backend", "Backend Engineer")
+    assert ranking["total"] == 4
+    assert ranking["unscored"] == 2
+
+
+def test_pages_and_minimum_similarity(jobs):
+    ranker = CandidateRanker("mongodb://mongomock")
+    second = ranker.rank("Backend", "Backend Engineer", page=2, page_size=2)
+    assert names(second) == ["Ada Lovelace", "Alan Turing"]
+    assert [item["rank"] for item in second["items"]] == [3, 4]
+
+    close = ranker.rank("Backend", "Backend Engineer", min_similarity=0.7)
+    assert names(close) == ["Grace Hopper", "Edsger Dijkstra"]
+    assert close["total"] == 2
+
+
+def test_unknown_jd_is_none(jobs):
+    assert CandidateRanker("mongodb://mongomock").rank("Backend", "Go Engineer") is None
+
+
+def test_matrix_is_cached_until_the_jd_generation_is_bumped(jobs):
+    ranker = CandidateRanker("mongodb://mongomock", check_interval=0)
+    first = ranker.matrix_for("Backend", "Backend Engineer")
+    assert ranker.matrix_for("Backend", "Backend Engineer") is first
+
+    jobs.update_one({}, {"$push": {"job_descriptions.0.candidates": candidate("Donald Knuth", [1.0, 0.1])}})
+    assert ranker.matrix_for("Backend", "Backend Engineer") is first
+    bump_generation(jobs.database, candidates_generation_name("Backend", "Backend Engineer"))
+    assert names(ranker.rank("Backend", "Backend Engineer", page_size=2)) == ["Grace Hopper", "Donald Knuth"]
+
+
+def test_ranking_endpoint(api, jobs):
+    response = api.get("/jobs/Backend/Backend Engineer/ranking", params={"page_size": 2})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [item["candidate_name"] for item in body["data"]] == ["Grace Hopper", "Edsger Dijkstra"]
+    assert (body["total_candidates"], body["unscored_candidates"]) == (4, 2)
+    assert body["data"][0]["analysis_status"] is None
+
+    assert api.get("/jobs/Backend/Go Engineer/ranking").status_code == 404
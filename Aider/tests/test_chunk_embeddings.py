@@ -0,0 +1,125 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import data_storage
+from candidate_ranking import CandidateRanker
+from data_storage import RecruitmentDataStorage
+from document_parser import DocumentParser
+from vector_utils import document_similarity, max_sim, max_sim_scores, pack_matrix
+
+RESUME = (
+    "Ada Lovelace\n\n"
+    "Experience\n"
+    "Built payment services in Python. Ran them on Kubernetes.\n\n"
+    "Skills\n"
+    "Python, Go, Kafka"
+)
+
+
+def test_chunk_text_keeps_sections_apart_and_carries_headings():
+    chunks = DocumentParser.chunk_text(RESUME)
+    assert chunks == [
+        "Ada Lovelace Experience Built payment services in Python. Ran them on Kubernetes.",
+        "Skills Python, Go, Kafka"
+    ]
+
+
+def test_chunk_text_windows_overlap_by_whole_sentences():
+    text = " ".join(f"Sentence {i} has five words." for i in range(10))
+    chunks = DocumentParser.chunk_text(text, max_words=10, overlap_words=5)
+    assert chunks[0] == "Sentence 0 has five words. Sentence 1 has five words."
+    # The last sentence of a window opens the next one
+    assert chunks[1] == "Sentence 1 has five words. Sentence 2 has five words."
+    assert all(len(chunk.split()) <= 10 for chunk in chunks)
+
+
+def test_chunk_text_cuts_sentences_longer_than_a_window():
+    chunks = DocumentParser.chunk_text(" ".join(["word"] * 25), max_words=10, overlap_words=0)
+    assert [len(chunk.split()) for chunk in chunks] == [10, 10, 5]
+
+
+def test_embed_document_pools_the_normalized_chunk_vectors():
+    pooled, chunk_matrix = DocumentParser().embed_document(RESUME)
+    assert chunk_matrix.shape[0] == len(DocumentParser.chunk_text(RESUME))
+    assert np.allclose(np.linalg.norm(chunk_matrix, axis=1), 1.0, atol=1e-5)
+
+    weights = np.array([len(chunk.split()) for chunk in DocumentParser.chunk_text(RESUME)], dtype=np.float32)
+    expected = (chunk_matrix * weights[:, None]).sum(axis=0)
+    assert np.allclose(pooled, expected / np.linalg.norm(expected), atol=1e-5)
+
+
+def test_embed_document_of_empty_text_is_empty():
+    pooled, chunk_matrix = DocumentParser().embed_document("  \n ")
+    assert pooled.size == 0 and chunk_matrix.size == 0
+
+
+def test_max_sim_matches_every_query_chunk_with_its_best_document_chunk():
+    query = np.array([[1.0, 0.0], [0.0, 1.0]])
+    document = np.array([[2.0, 0.0], [1.0, 1.0]])
+    assert max_sim(query, document) == pytest.approx((1.0 + 1 / np.sqrt(2)) / 2)
+    assert max_sim(query, np.zeros((0, 2))) == 0.0
+
+
+def test_max_sim_scores_one_query_against_many_documents():
+    query = np.array([[1.0, 0.0], [0.0, 1.0]])
+    documents = [np.array([[2.0, 0.0], [1.0, 1.0]]), np.zeros((0, 0)), np.array([[0.0, 3.0]]), np.ones((1, 3))]
+    scores = max_sim_scores(query, documents)
+    assert scores[0] == pytest.approx(max_sim(query, documents[0]))
+    assert scores[2] == pytest.approx(max_sim(query, documents[2]))
+    # No chunks, or chunks of another dimension: no score
+    assert np.isnan(scores[1]) and np.isnan(scores[3])
+
+
+def test_document_similarity_uses_the_chunks_only_for_maxsim():
+    a, b = np.array([[1.0, 0.0], [0.0, 1.0]]), np.array([[1.0, 0.0]])
+    assert document_similarity([1.0, 0.0], [1.0, 0.0], pack_matrix(a), pack_matrix(b)) == pytest.approx(1.0)
+    assert document_similarity([1.0, 0.0], [1.0, 0.0], pack_matrix(a), pack_matrix(b), method="maxsim") == pytest.approx(0.5)
+    # Without chunk matrices maxsim falls back to the pooled vectors
+    assert document_similarity([1.0, 0.0], [1.0, 0.0], method="maxsim") == pytest.approx(1.0)
+
+
+def jd(title, chunks):
+    chunks = np.asarray(chunks, dtype=np.float32)
+    return {"title": title, "embeddings": chunks.mean(axis=0).tolist(), "chunk_embeddings": pack_matrix(chunks), "candidates": []}
+
+
+def test_jd_duplicates_can_be_detected_by_maxsim(mongo, monkeypatch):
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage = RecruitmentDataStorage("mongodb://mongomock")
+    mongo.recruitment_db.jobs.insert_one({"job_role": "Backend", "job_descriptions": [jd("Backend Engineer", [[1, 0, 0], [0, 1, 0]])]})
+    # Same pooled vector, different chunks
+    new = np.array([[1, 1, 0], [1, 1, 0]], dtype=np.float32)
+    embeddings, chunks = new.mean(axis=0).tolist(), pack_matrix(new)
+
+    assert storage.find_similar_job(embeddings, "Backend", chunk_embeddings=chunks) is not None
+    assert storage.find_similar_job(embeddings, "Backend", chunk_embeddings=chunks, method="maxsim") is None
+
+    monkeypatch.setattr(data_storage, "JD_DUPLICATE_METHOD", "maxsim")
+    result = storage.upload_jd("Backend", "Go services", "Remote", "Go Engineer", embeddings=embeddings, chunk_embeddings=chunks)
+    assert result["status"] == "updated"
+
+
+def test_ranking_by_maxsim(mongo):
+    candidates = [
+        # The pooled vectors favour Ada, the chunks Grace
+        {"candidate_name": "Ada Lovelace", "embeddings": [1.0, 1.0, 0.0], "chunk_embeddings": pack_matrix([[1, 1, 0]])},
+        {"candidate_name": "Grace Hopper", "embeddings": [1.0, 0.0, 0.0], "chunk_embeddings": pack_matrix([[1, 0, 0], [0, 1, 0]])},
+        # Stored without chunks: ranked by its pooled score
+        {"candidate_name": "Alan Turing", "embeddings": [0.0, 0.0, 1.0]},
+    ]
+    mongo.recruitment_db.jobs.insert_one({
+        "job_role": "Backend",
+        "job_descriptions": [{**jd("Backend Engineer", [[1, 0, 0], [0, 1, 0]]), "candidates": candidates}]
+    })
+    ranker = CandidateRanker("mongodb://mongomock")
+
+    pooled = ranker.rank("Backend", "Backend Engineer")
+    maxsim = ranker.rank("Backend", "Backend Engineer", method="maxsim")
+    assert [item["candidate_name"] for item in pooled["items"]] == ["Ada Lovelace", "Grace Hopper", "Alan Turing"]
+    assert [item["candidate_name"] for item in maxsim["items"]] == ["Grace Hopper", "Ada Lovelace", "Alan Turing"]
+    assert maxsim["method"] == "maxsim"
+    assert maxsim["items"][0]["similarity"] == 1.0
+    assert maxsim["items"][2]["similarity"] == 0.0
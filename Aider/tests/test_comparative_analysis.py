@@ -0,0 +1,40 @@
+import json
+import re
+
+from comparative_analysis import ANSWER_TOKENS, ShortlistComparer, estimate_tokens
+
+JD = {"job_role": "Backend", "title": "Backend Engineer", "job_description": "Python and Go services"}
+
+
+class FlakyAnalyzer:
+    """Answers the first call with prose, every later one with a valid ranking"""
+    def __init__(self):
+        self.prompts = []
+
+    def compare_candidates(self, prompt, max_tokens):
+        self.prompts.append(prompt)
+        if len(self.prompts) == 1:
+            return "Sorry, here is my opinion instead."
+        labels = re.findall(r"^\[(C\d+)\]", prompt, re.MULTILINE)
+        return json.dumps({"ranking": [
+            {"id": label, "rank": rank, "score": 90 - rank} for rank, label in enumerate(labels, start=1)
+        ]})
+
+
+def candidates(count):
+    return [{"candidate_name": f"Candidate {i}", "resume_content": f"Candidate {i}\nPython, Go"} for i in range(count)]
+
+
+def test_answer_allowance_fits_a_full_ranking_entry():
+    assert ANSWER_TOKENS > 120
+    assert ShortlistComparer(analyzer=None).answer_tokens == ANSWER_TOKENS
+
+
+def test_prompt_tokens_count_every_call_including_failed_ones():
+    analyzer = FlakyAnalyzer()
+    result = ShortlistComparer(analyzer).compare(JD, candidates(4))
+
+    assert result["calls"] == 3
+    assert result["batches"] == 2
+    assert len(result["ranking"]) == 4 and not result["not_compared"]
+    assert result["estimated_prompt_tokens"] == sum(estimate_tokens(prompt) for prompt in analyzer.prompts)
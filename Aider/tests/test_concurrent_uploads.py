@@ -0,0 +1,86 @@
+"""
+Concurrency check for the candidate upsert in RecruitmentDataStorage.upload_resume.
+
+Many uploads for the same JD run in parallel, every candidate several times;
+the JD must then hold each candidate exactly once (no duplicates, no lost
+writes) and exactly one upload per candidate must report "created".
+
+The fake mongomock runs the upsert pipeline under one lock (see
+test_upload_pipeline.py for its results), so only a real mongod shows it is
+atomic: this needs one at MONGODB_TEST_URI (default mongodb://localhost:27017, e.g.
+`docker run -p 27017:27017 mongo`) and is skipped without one. It works in a
+database of its own, dropped afterwards.
+"""
+import collections
+import contextlib
+import io
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import RealMongoClient
+from data_storage import RecruitmentDataStorage
+
+MONGODB_TEST_URI = os.getenv("MONGODB_TEST_URI", "mongodb://localhost:27017")
+ROLE = "Concurrency"
+TITLE = "Concurrency Engineer"
+CANDIDATES = 40
+REPEATS = 4
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    client = RealMongoClient(MONGODB_TEST_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        client.close()
+        pytest.skip(f"no mongod at {MONGODB_TEST_URI}: {e}")
+
+    import mongo_connection
+    monkeypatch.setattr(mongo_connection, "MongoClient", RealMongoClient)
+    monkeypatch.setattr(mongo_connection, "_clients", {})
+    database_name = f"test_concurrent_uploads_{uuid.uuid4().hex[:8]}"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield RecruitmentDataStorage(MONGODB_TEST_URI, database_name=database_name)
+    finally:
+        client.drop_database(database_name)
+        client.close()
+
+
+def test_concurrent_uploads_store_every_candidate_once(storage):
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage.upload_jd(ROLE, "We need engineers who write concurrent Python.", "Remote", TITLE)
+
+    first = ["Alex", "Sam", "Priya", "Chen", "Maria", "Omar", "Lena", "Ravi", "Jonas", "Aiko"]
+    last = ["Smith", "Patel", "Garcia", "Nguyen"]
+    names = [f"{f} {l}" for l in last for f in first][:CANDIDATES]
+    # Interleaved so the same candidate is in flight on several threads at once
+    uploads = [name for _ in range(REPEATS) for name in names]
+
+    def upload(name):
+        return storage.upload_resume(
+            job_role=ROLE,
+            job_title=TITLE,
+            resume_content=f"{name}\nPython developer with Kafka and Kubernetes experience.",
+            github_links=[]
+        )
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        results = list(pool.map(upload, uploads))
+
+    errors = [result["message"] for result in results if result["status"] == "error"]
+    assert not errors
+    created = collections.Counter(result["candidate_name"] for result in results if result["status"] == "created")
+    assert created == collections.Counter(names)
+
+    job = storage.db["jobs"].find_one({"job_role": ROLE})
+    stored = collections.Counter(
+        candidate["candidate_name"]
+        for jd in job["job_descriptions"] if jd["title"] == TITLE
+        for candidate in jd.get("candidates", [])
+    )
+    assert stored == collections.Counter(names)
@@ -0,0 +1,74 @@
+import numpy as np
+
+from document_cache import CACHE_FORMAT, DocumentCache
+from metrics import CACHE_REQUESTS
+
+
+def lookups(cache):
+    return {result: CACHE_REQUESTS.value(cache=cache, result=result) for result in ("hit", "miss")}
+
+
+def put(cache, text):
+    digest = DocumentCache.digest(text.encode())
+    cache.put(digest, text, ["https://github.com/ada"], np.array([0.5, 0.25]))
+    return digest
+
+
+def test_recent_entries_are_served_from_memory(mongo):
+    cache = DocumentCache("mongodb://mongomock", max_entries=2)
+    digest = put(cache, "Ada Lovelace")
+    mongo.recruitment_db.document_cache.delete_many({})
+
+    before = lookups("document_memory")
+    entry = cache.get(digest)
+    assert entry["text"] == "Ada Lovelace"
+    assert entry["embeddings"] == [0.5, 0.25]
+    assert lookups("document_memory")["hit"] == before["hit"] + 1
+
+
+def test_evicted_entries_are_reloaded_from_mongo(mongo):
+    cache = DocumentCache("mongodb://mongomock", max_entries=2)
+    first, second = put(cache, "Ada Lovelace"), put(cache, "Grace Hopper")
+    cache.get(first)
+    third = put(cache, "Alan Turing")
+    # The least recently used entry went, and every entry was spilled to Mongo
+    assert list(cache._entries) == [first, third]
+    assert mongo.recruitment_db.document_cache.count_documents({}) == 3
+
+    before = lookups("document_mongo")
+    entry = cache.get(second)
+    assert (entry["text"], entry["github_links"], entry["embeddings"]) == ("Grace Hopper", ["https://github.com/ada"], [0.5, 0.25])
+    assert lookups("document_mongo")["hit"] == before["hit"] + 1
+    # Back in memory, at the expense of the next least recently used
+    assert list(cache._entries) == [third, second]
+
+
+def test_entries_written_by_another_worker_are_served(mongo):
+    digest = put(DocumentCache("mongodb://mongomock"), "Ada Lovelace")
+    assert DocumentCache("mongodb://mongomock").get(digest)["text"] == "Ada Lovelace"
+
+
+def test_entries_of_an_older_format_are_parsed_again(mongo):
+    cache = DocumentCache("mongodb://mongomock")
+    mongo.recruitment_db.document_cache.insert_one({"_id": "stale", "format": CACHE_FORMAT - 1, "text": "Ada Lovelace"})
+    before = lookups("document_mongo")
+    assert cache.get("stale") is None
+    assert lookups("document_mongo")["miss"] == before["miss"] + 1
+
+
+def test_memory_is_bounded_by_size(mongo):
+    cache = DocumentCache("mongodb://mongomock", max_bytes=100)
+    first, second = put(cache, "a" * 20), put(cache, "b" * 20)
+    assert list(cache._entries) == [second]
+    assert cache._total_bytes == 20 + 2 * 8 + len("https://github.com/ada")
+    # Too large to keep in memory at all, but still cached in Mongo
+    large = put(cache, "c" * 100)
+    assert large not in cache._entries
+    assert cache.get(first)["text"] == "a" * 20
+
+
+def test_without_mongo_only_memory_is_used():
+    cache = DocumentCache(max_entries=1)
+    first = put(cache, "Ada Lovelace")
+    put(cache, "Grace Hopper")
+    assert cache.get(first) is None
@@ -0,0 +1,133 @@
+import datetime
+
+from data_storage import RecruitmentDataStorage
+from fingerprint import NearDuplicateIndex, minhash_signature, name_in_text, pack_signature
+
+TEMPLATE = (
+    "Summary\nSoftware engineer with experience building backend services in Python and Go. "
+    "Skills\nPython, Go, PostgreSQL, Kubernetes, AWS, Docker, REST APIs, CI/CD pipelines. "
+    "Experience\nDesigned and operated high throughput services, led migrations and mentored engineers. "
+    "Education\nBSc Computer Science."
+)
+
+
+def resume(name):
+    return f"{name}\n{TEMPLATE}"
+
+
+def test_name_in_text():
+    assert name_in_text("Ada Lovelace", resume("ADA LOVELACE"))
+    assert not name_in_text("Ada Lovelace", resume("Grace Hopper"))
+    assert not name_in_text("", TEMPLATE)
+    assert not name_in_text(None, TEMPLATE)
+
+
+def test_template_resumes_are_near_duplicates_but_not_the_same_name():
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add(("backend", "backend engineer", "Ada Lovelace"), minhash_signature(resume("Ada Lovelace")))
+    matches = index.query(minhash_signature(resume("Grace Hopper")))
+    assert matches and matches[0][0][2] == "Ada Lovelace"
+    assert not name_in_text(matches[0][0][2], resume("Grace Hopper"))
+
+
+def test_analysis_is_kept_only_for_the_same_person_and_jd():
+    duplicate_of = {"job_role": "backend", "job_title": "backend engineer", "candidate_name": "Ada Lovelace"}
+    keeps = RecruitmentDataStorage._keeps_analysis
+    assert keeps(duplicate_of, "Backend", "Backend Engineer", "Ada Lovelace")
+    assert not keeps(duplicate_of, "Backend", "Backend Engineer", "Grace Hopper")
+    assert not keeps(duplicate_of, "Backend", "Platform Engineer", "Ada Lovelace")
+    assert not keeps(None, "Backend", "Backend Engineer", "Ada Lovelace")
+
+
+def test_refresh_picks_up_fingerprints_written_elsewhere(mongo):
+    storage = RecruitmentDataStorage("mongodb://fake")
+    uploaded = datetime.datetime(2026, 1, 1)
+
+    def candidate(name, at):
+        return {"candidate_name": name, "minhash": pack_signature(minhash_signature(resume(name) + name * 20)), "uploaded_at": at}
+
+    storage.jobs_collection.insert_one({
+        "job_role": "Backend",
+        "job_descriptions": [{"title": "Backend Engineer", "candidates": [candidate("Ada Lovelace", uploaded)]}]
+    })
+    index = NearDuplicateIndex()
+    assert index.refresh_due(30)
+    assert index.load(storage.iter_candidate_fingerprints(since=index.refresh_since())) == 1
+    assert not index.refresh_due(30)
+    assert index.watermark == uploaded
+
+    # Another worker writes a candidate; the next refresh reads what is new, plus the overlap before the watermark
+    later = uploaded + datetime.timedelta(hours=1)
+    storage.jobs_collection.update_one(
+        {"job_role": "Backend"},
+        {"$push": {"job_descriptions.0.candidates": candidate("Grace Hopper", later)}}
+    )
+    assert index.refresh_due(0)
+    assert index.load(storage.iter_candidate_fingerprints(since=index.refresh_since())) == 2
+    assert index.watermark == later
+    assert len(index) == 2
+
+    far_later = later + datetime.timedelta(days=1)
+    assert index.load(storage.iter_candidate_fingerprints(since=far_later)) == 0
+
+
+def test_refresh_reads_only_the_roles_with_new_fingerprints(mongo):
+    storage = RecruitmentDataStorage("mongodb://fake")
+    old, new = datetime.datetime(2026, 1, 1), datetime.datetime(2026, 2, 1)
+
+    def role(name, candidates):
+        return {"job_role": name, "job_descriptions": [{"title": f"{name} Engineer", "candidates": [
+            {"candidate_name": candidate, "minhash": pack_signature(minhash_signature(resume(candidate))), "uploaded_at": at}
+            for candidate, at in candidates
+        ]}]}
+
+    storage.jobs_collection.insert_many([
+        role("Backend", [("Ada Lovelace", old), ("Grace Hopper", new)]),
+        role("Frontend", [("Alan Turing", old)])
+    ])
+    pipeline = []
+    aggregate = storage.jobs_collection.aggregate
+    storage.jobs_collection.aggregate = lambda stages: pipeline.extend(stages) or aggregate(stages)
+
+    keys = [key for key, _, _ in storage.iter_candidate_fingerprints(since=old)]
+    assert keys == [("backend", "backend engineer", "Grace Hopper")]
+    assert pipeline[0] == {"$match": {
+        "job_descriptions.candidates.minhash": {"$exists": True},
+        "job_descriptions.candidates.uploaded_at": {"$gt": old}
+    }}
+
+
+def test_near_duplicate_upload_reuses_the_earlier_embeddings(api, monkeypatch):
+    import data_storage
+    import main
+
+    monkeypatch.setattr(data_storage.RecruitmentDataStorage, "store_analysis", lambda self, **kwargs: {})
+    monkeypatch.setattr(main, "NEAR_DUPLICATE_REFRESH_SECONDS", 0)
+    with_sections = []
+    embed_resume = main.document_parser.embed_resume
+    monkeypatch.setattr(main.document_parser, "embed_resume", lambda text: with_sections.append(text) or embed_resume(text))
+
+    storage = RecruitmentDataStorage("mongodb://fake")
+    storage.upload_jd("Backend", "Python and Go services", "Remote", "Backend Engineer")
+
+    def upload(text):
+        return api.post(
+            "/jobs/upload-resume/file",
+            data={"job_role": "Backend", "job_title": "Backend Engineer"},
+            files={"file": ("resume.txt", text.encode(), "text/plain")}
+        )
+
+    first = upload(resume("Ada Lovelace"))
+    assert first.status_code == 200 and first.json()["status"] == "created", first.text
+    assert len(with_sections) == 1
+
+    # The same person with a small edit: near-duplicate, no model call
+    second = upload(resume("Ada Lovelace") + " Kafka.")
+    assert second.status_code == 200 and second.json()["status"] == "updated", second.text
+    assert second.json()["duplicate_of"]["candidate_name"] == "Ada Lovelace"
+    assert len(with_sections) == 1
+
+    # Someone else from the same template is embedded
+    third = upload(resume("Grace Hopper"))
+    assert third.json()["status"] == "created", third.text
+    assert len(with_sections) == 2
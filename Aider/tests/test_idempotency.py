@@ -0,0 +1,67 @@
+import data_storage
+from candidate_summaries import CandidateSummaryStore
+from screening import LOW_MATCH
+
+PARAMS = {"job_role": "Backend", "candidate_name": "Ada Lovelace", "job_title": "Backend Engineer"}
+
+
+def stub_store_analysis(monkeypatch):
+    calls = []
+
+    def store_analysis(self, job_role, candidate_name, job_title, force=True):
+        calls.append(candidate_name)
+        return {"status": "success", "message": f"analysis {len(calls)}", "candidate_analysis": None}
+
+    monkeypatch.setattr(data_storage.RecruitmentDataStorage, "store_analysis", store_analysis)
+    return calls
+
+
+def test_retry_replays_the_stored_response(api, monkeypatch):
+    calls = stub_store_analysis(monkeypatch)
+    headers = {"Idempotency-Key": "store-1"}
+
+    first = api.post("/analysis/store", params=PARAMS, headers=headers)
+    second = api.post("/analysis/store", params=PARAMS, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert calls == ["Ada Lovelace"]
+
+
+def test_new_key_runs_again(api, monkeypatch):
+    calls = stub_store_analysis(monkeypatch)
+    api.post("/analysis/store", params=PARAMS, headers={"Idempotency-Key": "store-2"})
+    api.post("/analysis/store", params=PARAMS, headers={"Idempotency-Key": "store-3"})
+    assert len(calls) == 2
+
+
+def test_key_reused_for_another_request_is_rejected(api, monkeypatch):
+    stub_store_analysis(monkeypatch)
+    headers = {"Idempotency-Key": "store-4"}
+    assert api.post("/analysis/store", params=PARAMS, headers=headers).status_code == 200
+    other = api.post("/analysis/store", params={**PARAMS, "candidate_name": "Grace Hopper"}, headers=headers)
+    assert other.status_code == 422
+
+
+def test_promote_retry_replays_instead_of_409(api, monkeypatch):
+    calls = stub_store_analysis(monkeypatch)
+    status = {"analysis_status": LOW_MATCH, "github_links": 0}
+    monkeypatch.setattr(
+        CandidateSummaryStore, "lookup",
+        lambda self, job_role, job_title, names: {name: dict(status) for name in names}
+    )
+    headers = {"Idempotency-Key": "promote-1"}
+
+    first = api.post("/analysis/promote", params=PARAMS, headers=headers)
+    assert first.status_code == 200
+
+    # The promote completed the analysis; its retry must still get the stored response
+    status["analysis_status"] = "completed"
+    retry = api.post("/analysis/promote", params=PARAMS, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers.get("Idempotent-Replayed") == "true"
+
+    fresh = api.post("/analysis/promote", params=PARAMS, headers={"Idempotency-Key": "promote-2"})
+    assert fresh.status_code == 409
+    assert calls == ["Ada Lovelace"]
@@ -0,0 +1,97 @@
+import contextlib
+import io
+
+import pytest
+
+import data_storage
+from data_storage import RecruitmentDataStorage
+from jd_matching import JDS_GENERATION_ID, JDMatcher
+from listing_cache import GENERATIONS_COLLECTION, bump_generation, local_generation
+
+
+def jd(title, embeddings, location="Remote"):
+    return {"title": title, "location": location, "embeddings": embeddings, "candidates": []}
+
+
+@pytest.fixture
+def jobs(mongo):
+    # Carry over the highest generation this worker has seen, as in test_listing_cache
+    mongo.recruitment_db[GENERATIONS_COLLECTION].insert_one(
+        {"_id": JDS_GENERATION_ID, "generation": local_generation(JDS_GENERATION_ID)}
+    )
+    jobs = mongo.recruitment_db.jobs
+    jobs.insert_many([
+        {"job_role": "Backend", "job_descriptions": [
+            jd("Backend Engineer", [1.0, 0.0]),
+            jd("Go Engineer", [0.9, 0.1], location="Berlin"),
+        ]},
+        {"job_role": "Data", "job_descriptions": [
+            jd("Data Engineer", [0.7, 0.7]),
+            jd("Analyst", [0.0, 1.0]),
+            # No embedding: never suggested
+            {"title": "Intern", "candidates": []},
+        ]},
+    ])
+    return jobs
+
+
+def titles(matches):
+    return [(match["job_role"], match["job_title"]) for match in matches]
+
+
+def test_alternatives_exclude_the_uploaded_jd_and_are_best_first(jobs):
+    matcher = JDMatcher("mongodb://mongomock", top_k=3, min_similarity=0.3)
+    matches = matcher.alternatives([1.0, 0.0], "backend", "BACKEND ENGINEER")
+    assert titles(matches) == [("Backend", "Go Engineer"), ("Data", "Data Engineer")]
+    assert matches[0]["location"] == "Berlin"
+    assert matches[0]["similarity"] == pytest.approx(0.9939, abs=1e-4)
+
+    assert titles(matcher.alternatives([1.0, 0.0], "Backend", "Backend Engineer", k=1)) == [("Backend", "Go Engineer")]
+    assert matcher.alternatives([], "Backend", "Backend Engineer") == []
+    assert matcher.alternatives([1.0, 0.0, 0.0], "Backend", "Backend Engineer") == []
+
+
+def test_new_jds_are_matched_after_the_generation_bump(jobs):
+    matcher = JDMatcher("mongodb://mongomock", check_interval=0)
+    assert titles(matcher.alternatives([0.0, 1.0], "Data", "Analyst", k=1)) == [("Data", "Data Engineer")]
+
+    jobs.update_one({"job_role": "Data"}, {"$push": {"job_descriptions": jd("BI Analyst", [0.1, 1.0])}})
+    assert titles(matcher.alternatives([0.0, 1.0], "Data", "Analyst", k=1)) == [("Data", "Data Engineer")]
+    bump_generation(jobs.database, JDS_GENERATION_ID)
+    assert titles(matcher.alternatives([0.0, 1.0], "Data", "Analyst", k=1)) == [("Data", "BI Analyst")]
+
+
+def test_every_upload_stores_its_alternatives(jobs, monkeypatch):
+    monkeypatch.setattr(data_storage.LLMAnalyzer, "extract_candidate_name", lambda self, text: text.splitlines()[0])
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage = RecruitmentDataStorage("mongodb://mongomock")
+    matcher = JDMatcher("mongodb://mongomock", top_k=2, min_similarity=0.5)
+
+    def upload(name, embeddings):
+        return storage.upload_resume(
+            job_role="Backend", job_title="Backend Engineer", resume_content=f"{name}\nPython",
+            embeddings=embeddings, github_links=[], jd_matcher=matcher
+        )
+
+    backend = upload("Ada Lovelace", [1.0, 0.0])
+    data = upload("Grace Hopper", [0.1, 1.0])
+    assert titles(backend["alternative_matches"]) == [("Backend", "Go Engineer"), ("Data", "Data Engineer")]
+    assert titles(data["alternative_matches"]) == [("Data", "Analyst"), ("Data", "Data Engineer")]
+
+    stored = jobs.find_one({"job_role": "Backend"})["job_descriptions"][0]["candidates"]
+    assert [titles(c["alternative_matches"]) for c in stored] == [
+        titles(backend["alternative_matches"]), titles(data["alternative_matches"])
+    ]
+
+
+def test_a_failing_matcher_does_not_fail_the_upload(jobs, monkeypatch):
+    monkeypatch.setattr(data_storage.LLMAnalyzer, "extract_candidate_name", lambda self, text: "Ada Lovelace")
+    monkeypatch.setattr(JDMatcher, "matrix", lambda self: 1 / 0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage = RecruitmentDataStorage("mongodb://mongomock")
+    result = storage.upload_resume(
+        job_role="Backend", job_title="Backend Engineer", resume_content="Ada Lovelace\nPython",
+        embeddings=[1.0, 0.0], github_links=[], jd_matcher=JDMatcher("mongodb://mongomock")
+    )
+    assert result["status"] == "created", result
+    assert result["alternative_matches"] == []
@@ -0,0 +1,51 @@
+import base64
+import datetime
+import json
+
+import numpy as np
+import pytest
+from bson import Binary, ObjectId
+
+from json_response import FastJSONResponse, encode_default
+
+OBJECT_ID = ObjectId("65f0c0ffee0000000000beef")
+UPLOADED = datetime.datetime(2026, 3, 1, 12, 30, 5, 250000)
+PACKED = Binary(np.asarray([0.5, -1.0], dtype=np.float16).tobytes())
+
+DOCUMENT = {
+    "_id": OBJECT_ID,
+    "uploaded_at": UPLOADED,
+    "created_on": UPLOADED.date(),
+    "chunk_embeddings": {"dtype": "float16", "shape": [1, 2], "data": PACKED},
+    "embeddings": np.asarray([0.25, 0.5], dtype=np.float32),
+    "score": np.float32(0.75),
+    "count": np.int64(3),
+    "name": "Zoë"
+}
+
+EXPECTED = {
+    "_id": "65f0c0ffee0000000000beef",
+    "uploaded_at": "2026-03-01T12:30:05.250000",
+    "created_on": "2026-03-01",
+    "chunk_embeddings": {"dtype": "float16", "shape": [1, 2], "data": base64.b64encode(bytes(PACKED)).decode("ascii")},
+    "embeddings": [0.25, 0.5],
+    "score": 0.75,
+    "count": 3,
+    "name": "Zoë"
+}
+
+
+def test_response_encodes_mongo_documents():
+    response = FastJSONResponse(content={"data": [DOCUMENT]})
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == {"data": [EXPECTED]}
+
+
+def test_standard_library_fallback_encodes_the_same():
+    body = json.dumps(DOCUMENT, default=encode_default, ensure_ascii=False)
+    assert json.loads(body) == EXPECTED
+
+
+def test_unknown_types_are_rejected():
+    with pytest.raises(TypeError):
+        FastJSONResponse(content={"value": object()})
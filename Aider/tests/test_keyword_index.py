@@ -0,0 +1,30 @@
+import datetime
+
+from keyword_index import ResumeKeywordIndex
+
+UPLOADED = datetime.datetime(2026, 3, 1, 12, 0, 0, 123456)
+
+
+def job(candidates):
+    return {"job_role": "Backend", "job_descriptions": [{"title": "Backend Engineer", "candidates": candidates}]}
+
+
+def test_refresh_skips_resumes_this_worker_already_indexed(mongo):
+    jobs = mongo.recruitment_db.jobs
+    jobs.insert_one(job([{"candidate_name": "Ada Lovelace", "resume_content": "python", "uploaded_at": UPLOADED - datetime.timedelta(days=1)}]))
+    index = ResumeKeywordIndex("mongodb://mongomock")
+    index.ensure_loaded()
+
+    # This worker's upload: stored (with milliseconds) and added to the index
+    jobs.update_one({}, {"$push": {"job_descriptions.0.candidates": {
+        "candidate_name": "Grace Hopper", "resume_content": "cobol", "uploaded_at": UPLOADED
+    }}})
+    index.add("Backend", "Backend Engineer", "Grace Hopper", "cobol", UPLOADED)
+    assert index.refresh(force=True) == 0
+    assert index.watermark == UPLOADED.replace(microsecond=123000)
+
+    # Re-uploaded by another worker: indexed again
+    later = UPLOADED + datetime.timedelta(minutes=5)
+    jobs.update_one({}, {"$set": {"job_descriptions.0.candidates.1.resume_content": "kafka", "job_descriptions.0.candidates.1.uploaded_at": later}})
+    assert index.refresh(force=True) == 1
+    assert [hit["candidate_name"] for hit in index.search("kafka")] == ["Grace Hopper"]
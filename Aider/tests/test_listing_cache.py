@@ -0,0 +1,93 @@
+import pytest
+
+import main
+from listing_cache import (
+    GENERATIONS_COLLECTION, LISTINGS_GENERATION_ID, ListingCache, bump_listings_generation, local_generation
+)
+
+
+@pytest.fixture
+def listings(mongo):
+    # The counter lives in the dropped database, while the worker remembers the highest
+    # generation it has seen: carry that over so a bump is a change again
+    main.listing_cache.clear()
+    mongo.recruitment_db[GENERATIONS_COLLECTION].insert_one(
+        {"_id": LISTINGS_GENERATION_ID, "generation": local_generation(LISTINGS_GENERATION_ID)}
+    )
+    mongo.recruitment_db.jobs.insert_one({
+        "job_role": "Backend",
+        "job_descriptions": [{"title": "Backend Engineer", "candidates": []}]
+    })
+    return mongo.recruitment_db
+
+
+def counting_loader(value):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return value
+    return loader, calls
+
+
+def test_entries_are_reused_until_the_generation_is_bumped(listings):
+    cache = ListingCache("mongodb://mongomock", check_interval=0)
+    loader, calls = counting_loader(["Backend"])
+    first = cache.get("roles", loader)
+    assert cache.get("roles", loader) == first
+    assert len(calls) == 1
+
+    bump_listings_generation(listings)
+    assert cache.get("roles", loader) == first
+    assert len(calls) == 2
+
+
+def test_empty_lookups_are_cached_only_when_asked(listings):
+    cache = ListingCache("mongodb://mongomock", check_interval=0)
+    loader, calls = counting_loader([])
+    for _ in range(2):
+        assert cache.get("titles:nobody", loader, cache_empty=False) == ([], cache.etag([]))
+        cache.get("titles", loader)
+    assert len(calls) == 3
+
+
+def test_least_recently_used_entries_are_evicted(listings):
+    cache = ListingCache("mongodb://mongomock", check_interval=0, max_entries=2)
+    loader, calls = counting_loader(["Backend Engineer"])
+    cache.get("a", loader)
+    cache.get("b", loader)
+    cache.get("a", loader)
+    cache.get("c", loader)
+    assert list(cache._entries) == ["a", "c"]
+    assert len(calls) == 3
+
+
+def test_listings_answer_304_for_a_known_etag(api, listings):
+    for path in ("/job/roles", "/jobs/titles/all", "/jobs/titles/backend"):
+        first = api.get(path)
+        assert first.status_code == 200, path
+        etag = first.headers["etag"]
+
+        assert api.get(path, headers={"If-None-Match": etag}).status_code == 304
+        assert api.get(path, headers={"If-None-Match": '"stale", ' + etag}).status_code == 304
+        assert api.get(path, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_a_new_jd_changes_the_titles_and_their_etag(api, listings):
+    first = api.get("/jobs/titles/Backend")
+    listings.jobs.update_one({"job_role": "Backend"}, {"$push": {"job_descriptions": {"title": "Go Engineer"}}})
+    bump_listings_generation(listings)
+
+    second = api.get("/jobs/titles/Backend", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.json()["titles"] == ["Backend Engineer", "Go Engineer"]
+    assert second.headers["etag"] != first.headers["etag"]
+
+
+def test_unknown_role_is_not_cached(api, listings):
+    assert api.get("/jobs/titles/Frontend").status_code == 404
+    assert "titles:frontend" not in main.listing_cache._entries
+
+    listings.jobs.insert_one({"job_role": "Frontend", "job_descriptions": [{"title": "Frontend Engineer"}]})
+    # No generation bump: the 404 must not have been remembered
+    assert api.get("/jobs/titles/Frontend").json()["titles"] == ["Frontend Engineer"]
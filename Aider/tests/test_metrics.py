@@ -0,0 +1,99 @@
+import logging
+
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, render_prometheus, stage, timed
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Metrics created by a test stay out of the process-wide /metrics output
+    monkeypatch.setattr(metrics, "_registry", [])
+
+
+def samples(name, text=None):
+    """{'name{labels}': value} for the sample lines of one metric"""
+    lines = (text or render_prometheus()).splitlines()
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in lines if line.startswith(name) and not line.startswith("#")
+    }
+
+
+def stage_count(name):
+    return samples("recruitment_stage_duration_seconds_count").get(
+        f'recruitment_stage_duration_seconds_count{{stage="{name}"}}', 0
+    )
+
+
+def test_counters_and_histograms_render_in_the_text_format(registry):
+    requests = Counter("test_requests_total", "Requests", ["path"])
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value)
+
+    assert render_prometheus().splitlines() == [
+        "# HELP test_requests_total Requests",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{path="/a\\"b"} 3',
+        "# HELP test_latency_seconds Latency",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1"} 3',
+        'test_latency_seconds_bucket{le="+Inf"} 4',
+        "test_latency_seconds_sum 4.05",
+        "test_latency_seconds_count 4",
+    ]
+
+
+def test_stages_are_timed_and_failures_counted():
+    before = stage_count("test.work"), metrics.STAGE_ERRORS.value(stage="test.work")
+
+    @timed("test.work")
+    def work(fail=False):
+        assert metrics.IN_FLIGHT.value(kind="stage", name="test.work") == 1
+        if fail:
+            raise ValueError("boom")
+        return "done"
+
+    assert work() == "done"
+    with pytest.raises(ValueError):
+        work(fail=True)
+    assert (stage_count("test.work"), metrics.STAGE_ERRORS.value(stage="test.work")) == (before[0] + 2, before[1] + 1)
+    assert metrics.IN_FLIGHT.value(kind="stage", name="test.work") == 0
+
+
+def test_slow_requests_log_their_stage_breakdown(monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_REQUEST_SECONDS", 0.0)
+    token, spans = metrics.start_request_trace()
+    for name in ("test.parse", "test.embed", "test.parse"):
+        with stage(name):
+            pass
+    with caplog.at_level(logging.WARNING, logger="metrics"):
+        metrics.finish_request_trace(token, spans, "POST", "/test", 200, elapsed=0.5)
+
+    assert [name for name, _ in spans] == ["test.parse", "test.embed", "test.parse"]
+    assert "Slow request POST /test -> 200 in 500ms" in caplog.text
+    assert "test.parse=" in caplog.text and "test.embed=" in caplog.text
+    # Outside a request, stages are still timed but not traced
+    with stage("test.parse"):
+        pass
+    assert len(spans) == 3
+
+
+def test_metrics_endpoint_reports_requests_by_route_template(api, mongo):
+    mongo.recruitment_db.jobs.insert_one({"job_role": "Backend", "job_descriptions": [{"title": "Backend Engineer"}]})
+    assert api.get("/jobs/titles/Backend").status_code == 200
+    assert api.get("/no/such/route").status_code == 404
+
+    response = api.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    requests = samples("recruitment_request_duration_seconds_count", response.text)
+    assert requests['recruitment_request_duration_seconds_count{method="GET",route="/jobs/titles/{role}",status="200"}'] >= 1
+    assert requests['recruitment_request_duration_seconds_count{method="GET",route="unmatched",status="404"}'] >= 1
+    assert "# TYPE recruitment_stage_duration_seconds histogram" in response.text
+    assert any('stage="mongo.' in key for key in samples("recruitment_stage_duration_seconds_count", response.text))
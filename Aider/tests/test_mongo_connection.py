@@ -0,0 +1,23 @@
+import contextlib
+import io
+
+import mongo_connection
+from data_handle import DataHandle
+from data_storage import RecruitmentDataStorage
+from mongo_connection import get_client, get_database
+
+
+def test_one_client_per_connection_string(mongo):
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage = RecruitmentDataStorage("mongodb://mongomock")
+        handle = DataHandle("mongodb://mongomock")
+    assert storage.client is handle.client is get_client("mongodb://mongomock")
+    assert storage.db.name == handle.db.name == mongo_connection.DATABASE_NAME
+
+
+def test_database_name_is_configurable(mongo, monkeypatch):
+    monkeypatch.setattr(mongo_connection, "DATABASE_NAME", "recruitment_test")
+    assert get_database("mongodb://mongomock").name == "recruitment_test"
+    assert get_database("mongodb://mongomock", "other").name == "other"
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert RecruitmentDataStorage("mongodb://mongomock").db.name == "recruitment_test"
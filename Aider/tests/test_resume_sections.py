@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from resume_sections import group_sections, pack_sections, profile_vector, relevant_resume_text, segment_resume
+
+HEADED = """Ada Lovelace
+ada@example.com
+
+== WORK EXPERIENCE ==
+Analytical Engine programmer, 1842-1843
+
+Skills: Python, Go, Kafka
+Education & Certifications
+University of London
+
+Hobbies
+Chess
+Experience
+Consultant, 1850
+"""
+
+WEIGHTS = {"experience": 0.5, "skills": 0.5, "education": 0.0, "summary": 0.0, "other": 0.0}
+
+
+def sections(text):
+    return [(section, text[start:end].strip()) for section, start, end in segment_resume(text)]
+
+
+def test_headed_resume_is_split_at_heading_lines():
+    assert sections(HEADED) == [
+        ("summary", "Ada Lovelace\nada@example.com"),
+        ("experience", "== WORK EXPERIENCE ==\nAnalytical Engine programmer, 1842-1843"),
+        ("skills", "Skills: Python, Go, Kafka"),
+        ("education", "Education & Certifications\nUniversity of London"),
+        ("other", "Hobbies\nChess"),
+        ("experience", "Experience\nConsultant, 1850"),
+    ]
+    spans = segment_resume(HEADED)
+    # The spans tile the whole text
+    assert spans[0][1] == 0 and spans[-1][2] == len(HEADED)
+    assert all(end == start for (_, _, end), (_, start, _) in zip(spans, spans[1:]))
+
+
+def test_sections_of_the_same_kind_are_grouped_in_section_order():
+    grouped = group_sections(HEADED)
+    assert list(grouped) == ["summary", "experience", "skills", "education", "other"]
+    assert len(grouped["experience"]) == 2
+
+
+def test_flattened_resume_falls_back_to_upper_case_headings():
+    text = "Grace Hopper, compiler pioneer. EXPERIENCE Navy, UNIVAC. SKILLS COBOL, FLOW-MATIC. EDUCATION Yale."
+    assert sections(text) == [
+        ("summary", "Grace Hopper, compiler pioneer."),
+        ("experience", "EXPERIENCE Navy, UNIVAC."),
+        ("skills", "SKILLS COBOL, FLOW-MATIC."),
+        ("education", "EDUCATION Yale."),
+    ]
+    # Lower-case words in running text are not headings
+    assert sections("Grace Hopper has experience with skills in COBOL.") == [
+        ("summary", "Grace Hopper has experience with skills in COBOL.")
+    ]
+    assert segment_resume("") == []
+
+
+def packed(names, vectors, spans=None):
+    return pack_sections(names, spans or [[(0, 0)]] * len(names), np.asarray(vectors, dtype=np.float32))
+
+
+def test_profile_vector_is_the_weighted_mean_of_the_normalized_sections():
+    profile = profile_vector(packed(["experience", "skills", "other"], [[3, 0], [0, 1], [-1, -1]]), WEIGHTS)
+    np.testing.assert_allclose(profile, [np.sqrt(0.5), np.sqrt(0.5)], atol=1e-3)
+
+    assert profile_vector(packed(["other"], [[1, 0]]), WEIGHTS) is None
+    assert profile_vector(None, WEIGHTS) is None
+
+
+def test_relevant_text_keeps_weighted_sections_and_close_zero_weight_ones():
+    grouped = group_sections(HEADED)
+    names = list(grouped)
+    vectors = {"summary": [1, 1], "experience": [1, 0], "skills": [0.9, 0.1], "education": [0, 1], "other": [0.8, 0.2]}
+    sections_doc = packed(names, [vectors[name] for name in names], [grouped[name] for name in names])
+
+    relevant = relevant_resume_text(HEADED, sections_doc, jd_vector=[1, 0], min_similarity=0.5, weights=WEIGHTS)
+    assert "Ada Lovelace" in relevant and "Consultant, 1850" in relevant and "Kafka" in relevant
+    assert "Chess" in relevant
+    assert "University of London" not in relevant
+
+    # Without a JD vector only the weighted sections and the summary are kept
+    without_jd = relevant_resume_text(HEADED, sections_doc, weights=WEIGHTS)
+    assert "Chess" not in without_jd and "Kafka" in without_jd
+
+
+@pytest.mark.parametrize("sections_doc", [None, {}, {"names": []}])
+def test_unsegmented_resume_is_sent_whole(sections_doc):
+    assert relevant_resume_text(HEADED, sections_doc, jd_vector=[1, 0]) == HEADED
@@ -0,0 +1,54 @@
+import numpy as np
+
+from screening import ANALYZE, LOW_MATCH, ScreeningPolicy, keyword_coverage
+
+
+def test_decide_by_threshold():
+    policy = ScreeningPolicy(threshold=0.5, top_n=0)
+    assert policy.decide(0.5) == ANALYZE
+    assert policy.decide(0.49) == LOW_MATCH
+
+
+def test_decide_without_a_score_analyzes():
+    assert ScreeningPolicy(threshold=0.5).decide(None) == ANALYZE
+
+
+def test_decide_lets_the_top_n_of_the_jd_through():
+    policy = ScreeningPolicy(threshold=0.5, top_n=3)
+    assert policy.decide(0.1, better_candidates=2) == ANALYZE
+    assert policy.decide(0.1, better_candidates=3) == LOW_MATCH
+    assert policy.decide(0.1) == LOW_MATCH
+
+
+def test_pre_score_is_the_cosine_similarity():
+    score = ScreeningPolicy().pre_score([1.0, 0.0], [1.0, 1.0])
+    assert score["score"] == score["similarity"] == round(1 / np.sqrt(2), 4)
+    assert score["keyword_coverage"] is None
+
+
+def test_pre_score_without_both_embeddings_is_none():
+    assert ScreeningPolicy().pre_score(None, [1.0, 0.0])["score"] is None
+    assert ScreeningPolicy().pre_score([1.0, 0.0, 0.0], [1.0, 0.0])["score"] is None
+
+
+def test_pre_score_blends_in_keyword_coverage():
+    jd = "python kafka kubernetes"
+    assert keyword_coverage("python and kafka", jd) == 2 / 3
+    score = ScreeningPolicy(keyword_weight=0.5).pre_score([1.0, 0.0], [0.0, 1.0], "python and kafka", jd)
+    assert score["score"] == round(0.5 * 0 + 0.5 * 2 / 3, 4)
+
+
+def test_better_screened_candidates_are_counted_with_an_index(mongo, monkeypatch):
+    import candidate_summaries
+
+    # Indexes are made once per database per process, and the fixture has dropped them
+    monkeypatch.setattr(candidate_summaries, "_indexes_ready", set())
+    summaries = candidate_summaries.CandidateSummaryStore(mongo.recruitment_db)
+    summaries.collection.insert_many([
+        {"job_role_key": "backend", "job_title_key": "backend engineer", "screening_score": score}
+        for score in (0.2, 0.4, 0.6)
+    ] + [{"job_role_key": "backend", "job_title_key": "go engineer", "screening_score": 0.9}])
+
+    assert summaries.count_better_screened("Backend", "Backend Engineer", 0.3) == 2
+    keys = [index["key"] for index in summaries.collection.index_information().values()]
+    assert [("job_role_key", 1), ("job_title_key", 1), ("screening_score", -1)] in keys
@@ -0,0 +1,79 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from starlette.testclient import TestClient
+
+from upload_limits import MULTIPART_OVERHEAD_BYTES, UploadSizeLimitMiddleware, hash_upload
+
+LIMIT = 1024
+BOUNDARY = "limit-test-boundary"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware, max_bytes=LIMIT)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        digest, size = await hash_upload(file, max_bytes=LIMIT)
+        return {"size": size}
+
+    return TestClient(app)
+
+
+def multipart(content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="resume.txt"\r\n'
+        "Content-Type: text/plain\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def chunked(body: bytes, size: int = 16 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+HEADERS = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+def test_small_upload_passes(client):
+    response = client.post("/upload", files={"file": ("resume.txt", b"x" * 100, "text/plain")})
+    assert response.status_code == 200
+    assert response.json() == {"size": 100}
+
+
+def test_declared_oversized_body_is_413(client):
+    body = multipart(b"x" * (LIMIT + MULTIPART_OVERHEAD_BYTES + 1))
+    response = client.post("/upload", content=body, headers=HEADERS)
+    assert response.status_code == 413
+
+
+def test_chunked_oversized_body_is_413(client):
+    body = multipart(b"x" * (LIMIT + MULTIPART_OVERHEAD_BYTES + 1))
+    response = client.post("/upload", content=chunked(body), headers=HEADERS)
+    assert response.status_code == 413
+    assert "byte limit" in response.json()["detail"]
+
+
+def test_chunked_small_body_passes(client):
+    response = client.post("/upload", content=chunked(multipart(b"x" * 100), size=64), headers=HEADERS)
+    assert response.status_code == 200
+
+
+def test_file_over_the_limit_within_the_overhead_is_413(client):
+    # Fits the multipart allowance of the middleware, but the file itself is too large
+    response = client.post("/upload", files={"file": ("resume.txt", b"x" * (LIMIT + 1), "text/plain")})
+    assert response.status_code == 413
+
+
+def test_hash_upload_rewinds():
+    async def run():
+        upload = UploadFile(io.BytesIO(b"resume text"), filename="resume.txt")
+        digest, size = await hash_upload(upload, max_bytes=LIMIT)
+        return size, await upload.read()
+
+    assert asyncio.run(run()) == (11, b"resume text")
@@ -0,0 +1,108 @@
+import contextlib
+import io
+
+import pytest
+
+import data_storage
+from data_storage import RecruitmentDataStorage
+
+ROLE = "Backend"
+TITLE = "Backend Engineer"
+ANALYSIS = {"analyses": [{"type": "candidate_analysis", "content": "ok"}]}
+
+
+@pytest.fixture
+def storage(mongo, monkeypatch):
+    monkeypatch.setattr(data_storage.LLMAnalyzer, "extract_candidate_name", lambda self, text: text.splitlines()[0])
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage = RecruitmentDataStorage("mongodb://mongomock")
+    mongo.recruitment_db.jobs.insert_one({
+        "job_role": ROLE,
+        "job_descriptions": [
+            {"title": "Frontend Engineer", "candidates": [{"candidate_name": "Ada Lovelace", "resume_content": "other"}]},
+            {
+                "title": TITLE, "location": "Remote", "job_description": "Python services",
+                "candidates": [{"candidate_name": "Ada Lovelace", "resume_content": "Ada Lovelace\nPython", "analysis": ANALYSIS}]
+            }
+        ]
+    })
+    return storage
+
+
+def upload(storage, text, **kwargs):
+    return storage.upload_resume(
+        job_role=ROLE, job_title=TITLE.lower(), resume_content=text,
+        embeddings=[1.0, 0.0], github_links=[], **kwargs
+    )
+
+
+def candidates(storage, title=TITLE):
+    job = storage.jobs_collection.find_one({"job_role": ROLE})
+    jd = next(jd for jd in job["job_descriptions"] if jd["title"] == title)
+    return {c["candidate_name"]: c for c in jd["candidates"]}
+
+
+def test_new_candidate_is_appended(storage):
+    result = upload(storage, "Grace Hopper\nCOBOL")
+    assert result["status"] == "created", result
+    assert result["data"]["job_title"] == TITLE
+    assert not result["analysis_reused"]
+
+    stored = candidates(storage)
+    assert list(stored) == ["Ada Lovelace", "Grace Hopper"]
+    assert stored["Grace Hopper"]["resume_content"] == "Grace Hopper\nCOBOL"
+    assert "analysis" in stored["Ada Lovelace"]
+
+
+def test_existing_candidate_is_replaced_in_place(storage):
+    result = upload(storage, "Ada Lovelace\nPython, Go")
+    assert result["status"] == "updated", result
+    assert not result["analysis_reused"]
+
+    stored = candidates(storage)
+    assert list(stored) == ["Ada Lovelace"]
+    assert stored["Ada Lovelace"]["resume_content"] == "Ada Lovelace\nPython, Go"
+    assert "analysis" not in stored["Ada Lovelace"]
+    # Other JDs of the role are untouched
+    assert candidates(storage, "Frontend Engineer")["Ada Lovelace"]["resume_content"] == "other"
+
+
+def test_duplicate_of_the_same_jd_keeps_its_analysis(storage):
+    duplicate_of = {"candidate_name": "Ada Lovelace", "job_role": ROLE, "job_title": TITLE}
+    result = upload(storage, "Ada Lovelace\nPython", duplicate_of=duplicate_of)
+    assert result["status"] == "updated", result
+    assert result["analysis_reused"]
+
+    stored = candidates(storage)["Ada Lovelace"]
+    assert stored["analysis"] == ANALYSIS
+    assert stored["duplicate_of"] == duplicate_of
+
+
+def test_pre_image_is_the_projected_jd_before_the_write(storage):
+    jobs = storage.jobs_collection
+    job_id = jobs.find_one({"job_role": ROLE})["_id"]
+
+    before = jobs.find_one_and_update(
+        {"_id": job_id},
+        storage._candidate_upsert_pipeline(TITLE, {"candidate_name": "Ada Lovelace", "resume_content": "new"}, True),
+        projection=storage._candidate_projection(TITLE, "Ada Lovelace"),
+        return_document=data_storage.ReturnDocument.BEFORE
+    )
+    assert before["job_descriptions"] == [{
+        "title": TITLE, "location": "Remote",
+        "candidates": [{"candidate_name": "Ada Lovelace", "has_analysis": True}]
+    }]
+    assert candidates(storage)["Ada Lovelace"]["resume_content"] == "new"
+
+
+def test_bulk_upload_writes_new_and_existing_candidates(storage):
+    resumes = [
+        {"candidate_name": name, "resume_content": f"{name}\nPython", "embeddings": [1.0, 0.0]}
+        for name in ("Ada Lovelace", "Grace Hopper")
+    ]
+    result = storage.bulk_upload_resumes(ROLE, TITLE, resumes)
+    assert result["status"] == "success", result
+    assert {c["candidate_name"]: c["status"] for c in result["candidates"]} == {
+        "Ada Lovelace": "updated", "Grace Hopper": "created"
+    }
+    assert list(candidates(storage)) == ["Ada Lovelace", "Grace Hopper"]
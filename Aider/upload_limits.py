@@ -0,0 +1,121 @@
+import hashlib
+import logging
+import os
+from typing import Tuple
+
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Room for multipart boundaries and the other form fields of an upload request
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    """
+    Raised from receive() once a streamed body goes over the limit. It is an
+    HTTPException because FastAPI's form parsing turns any other error
+    raised while reading the body into a 400.
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=413,
+            detail=f"Upload exceeds the {max_bytes} byte limit",
+            headers={"Connection": "close"}
+        )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects request bodies larger than max_bytes with a 413 before they are parsed.
+
+    The declared Content-Length is checked first; bodies without one (chunked
+    transfer) are counted as they stream in and cut off once they go over the limit,
+    so an oversized upload is never spooled in full.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                declared = 0
+            if declared > self.max_bytes:
+                await self._reject(send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise UploadTooLarge(self.max_bytes - MULTIPART_OVERHEAD_BYTES)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except UploadTooLarge:
+            if response_started:
+                raise
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = f'{{"detail":"Upload exceeds the {self.max_bytes - MULTIPART_OVERHEAD_BYTES} byte limit"}}'.encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def hash_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, int]:
+    """
+    Streams an upload through SHA-256 in fixed-size chunks and rewinds it.
+
+    The upload stays in Starlette's spooled temporary file (memory for small
+    files, disk past the spool threshold), so no full copy is made here.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes} byte limit")
+
+    sha256 = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes} byte limit")
+        sha256.update(chunk)
+
+    await file.seek(0)
+    return sha256.hexdigest(), size
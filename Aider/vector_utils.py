@@ -0,0 +1,91 @@
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+from bson.binary import Binary
+
+
+def pack_matrix(matrix: np.ndarray) -> Optional[Dict[str, Any]]:
+    """Stores a (chunks x dim) matrix as float16 bytes plus its shape"""
+    if matrix is None:
+        return None
+    matrix = np.asarray(matrix, dtype=np.float16)
+    if matrix.ndim != 2 or matrix.size == 0:
+        return None
+    return {
+        "dtype": "float16",
+        "shape": list(matrix.shape),
+        "data": Binary(matrix.tobytes())
+    }
+
+
+def unpack_matrix(packed: Optional[Dict[str, Any]]) -> np.ndarray:
+    if not packed or not packed.get("data"):
+        return np.zeros((0, 0), dtype=np.float32)
+    matrix = np.frombuffer(bytes(packed["data"]), dtype=packed.get("dtype", "float16"))
+    return matrix.reshape(packed["shape"]).astype(np.float32)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        norm = np.linalg.norm(matrix)
+        return matrix / norm if norm > 0 else matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def cosine_similarity(a: Union[list, np.ndarray], b: Union[list, np.ndarray]) -> float:
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    if a.size == 0 or b.size == 0 or a.shape != b.shape:
+        return 0.0
+    denom = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(np.dot(a, b) / denom) if denom > 0 else 0.0
+
+
+def max_sim(query_chunks: np.ndarray, doc_chunks: np.ndarray) -> float:
+    """
+    Late-interaction similarity: every query chunk is matched with its closest
+    document chunk and the best matches are averaged.
+    """
+    if query_chunks.size == 0 or doc_chunks.size == 0:
+        return 0.0
+    scores = normalize_rows(query_chunks) @ normalize_rows(doc_chunks).T
+    return float(scores.max(axis=1).mean())
+
+
+def max_sim_scores(query_chunks: np.ndarray, documents: List[np.ndarray]) -> np.ndarray:
+    """
+    max_sim of one query against many documents, with a single matrix product
+    over all their chunks. Documents without chunks (or of another dimension)
+    score NaN, so callers can fall back to another score for them.
+    """
+    scores = np.full(len(documents), np.nan, dtype=np.float32)
+    if query_chunks.ndim != 2 or query_chunks.size == 0:
+        return scores
+    present = [
+        i for i, chunks in enumerate(documents)
+        if chunks.ndim == 2 and chunks.size and chunks.shape[1] == query_chunks.shape[1]
+    ]
+    if not present:
+        return scores
+    stacked = normalize_rows(np.concatenate([documents[i] for i in present]))
+    starts = np.cumsum([0] + [len(documents[i]) for i in present[:-1]])
+    similarities = normalize_rows(query_chunks) @ stacked.T
+    # Best chunk of each document per query chunk, averaged over the query chunks
+    scores[present] = np.maximum.reduceat(similarities, starts, axis=1).mean(axis=0)
+    return scores
+
+
+def document_similarity(
+    a_embeddings: Union[list, np.ndarray],
+    b_embeddings: Union[list, np.ndarray],
+    a_chunks: Optional[Dict[str, Any]] = None,
+    b_chunks: Optional[Dict[str, Any]] = None,
+    method: str = "pooled"
+) -> float:
+    """Scores two stored documents with their pooled vectors or, for "maxsim", their chunk matrices"""
+    if method == "maxsim" and a_chunks and b_chunks:
+        return max_sim(unpack_matrix(a_chunks), unpack_matrix(b_chunks))
+    return cosine_similarity(a_embeddings, b_embeddings)